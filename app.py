@@ -1,18 +1,20 @@
-from nicegui import ui, app
-from src.database.DatabaseHandler import DatabaseHandler
-from src.ChatBot.ChatBot import ChatBot,LocalChatBot
+from nicegui import ui, app, background_tasks
+from src.database.BulkImport import import_file
+from src.GUI.InventoryTable import InventoryTable
+from src.GUI.ItemPicker import ItemPicker
 from src.GUI.ShopUI import ShopUI
+from src.Services import services
 from datetime import datetime, timedelta
 import logging
 import sys
 import webbrowser
 import tempfile
 import os
-import httpx
+import shutil
 import json
 
 # --- Initialization ---
-db = DatabaseHandler()
+# The database and chatbot are created on first use (see src/Services.py)
 shop_ui = ShopUI()
 
 # --- Global State for Date Persistence ---
@@ -46,18 +48,6 @@ with ui.footer().classes('hidden') as footer:
 # --- Global State ---
 quran_player_state = {'playing': False}
 
-try:
-    chatbot = ChatBot()
-    if chatbot.api_key and not chatbot.test_connection():
-        print("⚠️ Warning: ChatBot API connection test failed, using local chatbot")
-        chatbot = LocalChatBot()
-    elif not chatbot.api_key:
-        print("ℹ️ No API key found, using local chatbot")
-        chatbot = LocalChatBot()
-except Exception as e:
-    print(f"⚠️ ChatBot initialization failed, using local chatbot: {e}")
-    chatbot = LocalChatBot()
-
 # --- Helper Functions ---
 def get_date_range():
     """Returns the start and end date for the analytics query."""
@@ -67,7 +57,7 @@ def get_date_range():
 
 @ui.page('/')
 @ui.page('/home')
-def home_page():
+async def home_page():
     """Home page with Quran player as main content"""
     shop_ui.create_header()
 
@@ -203,7 +193,7 @@ def home_page():
                 with ui.tab_panel(laser_tab):
                     laser_analytics_container = ui.column().classes('w-full gap-4')
             
-            def update_analytics():
+            async def update_analytics():
                 # Save selected dates
                 app_settings['start_date'] = start_date_input.value
                 app_settings['end_date'] = end_date_input.value
@@ -211,7 +201,7 @@ def home_page():
                 
                 start = f"{start_date_input.value} 00:00:00"
                 end = f"{end_date_input.value} 23:59:59"
-                analytics = db.get_analytics_data(start, end)
+                analytics = await services.adb.get_analytics_data(start, end)
                 
                 shop_analytics_container.clear()
                 with shop_analytics_container:
@@ -257,7 +247,7 @@ def home_page():
                         else:
                             ui.label('لا توجد بيانات مبيعات حالياً').classes('text-gray-500 italic text-center')
             
-            update_analytics()
+            await update_analytics()
             start_date_input.on('change', update_analytics)
             end_date_input.on('change', update_analytics)
 
@@ -298,6 +288,7 @@ def home_page():
 
     async def get_reciters():
         nonlocal all_reciters_data
+        import httpx
         try:
             async with httpx.AsyncClient() as client:
                 response = await client.get('https://mp3quran.net/api/_arabic.json', timeout=15)
@@ -408,8 +399,7 @@ def home_page():
     # تحميل البيانات
     ui.timer(1.0, get_reciters, once=True)
     
-    shop_ui.create_chat_button()
-    shop_ui.create_chat_interface()
+    shop_ui.create_chat()
 
 @ui.page('/add_items')
 def add_items_page():
@@ -419,6 +409,7 @@ def add_items_page():
         with ui.tabs().classes('w-full') as tabs:
             shop_tab = ui.tab('منتجات المحل')
             laser_tab = ui.tab('خامات ماكينة الليزر')
+            import_tab = ui.tab('استيراد من ملف')
         with ui.tab_panels(tabs, value=shop_tab).classes('w-full mt-4'):
             with ui.tab_panel(shop_tab):
                 with ui.card().classes('p-8 w-full'):
@@ -429,32 +420,29 @@ def add_items_page():
                         stock_input = ui.number('الكمية *', format='%.0f').classes('flex-1')
                     date_input = ui.input('تاريخ الشراء *').props('type="date"').classes('w-full')
                     date_input.value = datetime.now().strftime('%Y-%m-%d')
-                    def add_product_action():
+                    async def add_product_action():
                         if not all([name_input.value, price_input.value, stock_input.value, date_input.value]):
                             ui.notify('يرجى ملء جميع الحقول المطلوبة (*)', color='negative')
                             return
                         name = name_input.value.strip()
                         price = float(price_input.value)
-                        existing = db.get_product_by_name_and_price(name, price)
-                        if existing:
+                        # The same name at another price is added as "name (n)", as imports do
+                        existing_id, name_to_add = await services.adb.resolve_product(name, price)
+                        if existing_id is not None:
                             with ui.dialog() as dialog, ui.card():
-                                ui.label(f'المنتج "{name}" بنفس السعر موجود بالفعل. هل تريد زيادة الكمية؟')
+                                ui.label(f'المنتج "{name_to_add}" بنفس السعر موجود بالفعل. هل تريد زيادة الكمية؟')
                                 with ui.row():
-                                    def update_stock():
-                                        db.update_product_stock(existing['id'], int(stock_input.value))
+                                    async def update_stock():
+                                        await services.adb.update_product_stock(existing_id, int(stock_input.value))
                                         ui.notify('تم تحديث الكمية بنجاح', color='positive')
                                         dialog.close()
                                     ui.button('نعم، قم بالتحديث', on_click=update_stock, color='positive')
                                     ui.button('إلغاء', on_click=dialog.close)
                             dialog.open()
                         else:
-                            similar_products = [p for p in db.get_all_products() if p['name'] == name]
-                            if similar_products:
-                                name_to_add = f"{name} ({len(similar_products) + 1})"
+                            if name_to_add != name:
                                 ui.notify(f'تنبيه: تم تغيير الاسم إلى "{name_to_add}" لوجود منتج بنفس الاسم وسعر مختلف', color='warning')
-                            else:
-                                name_to_add = name
-                            success = db.add_product(
+                            success = await services.adb.add_product(
                                 name=name_to_add,
                                 supplier=supplier_input.value,
                                 purchase_date=date_input.value,
@@ -477,27 +465,27 @@ def add_items_page():
                         stock_input_l = ui.number('الكمية *', format='%.2f').classes('flex-1')
                     date_input_l = ui.input('تاريخ الشراء *').props('type="date"').classes('w-full')
                     date_input_l.value = datetime.now().strftime('%Y-%m-%d')
-                    def add_material_action():
+                    async def add_material_action():
                         if not all([name_input_l.value, side_select_l.value, price_input_l.value, stock_input_l.value, date_input_l.value]):
                             ui.notify('يرجى ملء جميع الحقول المطلوبة (*)', color='negative')
                             return
                         name = name_input_l.value.strip()
                         price = float(price_input_l.value)
                         side = side_select_l.value
-                        existing = db.get_laser_material_by_name_side_price(name, side, price)
+                        existing = await services.adb.get_laser_material_by_name_side_price(name, side, price)
                         if existing:
                             with ui.dialog() as dialog, ui.card():
                                 ui.label(f'الخامة "{name} ({side})" بنفس السعر موجودة. هل تريد زيادة الكمية؟')
                                 with ui.row():
-                                    def update_stock():
-                                        db.update_laser_material_stock(existing['id'], float(stock_input_l.value))
+                                    async def update_stock():
+                                        await services.adb.update_laser_material_stock(existing['id'], float(stock_input_l.value))
                                         ui.notify('تم تحديث الكمية بنجاح', color='positive')
                                         dialog.close()
                                     ui.button('نعم، قم بالتحديث', on_click=update_stock, color='positive')
                                     ui.button('إلغاء', on_click=dialog.close)
                             dialog.open()
                         else:
-                            success = db.add_laser_material(
+                            success = await services.adb.add_laser_material(
                                 name=name,
                                 material_side=side,
                                 supplier=supplier_input_l.value,
@@ -511,12 +499,55 @@ def add_items_page():
                             else:
                                 ui.notify('فشل في إضافة الخامة', color='negative')
                     ui.button('إضافة الخامة', on_click=add_material_action).classes('w-full mt-4')
-    shop_ui.create_chat_button()
-    shop_ui.create_chat_interface()
+            with ui.tab_panel(import_tab):
+                with ui.card().classes('p-8 w-full'):
+                    ui.label('استيراد قائمة أسعار المورد (CSV أو Excel). الأصناف الموجودة بنفس الاسم والسعر تزيد كميتها.').classes('text-gray-600')
+                    import_type = ui.select(options={'product': 'منتجات المحل', 'laser': 'خامات ماكينة الليزر'}, value='product', label='نوع البضاعة').classes('w-full')
+                    import_status = ui.label('').classes('text-gray-800 font-medium')
+                    import_progress = {'rows': 0, 'running': False}
+
+                    def show_import_progress():
+                        if import_progress['running']:
+                            import_status.text = f"جاري الاستيراد... {import_progress['rows']} صف"
+                    ui.timer(0.5, show_import_progress)
+
+                    async def handle_upload(e):
+                        if import_progress['running']:
+                            ui.notify('يوجد استيراد قيد التنفيذ', color='warning')
+                            return
+                        # Spool the upload to disk so the importer can stream it off the event loop
+                        suffix = os.path.splitext(e.name)[1].lower()
+                        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+                            shutil.copyfileobj(e.content, tmp)
+                        import_progress.update(rows=0, running=True)
+                        try:
+                            summary = await services.adb.run(
+                                import_file, services.db, tmp.name, import_type.value,
+                                progress=lambda rows: import_progress.update(rows=rows)
+                            )
+                        except Exception as ex:
+                            import_status.text = ''
+                            ui.notify(f'فشل الاستيراد ولم يتم حفظ أي شيء: {ex}', color='negative')
+                            return
+                        finally:
+                            import_progress['running'] = False
+                            os.remove(tmp.name)
+                        import_status.text = (f"تم استيراد {summary['rows']} صف: {summary['inserted']} جديد ({summary['renamed']} باسم معدل)، "
+                                              f"{summary['updated']} تم زيادة كميته، {summary['skipped']} تم تخطيه")
+                        for error in summary['errors'][:5]:
+                            ui.notify(error, color='warning')
+                        ui.notify('تم الاستيراد بنجاح', color='positive')
+                    ui.upload(label='اختر ملف CSV أو XLSX', auto_upload=True, on_upload=handle_upload) \
+                        .props('accept=".csv,.xlsx"').classes('w-full')
+    shop_ui.create_chat()
 
 @ui.page('/process_operation')
-def process_operation_page():
+async def process_operation_page():
     shop_ui.create_header()
+    # Receipt lines: item_id, item_type, operation_type, quantity, total_price, label
+    cart = []
+    # Searched as the cashier types, so the page doesn't load the whole catalog
+    pickers = {}
     with ui.column().classes('p-6 max-w-4xl mx-auto'):
         ui.label('🛒 بيع / عمليات').classes('text-3xl font-bold text-gray-800 mb-6')
         with ui.tabs().classes('w-full') as tabs:
@@ -524,84 +555,114 @@ def process_operation_page():
             laser_tab = ui.tab('خامات ماكينة الليزر')
         with ui.tab_panels(tabs, value=shop_tab).classes('w-full mt-4'):
             with ui.tab_panel(shop_tab):
-                products = db.get_all_products()
-                product_options = {p['id']: f"{p['name']} (المتاح: {p['stock']})" for p in products}
-                if not product_options:
+                if not await services.adb.get_items_page('product', 1):
                     ui.label('لا توجد منتجات متاحة للبيع.').classes('text-center')
                 else:
-                    item_select = ui.select(options=product_options, label='اختر المنتج *').classes('w-full')
+                    pickers['product'] = ItemPicker('product', label='اختر المنتج *')
+                    await pickers['product'].search()
+                    item_select = pickers['product'].select
                     operation_type = ui.select(options=['بيع', 'استرجاع', 'تالف'], label='نوع العملية *', value='بيع').classes('w-full')
-                    customer_name = ui.input('اسم المشتري *').classes('w-full')
-                    customer_phone = ui.input('رقم المشتري (اختياري)').classes('w-full')
-                    # إضافة حقل التاريخ
-                    operation_date = ui.input('تاريخ العملية *').props('type="date"').classes('w-full')
-                    operation_date.value = datetime.now().strftime('%Y-%m-%d')
-                    
                     with ui.row().classes('w-full gap-4'):
                         sale_price = ui.number('سعر البيع للقطعة *', format='%.2f').classes('flex-1')
                         quantity = ui.number('الكمية *', value=1).classes('flex-1')
-                    def perform_action():
-                        if not all ([item_select.value, operation_type.value, customer_name.value, sale_price.value, quantity.value, operation_date.value]):
+                    def add_product_line():
+                        if not all([item_select.value, operation_type.value, sale_price.value, quantity.value]):
                             ui.notify('يرجى ملء جميع الحقول المطلوبة (*)', color='negative')
                             return
-                        success = db.add_operation_with_date(
-                            item_id=item_select.value,
-                            item_type='product',
-                            operation_type=operation_type.value,
-                            customer_name=customer_name.value,
-                            customer_phone=customer_phone.value,
-                            quantity=float(quantity.value),
-                            total_price=float(sale_price.value) * float(quantity.value),
-                            operation_date=operation_date.value
-                        )
-                        if success:
-                            ui.notify(f'تمت عملية "{operation_type.value}" بنجاح', color='positive')
-                            ui.timer(1.0, lambda: ui.navigate.reload(), once=True)
-                        else:
-                            ui.notify('فشلت العملية', color='negative')
-                    ui.button('تنفيذ', on_click=perform_action).classes('w-full mt-4')
+                        add_to_cart('product', item_select.value, item_select.options[item_select.value], operation_type.value, sale_price.value, quantity.value)
+                        item_select.value = None
+                        sale_price.value = None
+                        quantity.value = 1
+                    ui.button('➕ إضافة للفاتورة', on_click=add_product_line).classes('w-full mt-4')
             with ui.tab_panel(laser_tab):
-                materials = db.get_all_laser_materials()
-                material_options = {m['id']: f"{m['name']} ({m['material_side']}) (المتاح: {m['stock_quantity']})" for m in materials}
-                if not material_options:
+                if not await services.adb.get_items_page('laser', 1):
                     ui.label('لا توجد خامات متاحة.').classes('text-center')
                 else:
-                    item_select_l = ui.select(options=material_options, label='اختر الخامة *').classes('w-full')
+                    pickers['laser'] = ItemPicker('laser', label='اختر الخامة *')
+                    await pickers['laser'].search()
+                    item_select_l = pickers['laser'].select
                     operation_type_l = ui.select(options=['بيع', 'استرجاع', 'تالف'], label='نوع العملية *', value='بيع').classes('w-full')
-                    customer_name_l = ui.input('اسم المشتري *').classes('w-full')
-                    customer_phone_l = ui.input('رقم المشتري (اختياري)').classes('w-full')
-                    # إضافة حقل التاريخ
-                    operation_date_l = ui.input('تاريخ العملية *').props('type="date"').classes('w-full')
-                    operation_date_l.value = datetime.now().strftime('%Y-%m-%d')
-                    
                     with ui.row().classes('w-full gap-4'):
                         sale_price_l = ui.number('سعر البيع للوحدة *', format='%.2f').classes('flex-1')
                         quantity_l = ui.number('الكمية *', value=1).classes('flex-1')
-                    def perform_action_l():
-                        if not all ([item_select_l.value, operation_type_l.value, customer_name_l.value, sale_price_l.value, quantity_l.value, operation_date_l.value]):
+                    def add_material_line():
+                        if not all([item_select_l.value, operation_type_l.value, sale_price_l.value, quantity_l.value]):
                             ui.notify('يرجى ملء جميع الحقول المطلوبة (*)', color='negative')
                             return
-                        success = db.add_operation_with_date(
-                            item_id=item_select_l.value,
-                            item_type='laser',
-                            operation_type=operation_type_l.value,
-                            customer_name=customer_name_l.value,
-                            customer_phone=customer_phone_l.value,
-                            quantity=float(quantity_l.value),
-                            total_price=float(sale_price_l.value) * float(quantity_l.value),
-                            operation_date=operation_date_l.value
-                        )
-                        if success:
-                            ui.notify(f'تمت عملية "{operation_type_l.value}" بنجاح', color='positive')
-                            ui.timer(1.0, lambda: ui.navigate.reload(), once=True)
-                        else:
-                            ui.notify('فشلت العملية', color='negative')
-                    ui.button('تنفيذ', on_click=perform_action_l).classes('w-full mt-4')
-    shop_ui.create_chat_button()
-    shop_ui.create_chat_interface()
+                        add_to_cart('laser', item_select_l.value, item_select_l.options[item_select_l.value], operation_type_l.value, sale_price_l.value, quantity_l.value)
+                        item_select_l.value = None
+                        sale_price_l.value = None
+                        quantity_l.value = 1
+                    ui.button('➕ إضافة للفاتورة', on_click=add_material_line).classes('w-full mt-4')
+
+        with ui.card().classes('p-6 w-full mt-6'):
+            ui.label('🧾 الفاتورة').classes('text-xl font-bold text-gray-900 mb-2')
+
+            @ui.refreshable
+            def cart_view():
+                if not cart:
+                    ui.label('الفاتورة فارغة. أضف منتجات أو خامات من الأعلى.').classes('text-gray-500 italic')
+                    return
+                for index, line in enumerate(cart):
+                    with ui.row().classes('w-full justify-between items-center py-1 border-b'):
+                        ui.label(f"{line['operation_type']} - {line['label']}").classes('font-medium')
+                        with ui.row().classes('items-center gap-4'):
+                            ui.label(f"{line['quantity']:g} × {line['total_price'] / line['quantity']:.2f} = {line['total_price']:.2f} جنيه")
+                            ui.button(icon='delete', on_click=lambda i=index: remove_from_cart(i)).props('flat round dense color=negative')
+                ui.label(f"الإجمالي: {sum(l['total_price'] for l in cart):.2f} جنيه").classes('text-lg font-bold mt-2')
+            cart_view()
+
+            customer_name = ui.input('اسم المشتري *').classes('w-full')
+            customer_phone = ui.input('رقم المشتري (اختياري)').classes('w-full')
+            # إضافة حقل التاريخ
+            operation_date = ui.input('تاريخ العملية *').props('type="date"').classes('w-full')
+            operation_date.value = datetime.now().strftime('%Y-%m-%d')
+
+            def add_to_cart(item_type, item_id, label, op_type, unit_price, qty):
+                cart.append({
+                    'item_id': item_id,
+                    'item_type': item_type,
+                    'operation_type': op_type,
+                    'quantity': float(qty),
+                    'total_price': float(unit_price) * float(qty),
+                    'label': label,
+                })
+                cart_view.refresh()
+
+            def remove_from_cart(index):
+                cart.pop(index)
+                cart_view.refresh()
+
+            async def perform_action():
+                if not cart:
+                    ui.notify('الفاتورة فارغة', color='negative')
+                    return
+                if not all([customer_name.value, operation_date.value]):
+                    ui.notify('يرجى ملء جميع الحقول المطلوبة (*)', color='negative')
+                    return
+                success = await services.adb.add_operations_batch(
+                    lines=cart,
+                    customer_name=customer_name.value,
+                    customer_phone=customer_phone.value,
+                    operation_date=operation_date.value
+                )
+                if success:
+                    ui.notify(f'تم تسجيل الفاتورة ({len(cart)} عملية) بنجاح', color='positive')
+                    sold = {(line['item_type'], line['item_id']) for line in cart}
+                    cart.clear()
+                    cart_view.refresh()
+                    customer_name.value = ''
+                    customer_phone.value = ''
+                    # Only the stock of the items on the receipt changed
+                    for item_type, item_id in sold:
+                        await pickers[item_type].patch(item_id)
+                else:
+                    ui.notify('فشلت العملية', color='negative')
+            ui.button('تنفيذ', on_click=perform_action).classes('w-full mt-4')
+    shop_ui.create_chat()
 
 @ui.page('/manage_inventory')
-def manage_inventory_page():
+async def manage_inventory_page():
     shop_ui.create_header()
     with ui.column().classes('p-6 max-w-7xl mx-auto'):
         ui.label('📦 إدارة المخزن').classes('text-3xl font-bold text-gray-800 mb-6')
@@ -609,42 +670,15 @@ def manage_inventory_page():
             shop_tab = ui.tab('بضاعة المحل')
             laser_tab = ui.tab('خامات ماكينة الليزر')
         with ui.tab_panels(tabs, value=shop_tab).classes('w-full mt-4'):
+            # Only the page on screen is loaded; an edit or delete updates just its row
             with ui.tab_panel(shop_tab):
-                @ui.refreshable
-                def products_table():
-                    products = db.get_all_products()
-                    if not products:
-                        ui.label('لا توجد منتجات حالياً.').classes('text-center')
-                        return
-                    for product in products:
-                        with ui.card().classes('w-full p-4 mb-2'):
-                            with ui.row().classes('w-full justify-between items-center'):
-                                with ui.column():
-                                    ui.label(product['name']).classes('font-bold text-lg')
-                                    ui.label(f"المورد: {product.get('supplier', 'N/A')} | الكمية: {product['stock']}").classes('text-sm text-gray-600')
-                                    ui.label(f"شراء: {product['purchase_price']:.2f} | بيع: {product.get('sale_price', 'N/A') or 'لم يحدد'}").classes('text-sm text-gray-600')
-                                with ui.row():
-                                    ui.button(icon='edit', on_click=lambda p=product: edit_product_dialog(p)).props('flat round')
-                                    ui.button(icon='delete', on_click=lambda p=product: delete_item('product', p['id'])).props('flat round color=negative')
-                products_table()
+                products_table = InventoryTable('product', on_edit=lambda p: edit_product_dialog(p),
+                                                on_delete=lambda p: delete_item('product', p['id']))
             with ui.tab_panel(laser_tab):
-                @ui.refreshable
-                def materials_table():
-                    materials = db.get_all_laser_materials()
-                    if not materials:
-                        ui.label('لا توجد خامات حالياً.').classes('text-center')
-                        return
-                    for material in materials:
-                        with ui.card().classes('w-full p-4 mb-2'):
-                            with ui.row().classes('w-full justify-between items-center'):
-                                with ui.column():
-                                    ui.label(f"{material['name']} ({material['material_side']})").classes('font-bold text-lg')
-                                    ui.label(f"المورد: {material.get('supplier', 'N/A')} | الكمية: {material['stock_quantity']}").classes('text-sm text-gray-600')
-                                    ui.label(f"شراء: {material['purchase_price']:.2f} | بيع: {material.get('sale_price', 'N/A') or 'لم يحدد'}").classes('text-sm text-gray-600')
-                                with ui.row():
-                                    ui.button(icon='edit', on_click=lambda m=material: edit_material_dialog(m)).props('flat round')
-                                    ui.button(icon='delete', on_click=lambda m=material: delete_item('laser', m['id'])).props('flat round color=negative')
-                materials_table()
+                materials_table = InventoryTable('laser', on_edit=lambda m: edit_material_dialog(m),
+                                                 on_delete=lambda m: delete_item('laser', m['id']))
+        await products_table.load_page()
+        await materials_table.load_page()
     def edit_product_dialog(product):
         with ui.dialog() as dialog, ui.card():
             ui.label(f"تعديل: {product['name']}").classes('text-lg font-bold')
@@ -654,10 +688,10 @@ def manage_inventory_page():
             sale_price = ui.number('سعر البيع', value=product.get('sale_price'))
             stock = ui.number('الكمية', value=product['stock'])
             notes = ui.textarea('ملاحظات', value=product.get('notes'))
-            def save():
-                db.update_product(product['id'], name.value, supplier.value, purchase_price.value, sale_price.value, stock.value, notes.value)
+            async def save():
+                await services.adb.update_product(product['id'], name.value, supplier.value, purchase_price.value, sale_price.value, stock.value, notes.value)
                 ui.notify('تم الحفظ', color='positive')
-                products_table.refresh()
+                await products_table.patch(product['id'])
                 dialog.close()
             ui.button('حفظ', on_click=save)
         dialog.open()
@@ -671,10 +705,10 @@ def manage_inventory_page():
             sale_price = ui.number('سعر البيع', value=material.get('sale_price'))
             stock_quantity = ui.number('الكمية', value=material['stock_quantity'])
             notes = ui.textarea('ملاحظات', value=material.get('notes'))
-            def save():
-                db.update_laser_material(material['id'], name.value, side.value, supplier.value, purchase_price.value, sale_price.value, stock_quantity.value, notes.value)
+            async def save():
+                await services.adb.update_laser_material(material['id'], name.value, side.value, supplier.value, purchase_price.value, sale_price.value, stock_quantity.value, notes.value)
                 ui.notify('تم الحفظ', color='positive')
-                materials_table.refresh()
+                await materials_table.patch(material['id'])
                 dialog.close()
             ui.button('حفظ', on_click=save)
         dialog.open()
@@ -682,42 +716,94 @@ def manage_inventory_page():
         with ui.dialog() as dialog, ui.card():
             ui.label('هل أنت متأكد من الحذف؟')
             with ui.row():
-                def confirmed_delete():
+                async def confirmed_delete():
                     if item_type == 'product':
-                        db.delete_product(item_id)
-                        products_table.refresh()
+                        await services.adb.delete_product(item_id)
+                        await products_table.patch(item_id)
                     else:
-                        db.delete_laser_material(item_id)
-                        materials_table.refresh()
+                        await services.adb.delete_laser_material(item_id)
+                        await materials_table.patch(item_id)
                     ui.notify('تم الحذف', color='positive')
                     dialog.close()
                 ui.button('نعم', on_click=confirmed_delete, color='negative')
                 ui.button('لا', on_click=dialog.close)
         dialog.open()
-    shop_ui.create_chat_button()
-    shop_ui.create_chat_interface()
+    shop_ui.create_chat()
 
 @ui.page('/history')
-def history_page():
+async def history_page():
     shop_ui.create_header()
     with ui.column().classes('p-6 max-w-7xl mx-auto'):
         ui.label('📜 السجل').classes('text-3xl font-bold text-gray-800 mb-6')
-        operations = db.get_all_operations()
         columns = [
             {'name': 'date', 'label': 'التاريخ', 'field': 'date', 'sortable': True, 'align': 'center'},
             {'name': 'type', 'label': 'نوع العملية', 'field': 'operation_type', 'align': 'center'},
             {'name': 'item', 'label': 'اسم المنتج/الخامة', 'field': 'item_name', 'align': 'left'},
             {'name': 'quantity', 'label': 'الكمية', 'field': 'quantity', 'align': 'center'},
-            {'name': 'price', 'label': 'التكلفة', 'field': 'total_price', 'align': 'center'},
+            {'name': 'price', 'label': 'التكلفة', 'field': 'total_price', 'sortable': True, 'align': 'center'},
             {'name': 'customer', 'label': 'صاحب العملية', 'field': 'customer_name', 'align': 'left'},
         ]
-        table = ui.table(columns=columns, rows=operations, row_key='id').classes('w-full shadow-lg')
+        sort_keys = {'date': 'date', 'price': 'total_price'}
+        # Only the visible page is fetched. Pages are keyset cursors into the log,
+        # remembered per query so next/previous never re-scan what came before.
+        state = {'query': None, 'total': 0}
+        page_cursors = {}  # page number -> (first row cursor, last row cursor)
+
+        table = ui.table(columns=columns, rows=[], row_key='id', pagination={
+            'page': 1, 'rowsPerPage': 25, 'sortBy': 'date', 'descending': True, 'rowsNumber': 0,
+        }).classes('w-full shadow-lg')
+
+        async def load_page(pagination, search):
+            sort_by = sort_keys.get(pagination.get('sortBy'), 'date')
+            descending = pagination.get('descending', True) if pagination.get('sortBy') else True
+            per_page = pagination.get('rowsPerPage') or 25
+            operation_type = type_select.value
+            query = (sort_by, descending, per_page, search or '', operation_type)
+            if query != state['query']:
+                state['query'] = query
+                page_cursors.clear()
+                state['total'] = await services.adb.count_operations(search, operation_type)
+            total = state['total']
+            last_page = max(1, -(-total // per_page))
+            page = min(max(1, pagination.get('page', 1)), last_page)
+
+            options = dict(sort_by=sort_by, descending=descending, search=search, operation_type=operation_type)
+            if page == 1:
+                rows = await services.adb.get_operations_page(per_page, **options)
+            elif page - 1 in page_cursors:
+                rows = await services.adb.get_operations_page(per_page, after=page_cursors[page - 1][1], **options)
+            elif page + 1 in page_cursors:
+                rows = await services.adb.get_operations_page(per_page, before=page_cursors[page + 1][0], **options)
+            elif page == last_page:
+                # The tail of the log is the head of the opposite order
+                options['descending'] = not descending
+                rows = (await services.adb.get_operations_page(total - (last_page - 1) * per_page, **options))[::-1]
+            else:
+                page = 1
+                rows = await services.adb.get_operations_page(per_page, **options)
+            if rows:
+                page_cursors[page] = (services.db.operation_cursor(rows[0], sort_by), services.db.operation_cursor(rows[-1], sort_by))
+
+            table.rows = rows
+            table.pagination = {**pagination, 'page': page, 'rowsPerPage': per_page, 'rowsNumber': total}
+            table.update()
+
+        async def on_request(e):
+            await load_page(e.args['pagination'], e.args.get('filter'))
+
+        async def reload():
+            await load_page({**table.pagination, 'page': 1}, table.filter)
+
+        table.on('request', on_request)
+        with table.add_slot('top-left'):
+            type_select = ui.select(options={'': 'كل العمليات', 'بيع': 'بيع', 'استرجاع': 'استرجاع', 'تالف': 'تالف'},
+                                    value='', on_change=reload).props('dense').classes('w-40')
         with table.add_slot('top-right'):
-            with ui.input(placeholder='ابحث...').props('dense clearable').bind_value(table, 'filter') as filter_input:
+            with ui.input(placeholder='ابحث...').props('dense clearable debounce=300').bind_value(table, 'filter') as filter_input:
                 with filter_input.add_slot('append'):
                     ui.icon('search')
-    shop_ui.create_chat_button()
-    shop_ui.create_chat_interface()
+        await reload()
+    shop_ui.create_chat()
 
 import time
 import webbrowser
@@ -727,6 +813,12 @@ def open_browser():
     time.sleep(2)  
     webbrowser.open("http://127.0.0.1:8080/home")
 
+# Open (and migrate) the database as the server starts, then check the chatbot
+# API in the background rather than before the server can start
+app.on_startup(lambda: services.db)
+app.on_startup(lambda: background_tasks.create(services.probe_chatbot(), name='probe_chatbot'))
+app.on_shutdown(services.close)
+
 # --- Main App Execution ---
 if __name__ in {"__main__", "__mp_main__"}:
     LOGGING_CONFIG = {
@@ -6,6 +6,8 @@ from PyInstaller.utils.hooks import collect_data_files, collect_submodules
 datas = collect_data_files('nicegui')
 # Add the icon file to datas
 datas += [('icon.png', '.')]
+# Vue components of the app's own elements
+datas += [('src/GUI/*.js', 'src/GUI')]
 
 # Collect all submodules from the 'src' directory
 hiddenimports = collect_submodules('src')
@@ -0,0 +1,87 @@
+"""Dashboard analytics latency: legacy six-query + top-sellers implementation vs get_analytics_data.
+
+Usage:
+    python benchmarks/bench_analytics.py [--operations 500000] [--repeat 10]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from src.database.Timestamps import to_timestamp  # noqa: E402
+from bench_connection_pool import populate  # noqa: E402
+
+LEGACY_QUERIES = [
+    """SELECT SUM(CASE WHEN operation_type = 'بيع' THEN total_price ELSE 0 END) -
+              SUM(CASE WHEN operation_type = 'استرجاع' THEN total_price ELSE 0 END)
+       FROM operations WHERE product_id IS NOT NULL AND ts BETWEEN ? AND ?""",
+    """SELECT SUM(CASE WHEN o.operation_type = 'بيع' THEN o.quantity * p.purchase_price ELSE 0 END) -
+              SUM(CASE WHEN o.operation_type = 'استرجاع' THEN o.quantity * p.purchase_price ELSE 0 END)
+       FROM operations o JOIN products p ON o.product_id = p.id
+       WHERE o.product_id IS NOT NULL AND o.ts BETWEEN ? AND ?""",
+    """SELECT SUM(o.quantity * p.purchase_price) FROM operations o JOIN products p ON o.product_id = p.id
+       WHERE o.operation_type = 'تالف' AND o.product_id IS NOT NULL AND o.ts BETWEEN ? AND ?""",
+    """SELECT SUM(CASE WHEN operation_type = 'بيع' THEN total_price ELSE 0 END) -
+              SUM(CASE WHEN operation_type = 'استرجاع' THEN total_price ELSE 0 END)
+       FROM operations WHERE laser_material_id IS NOT NULL AND ts BETWEEN ? AND ?""",
+    """SELECT SUM(CASE WHEN o.operation_type = 'بيع' THEN o.quantity * lm.purchase_price ELSE 0 END) -
+              SUM(CASE WHEN o.operation_type = 'استرجاع' THEN o.quantity * lm.purchase_price ELSE 0 END)
+       FROM operations o JOIN laser_materials lm ON o.laser_material_id = lm.id
+       WHERE o.laser_material_id IS NOT NULL AND o.ts BETWEEN ? AND ?""",
+    """SELECT SUM(o.quantity * lm.purchase_price) FROM operations o JOIN laser_materials lm ON o.laser_material_id = lm.id
+       WHERE o.operation_type = 'تالف' AND o.laser_material_id IS NOT NULL AND o.ts BETWEEN ? AND ?""",
+    """SELECT p.name, SUM(CASE WHEN o.operation_type = 'بيع' THEN o.quantity ELSE 0 END) -
+              SUM(CASE WHEN o.operation_type = 'استرجاع' THEN o.quantity ELSE 0 END) as total_sold
+       FROM operations o JOIN products p ON o.product_id = p.id WHERE o.ts BETWEEN ? AND ?
+       GROUP BY p.name HAVING total_sold > 0 ORDER BY total_sold DESC LIMIT 5""",
+    """SELECT lm.name || ' (' || lm.material_side || ')' as name,
+              SUM(CASE WHEN o.operation_type = 'بيع' THEN o.quantity ELSE 0 END) -
+              SUM(CASE WHEN o.operation_type = 'استرجاع' THEN o.quantity ELSE 0 END) as total_sold
+       FROM operations o JOIN laser_materials lm ON o.laser_material_id = lm.id WHERE o.ts BETWEEN ? AND ?
+       GROUP BY lm.name, lm.material_side HAVING total_sold > 0 ORDER BY total_sold DESC LIMIT 5""",
+]
+
+
+def legacy_analytics(db: DatabaseHandler, start: str, end: str):
+    conn = db.pool.connection()
+    bounds = (to_timestamp(start), to_timestamp(end))
+    return [conn.execute(sql, bounds).fetchall() for sql in LEGACY_QUERIES]
+
+
+def timed(fn, repeat: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    today = datetime.now()
+    end = today.strftime("%Y-%m-%d 23:59:59")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(os.path.join(tmp, "bench.db"))
+        print(f"Populating {args.operations} operations...")
+        populate(db, args.operations)
+
+        print(f"{'range':<10} {'legacy':>12} {'current':>12} {'speed-up':>9}")
+        for days in (1, 30, 365):
+            start = (today - timedelta(days=days)).strftime("%Y-%m-%d 00:00:00")
+            legacy = timed(lambda: legacy_analytics(db, start, end), args.repeat)
+            current = timed(lambda: db.get_analytics_data(start, end), args.repeat)
+            print(f"{days:>4} days  {legacy:9.2f} ms {current:9.2f} ms {legacy / current:8.1f}x")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Event-loop stalls while several clients load pages: blocking DatabaseHandler calls vs AsyncDatabaseHandler.
+
+A heartbeat task ticks every millisecond on the event loop; its worst delay is
+how long every other connected client was frozen.
+
+Usage:
+    python benchmarks/bench_async_db.py [--operations 200000] [--clients 8]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.database.AsyncDatabaseHandler import AsyncDatabaseHandler  # noqa: E402
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from bench_connection_pool import populate  # noqa: E402
+
+START, END = "2000-01-01 00:00:00", "2100-01-01 00:00:00"
+
+
+def page_load(db: DatabaseHandler):
+    """The reads behind the dashboard, inventory and a history search after a sale."""
+    db.cache.bump()
+    db.get_analytics_data(START, END)
+    db.get_all_products()
+    db.count_operations("customer 1")
+    db.get_operations_page(25, search="customer 1")
+
+
+async def async_page_load(adb: AsyncDatabaseHandler):
+    adb.db.cache.bump()
+    await adb.get_analytics_data(START, END)
+    await adb.get_all_products()
+    await adb.count_operations("customer 1")
+    await adb.get_operations_page(25, search="customer 1")
+
+
+async def blocking_handler(db: DatabaseHandler):
+    page_load(db)
+
+
+async def measure(handlers) -> tuple:
+    stalls = []
+    done = asyncio.Event()
+
+    async def heartbeat():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stalls.append(time.perf_counter() - t0 - 0.001)
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.01)
+    t0 = time.perf_counter()
+    await asyncio.gather(*handlers)
+    elapsed = time.perf_counter() - t0
+    done.set()
+    await beat
+    return elapsed * 1000, max(stalls) * 1000
+
+
+async def run(db: DatabaseHandler, clients: int):
+    adb = AsyncDatabaseHandler(db)
+    page_load(db)  # warm up
+    for name, make in (("blocking", lambda: blocking_handler(db)), ("async facade", lambda: async_page_load(adb))):
+        elapsed, stall = await measure([make() for _ in range(clients)])
+        print(f"  {name:14} total {elapsed:8.1f} ms   worst event-loop stall {stall:8.1f} ms")
+    adb.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", type=int, default=200_000)
+    parser.add_argument("--clients", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(os.path.join(tmp, "bench.db"))
+        populate(db, args.operations, products=2000)
+        print(f"{args.clients} clients loading pages over {args.operations} operations")
+        asyncio.run(run(db, args.clients))
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
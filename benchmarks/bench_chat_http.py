@@ -0,0 +1,219 @@
+"""Chat request latency: a new HTTP session per question vs ChatBot's pooled keep-alive client.
+
+Runs against a local stand-in for the OpenRouter completions endpoint that
+answers immediately (StandIn, also used by bench_chat_stream.py), so the difference is connection setup (TCP + TLS). With
+openssl on PATH the stand-in speaks HTTPS with a throwaway self-signed
+certificate; otherwise it falls back to plain HTTP. --connect-delay adds a
+pause to each new connection to model the network round trips a real
+handshake pays.
+
+Usage:
+    python benchmarks/bench_chat_http.py [--questions 50] [--connect-delay 0]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ChatBot.ChatBot import ChatBot  # noqa: E402
+from src.ChatBot.ResponseCache import ResponseCache  # noqa: E402
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from src.Services import services  # noqa: E402
+
+class StandIn(BaseHTTPRequestHandler):
+    """Answers every completion with `tokens`, generated at `token_delay` seconds each.
+
+    When the request offers tools and `tool_calls` is set ([(name, arguments)]),
+    the first round asks for those calls instead (streamed in fragments, as
+    OpenRouter does) and the answer follows once the results are sent back.
+    With `reject_tools` a request offering tools gets OpenRouter's 404 for
+    models without tool support. `stall` holds every answer back that many
+    seconds, and a `status` other than 200 answers with that error. With
+    `max_concurrent` set, a request arriving while that many are being
+    answered gets a 429 with `retry_after` as its Retry-After header (counted
+    in `rate_limited`). The size of every request body is appended to
+    `request_bytes`.
+    """
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+    connect_delay = 0.0
+    tokens = ["تمام"]
+    token_delay = 0.0
+    tool_calls = []
+    reject_tools = False
+    stall = 0.0
+    status = 200
+    max_concurrent = 0
+    retry_after = "1"
+    rate_limited = []
+    request_bytes = []
+    _active = 0
+    _active_lock = threading.Lock()
+
+    def setup(self):
+        time.sleep(self.connect_delay)
+        super().setup()
+
+    def handle(self):
+        try:
+            if isinstance(self.request, ssl.SSLSocket):
+                # Handshake here, not in accept(): one stalled client mustn't hold up the others
+                self.request.do_handshake()
+            super().handle()
+        except (ConnectionError, ssl.SSLError):
+            pass  # the client hung up mid-answer (a stopped or abandoned request)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.request_bytes.append(len(body))
+        request = json.loads(body or b"{}")
+        with StandIn._active_lock:
+            busy = self.max_concurrent and StandIn._active >= self.max_concurrent
+            if not busy:
+                StandIn._active += 1
+        if busy:
+            self.rate_limited.append(len(body))
+            completion = json.dumps({"error": {"message": "Rate limit exceeded", "code": 429}}).encode()
+            return self._send(429, completion, {"Retry-After": self.retry_after})
+        try:
+            self._answer(request)
+        finally:
+            with StandIn._active_lock:
+                StandIn._active -= 1
+
+    def _answer(self, request: dict):
+        time.sleep(self.stall)
+        if self.status != 200:
+            return self._send(self.status, json.dumps({"error": {"message": "stand-in error", "code": self.status}}).encode())
+        if request.get("tools") and self.reject_tools:
+            return self._send(404, json.dumps({"error": {"message": "No endpoints found that support tool use", "code": 404}}).encode())
+        calls = []
+        if request.get("tools") and not any(m.get("role") == "tool" for m in request.get("messages", [])):
+            calls = [
+                {"id": f"call_{i}", "type": "function", "function": {"name": name, "arguments": json.dumps(arguments, ensure_ascii=False)}}
+                for i, (name, arguments) in enumerate(self.tool_calls)
+            ]
+        if request.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self._chunk(b": OPENROUTER PROCESSING\n\n")
+            if calls:
+                for i, call in enumerate(calls):
+                    arguments = call["function"]["arguments"]
+                    half = len(arguments) // 2
+                    for fragment in ({"id": call["id"], "type": "function", "function": {"name": call["function"]["name"], "arguments": arguments[:half]}},
+                                     {"function": {"arguments": arguments[half:]}}):
+                        self._event({"choices": [{"delta": {"tool_calls": [dict(fragment, index=i)]}}]})
+            else:
+                for token in self.tokens:
+                    time.sleep(self.token_delay)
+                    self._event({"choices": [{"delta": {"content": token}}]})
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+            return
+        if calls:
+            return self._send(200, json.dumps({"choices": [{"message": {"content": None, "tool_calls": calls}}]}).encode())
+        time.sleep(self.token_delay * len(self.tokens))
+        self._send(200, json.dumps({"choices": [{"message": {"content": "".join(self.tokens)}}]}).encode())
+
+    def _send(self, status: int, completion: bytes, headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(completion)))
+        self.end_headers()
+        self.wfile.write(completion)
+
+    def _event(self, event: dict):
+        self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(tmp: str, connect_delay: float):
+    StandIn.connect_delay = connect_delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    scheme, client_ssl = "http", None
+    if shutil.which("openssl"):
+        cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=localhost", "-addext", "subjectAltName=IP:127.0.0.1",
+                        "-keyout", key, "-out", cert], check=True, capture_output=True)
+        server_ssl = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_ssl.load_cert_chain(cert, key)
+        server.socket = server_ssl.wrap_socket(server.socket, server_side=True, do_handshake_on_connect=False)
+        scheme, client_ssl = "https", ssl.create_default_context(cafile=cert)
+        os.environ["SSL_CERT_FILE"] = cert  # trusted by ChatBot's client
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/api/v1/chat/completions", client_ssl
+
+
+async def session_per_question(url: str, client_ssl, questions: int) -> list:
+    """What ChatBot.get_response used to do: a fresh aiohttp session for every message."""
+    import aiohttp
+    timings = []
+    for _ in range(questions):
+        t0 = time.perf_counter()
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json={"messages": []}, ssl=client_ssl) as resp:
+                await resp.text()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return timings
+
+
+async def pooled(url: str, questions: int) -> list:
+    bot = ChatBot(api_key="benchmark")
+    bot.base_url = url
+    bot.cache = ResponseCache(max_entries=0)  # time the requests, not cached answers
+    timings = []
+    for _ in range(questions):
+        t0 = time.perf_counter()
+        reply = await bot.get_response("ربح المحل")
+        timings.append((time.perf_counter() - t0) * 1000)
+        assert reply == "تمام", reply
+    await bot.aclose()
+    return timings
+
+
+def report(name: str, timings: list):
+    print(f"  {name:22} first {timings[0]:7.2f} ms   follow-ups median {statistics.median(timings[1:]):7.2f} ms"
+          f"   p95 {sorted(timings[1:])[int(len(timings[1:]) * 0.95) - 1]:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--connect-delay", type=float, default=0, help="ms added to every new connection")
+    args = parser.parse_args()
+
+    for proxy in ("HTTPS_PROXY", "https_proxy", "HTTP_PROXY", "http_proxy", "ALL_PROXY", "all_proxy"):
+        os.environ.pop(proxy, None)
+    with tempfile.TemporaryDirectory() as tmp:
+        server, url, client_ssl = start_server(tmp, args.connect_delay / 1000)
+        services.configure(db=DatabaseHandler(os.path.join(tmp, "bench.db")))
+        print(f"{args.questions} questions to {url}")
+        report("session per question", asyncio.run(session_per_question(url, client_ssl, args.questions)))
+        report("pooled ChatBot client", asyncio.run(pooled(url, args.questions)))
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Time to the first words of a chat answer while the API degrades: ChatBot alone vs ChatRouter.
+
+Runs against the local API stand-in (see bench_chat_http.py) through four
+phases: healthy, stalled (every answer held back --stall seconds, a flaky
+uplink), rate limited (429) and recovered. "ChatBot" waits for the API
+whatever it does; "ChatRouter" gives it --deadline seconds, answers from
+LocalChatBot otherwise, and stops asking a failing API until a probe
+succeeds. Answer caches are off, so every question is a request.
+
+Usage:
+    python benchmarks/bench_chat_router.py [--questions 10] [--stall 3] [--deadline 0.5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ChatBot.ChatBot import ChatBot, LocalChatBot  # noqa: E402
+from src.ChatBot.ChatRouter import ChatRouter, CircuitBreaker  # noqa: E402
+from src.ChatBot.ResponseCache import ResponseCache  # noqa: E402
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from src.Services import services  # noqa: E402
+from bench_chat_http import StandIn, start_server  # noqa: E402
+from bench_connection_pool import populate  # noqa: E402
+
+# (phase, StandIn.stall multiplier, StandIn.status)
+PHASES = [("healthy", 0, 200), ("stalled", 1, 200), ("rate limited", 0, 429), ("recovered", 0, 200)]
+
+
+async def first_words(bot, message: str) -> float:
+    t0 = time.perf_counter()
+    async for _ in bot.stream_response(message):
+        break
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--stall", type=float, default=3.0)
+    parser.add_argument("--deadline", type=float, default=0.5)
+    args = parser.parse_args()
+
+    for proxy in ("HTTPS_PROXY", "https_proxy", "HTTP_PROXY", "http_proxy", "ALL_PROXY", "all_proxy"):
+        os.environ.pop(proxy, None)
+    with tempfile.TemporaryDirectory() as tmp:
+        server, url, _ = start_server(tmp, 0)
+        StandIn.tokens = ["تمام"] * 5
+        db = DatabaseHandler(os.path.join(tmp, "bench.db"))
+        populate(db, 5000)
+        services.configure(db=db)
+
+        def bot(name: str):
+            remote = ChatBot(api_key="benchmark", tools=False)
+            remote.base_url = url
+            remote.cache = ResponseCache(max_entries=0)
+            if name == "ChatBot":
+                return remote
+            local = LocalChatBot()
+            local.cache = ResponseCache(max_entries=0)
+            return ChatRouter(remote, local, deadline=args.deadline, breaker=CircuitBreaker(backoff=args.deadline))
+
+        async def run(name: str):
+            chatbot = bot(name)
+            print(f"{name}:")
+            for phase, stall, status in PHASES:
+                StandIn.stall, StandIn.status = stall * args.stall, status
+                timings = [await first_words(chatbot, f"ربح المحل {i}") for i in range(args.questions)]
+                print(f"  {phase:13} first words p50 {statistics.median(timings):>8.1f} ms, max {max(timings):>8.1f} ms")
+                if phase != "recovered" and isinstance(chatbot, ChatRouter):
+                    # Let the backoff pass so the next phase starts with a probe
+                    await asyncio.sleep(chatbot.breaker.retry_in())
+            if isinstance(chatbot, ChatRouter):
+                print(f"  {chatbot.stats()}")
+            await chatbot.aclose()
+
+        async def both():
+            for name in ("ChatBot", "ChatRouter"):
+                await run(name)
+        asyncio.run(both())
+        asyncio.run(services.close())
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Several tabs chatting against a rate-limited API: every question sent at once vs through RequestScheduler.
+
+Runs against the local API stand-in (see bench_chat_http.py), which answers
+at most --api-limit requests at a time and refuses the rest with a 429 and
+"Retry-After: --retry-after". --tabs tabs each ask --questions questions,
+all starting together; every other question is the same popular one, and
+every third is preceded by a question the user replaces before it is
+answered. "unscheduled" sends every question as its own request the
+moment it is asked and shows a 429 as an error (what ChatBot did before);
+"scheduled" goes through RequestScheduler (--concurrency requests at once,
+identical questions shared, 429s retried). Answer caches are off.
+
+Usage:
+    python benchmarks/bench_chat_scheduler.py [--tabs 12] [--questions 6] [--api-limit 4] [--concurrency 3]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import aclosing
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ChatBot.ChatBot import ChatBot  # noqa: E402
+from src.ChatBot.RequestScheduler import RequestScheduler  # noqa: E402
+from src.ChatBot.ResponseCache import ResponseCache  # noqa: E402
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from src.Services import services  # noqa: E402
+from bench_chat_http import StandIn, start_server  # noqa: E402
+
+POPULAR = "ربح المحل النهارده"
+
+
+class Unscheduled(RequestScheduler):
+    """Every question is its own request, sent right away; a 429 is the answer."""
+
+    def __init__(self):
+        super().__init__(max_concurrent=1_000_000, max_retries=0)
+
+    async def shared(self, key, request):
+        async with aclosing(request()) as pieces:
+            async for piece in pieces:
+                yield piece
+
+
+async def ask(bot: ChatBot, question: str, results: list):
+    t0 = time.perf_counter()
+    reply = "".join([piece async for piece in bot.stream_response(question)])
+    results.append(((time.perf_counter() - t0) * 1000, reply.startswith("❌")))
+
+
+async def tab(number: int, bot: ChatBot, questions: int, results: list):
+    scheduler = bot.scheduler
+    for i in range(questions):
+        if i % 3 == 2:
+            # Asked, then replaced by the real question before it was answered
+            scheduler.submit(number, ask(bot, f"سؤال اتلغى {number}-{i}", []))
+            await asyncio.sleep(0.02)
+        question = POPULAR if i % 2 == 0 else f"كام قطعة من منتج {number}-{i}"
+        try:
+            await scheduler.submit(number, ask(bot, question, results))
+        except asyncio.CancelledError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tabs", type=int, default=12)
+    parser.add_argument("--questions", type=int, default=6)
+    parser.add_argument("--api-limit", type=int, default=4)
+    parser.add_argument("--retry-after", default="0.5")
+    parser.add_argument("--concurrency", type=int, default=3)
+    args = parser.parse_args()
+
+    for proxy in ("HTTPS_PROXY", "https_proxy", "HTTP_PROXY", "http_proxy", "ALL_PROXY", "all_proxy"):
+        os.environ.pop(proxy, None)
+    with tempfile.TemporaryDirectory() as tmp:
+        server, url, _ = start_server(tmp, 0)
+        StandIn.tokens, StandIn.token_delay = ["تمام"] * 10, 0.03
+        StandIn.max_concurrent, StandIn.retry_after = args.api_limit, args.retry_after
+        db = DatabaseHandler(os.path.join(tmp, "bench.db"))
+        services.configure(db=db)
+
+        async def run(name: str, scheduler: RequestScheduler):
+            bot = ChatBot(api_key="benchmark", tools=False, scheduler=scheduler)
+            bot.base_url = url
+            bot.cache = ResponseCache(max_entries=0)
+            StandIn.request_bytes.clear()
+            StandIn.rate_limited.clear()
+            results = []
+            t0 = time.perf_counter()
+            await asyncio.gather(*(tab(n, bot, args.questions, results) for n in range(args.tabs)))
+            wall = time.perf_counter() - t0
+            timings = sorted(ms for ms, _ in results)
+            errors = sum(failed for _, failed in results)
+            print(f"{name}:")
+            print(f"  {len(StandIn.request_bytes)} API requests, {len(StandIn.rate_limited)} refused (429), "
+                  f"{len(results) - errors}/{len(results)} answered, {errors} shown as errors, {wall:.1f} s in all")
+            print(f"  answer time p50 {statistics.median(timings):.0f} ms, "
+                  f"p95 {timings[max(0, -(-95 * len(timings) // 100) - 1)]:.0f} ms")
+            print(f"  {scheduler.stats()}")
+            await bot.aclose()
+
+        async def both():
+            await run("unscheduled", Unscheduled())
+            await run("scheduled", RequestScheduler(max_concurrent=args.concurrency, backoff=0.2))
+        asyncio.run(both())
+        asyncio.run(services.close())
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Chat memory as conversations get longer and more tabs connect: resending everything vs ChatSession.
+
+"resend all" is what a chat that keeps every turn would send the model
+with each question; "session" is ChatSession.messages() (the newest turns
+within budget plus a summary of the rest). Prompt history size is in
+estimated tokens (ContextBuilder.estimate_tokens). Then --clients tabs
+each ask --turns questions through one ChatSessions registry persisted to a
+temporary ChatHistory. This reports the memory the registry holds
+(tracemalloc), the size of the history file and the cost of writing a turn.
+
+Usage:
+    python benchmarks/bench_chat_sessions.py [--turns 1000] [--clients 500] [--answer-chars 600]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ChatBot.ChatSession import ChatSession, ChatSessions  # noqa: E402
+from src.ChatBot.ContextBuilder import estimate_tokens  # noqa: E402
+from src.database.ChatHistory import ChatHistory  # noqa: E402
+
+
+def turn(i: int, answer_chars: int) -> tuple:
+    return f"كام باقي من منتج {i} عند المورد؟", (f"منتج {i}: متوفر {i % 40} قطعة. " * answer_chars)[:answer_chars]
+
+
+def tokens(messages) -> int:
+    return sum(estimate_tokens(m["content"]) for m in messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--answer-chars", type=int, default=600)
+    args = parser.parse_args()
+
+    session, everything = ChatSession("bench"), []
+    checkpoints = {n for n in (1, 10, 100, 1000, 10000) if n <= args.turns} | {args.turns}
+    print(f"{'turns':>7} {'resend all tokens':>18} {'session tokens':>15}")
+    for i in range(1, args.turns + 1):
+        question, answer = turn(i, args.answer_chars)
+        session.add(question, answer)
+        everything += [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+        if i in checkpoints:
+            print(f"{i:>7} {tokens(everything):>18} {tokens(session.messages()):>15}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ChatHistory(os.path.join(tmp, "chat_history.db"))
+        tracemalloc.start()
+        sessions = ChatSessions(store)
+        writes = []
+        per_client = max(1, args.turns // 10)
+        for c in range(args.clients):
+            s = sessions.get(f"tab-{c}")
+            for i in range(per_client):
+                t0 = time.perf_counter()
+                s.add(*turn(i, args.answer_chars))
+                writes.append((time.perf_counter() - t0) * 1000)
+        held = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        t0 = time.perf_counter()
+        reloaded = ChatSession("tab-0", store)
+        reload_ms = (time.perf_counter() - t0) * 1000
+        size = sum(os.path.getsize(path) for path in (store.db_name, store.db_name + "-wal") if os.path.exists(path))
+        print(f"\n{args.clients} tabs x {per_client} turns: {len(sessions)} sessions live "
+              f"(max {sessions.max_sessions}), {held / 1e6:.1f} MB held, history file {size / 1e6:.1f} MB")
+        print(f"  write a turn p50 {statistics.median(writes):.2f} ms, "
+              f"reopen a tab {reload_ms:.2f} ms ({len(reloaded.turns)} turns + summary)")
+        sessions.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Perceived chat latency: waiting for the whole completion vs streaming tokens.
+
+The local stand-in (see bench_chat_http.py) generates --tokens tokens at
+--token-delay ms each, like a model would. "first text" is when the chat
+panel can show something; "complete" is when the reply is finished.
+
+Usage:
+    python benchmarks/bench_chat_stream.py [--tokens 120] [--token-delay 20] [--questions 5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ChatBot.ChatBot import ChatBot  # noqa: E402
+from src.ChatBot.ResponseCache import ResponseCache  # noqa: E402
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from src.Services import services  # noqa: E402
+from bench_chat_http import StandIn, start_server  # noqa: E402
+
+
+async def measure(url: str, questions: int) -> dict:
+    bot = ChatBot(api_key="benchmark")
+    bot.base_url = url
+    bot.cache = ResponseCache(max_entries=0)  # time the requests, not cached answers
+    await bot.get_response("تسخين")  # open the pooled connection first
+    results = {"get_response": ([], []), "stream_response": ([], [])}
+    for _ in range(questions):
+        t0 = time.perf_counter()
+        reply = await bot.get_response("ربح المحل")
+        elapsed = (time.perf_counter() - t0) * 1000
+        results["get_response"][0].append(elapsed)
+        results["get_response"][1].append(elapsed)
+
+        t0, first, streamed = time.perf_counter(), None, ""
+        async for piece in bot.stream_response("ربح المحل"):
+            if first is None:
+                first = (time.perf_counter() - t0) * 1000
+            streamed += piece
+        results["stream_response"][0].append(first)
+        results["stream_response"][1].append((time.perf_counter() - t0) * 1000)
+        assert streamed.strip() == reply
+    await bot.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=120)
+    parser.add_argument("--token-delay", type=float, default=20, help="ms per generated token")
+    parser.add_argument("--questions", type=int, default=5)
+    args = parser.parse_args()
+
+    StandIn.tokens = [f"كلمة{i} " for i in range(args.tokens)]
+    StandIn.token_delay = args.token_delay / 1000
+    for proxy in ("HTTPS_PROXY", "https_proxy", "HTTP_PROXY", "http_proxy", "ALL_PROXY", "all_proxy"):
+        os.environ.pop(proxy, None)
+    with tempfile.TemporaryDirectory() as tmp:
+        server, url, _ = start_server(tmp, 0)
+        services.configure(db=DatabaseHandler(os.path.join(tmp, "bench.db")))
+        print(f"{args.tokens} tokens at {args.token_delay:g} ms each")
+        for name, (first, complete) in asyncio.run(measure(url, args.questions)).items():
+            print(f"  {name:16} first text {statistics.median(first):8.1f} ms   complete {statistics.median(complete):8.1f} ms")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Chat answers with query tools vs a prebuilt context, as the shop grows.
+
+"context" builds the ContextBuilder context for each question and sends it
+with the prompt; "tools" is a bot with tools enabled, which sends that
+context too when it has rows for the question's words and otherwise only the
+question and the tool definitions. The local API stand-in (see
+bench_chat_http.py) then asks for the lookups a model would need, which
+QueryTools runs before the final answer. "tools,
+cached" asks again in a new chat (no cached answers) while the tool results
+are still cached. Prompt tokens are counted over every request of an answer.
+
+Usage:
+    python benchmarks/bench_chat_tools.py [--scales 500:20000,5000:200000,20000:1000000]
+"""
+import argparse
+import asyncio
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ChatBot.ChatBot import ChatBot  # noqa: E402
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from src.Services import services  # noqa: E402
+from bench_chat_http import StandIn, start_server  # noqa: E402
+from bench_connection_pool import populate  # noqa: E402
+
+# (question, the tool calls a model would make for it)
+QUESTIONS = [
+    ("ربح المحل الشهر ده", [("sales_summary", {"start_date": datetime.now().strftime("%Y-%m-01")})]),
+    ("كام product 17 في المخزون", [("item_stock", {"name": "product 17", "line": "shop"})]),
+    ("آخر مشتريات customer 502", [("customer_purchases", {"customer": "customer 502", "limit": 5})]),
+    ("أكتر خامات ليزر بتتباع", [("top_sellers", {"line": "laser"})]),
+    ("إيه اللي قرب يخلص وربح الأسبوع", [("low_stock", {}), ("sales_summary", {"start_date": "2000-01-01"})]),
+]
+
+
+async def answer_all(url: str, tools: bool) -> tuple:
+    bot = ChatBot(api_key="benchmark", tools=tools)
+    bot.base_url = url
+    timings, tokens = [], []
+    for question, calls in QUESTIONS:
+        StandIn.tool_calls = calls
+        sent = len(StandIn.request_bytes)
+        t0 = time.perf_counter()
+        if tools:
+            reply = await bot.get_response(question)
+        else:
+            context = await services.adb.run(services.context_builder.build, question)
+            reply = await bot.get_response(question, context)
+        timings.append((time.perf_counter() - t0) * 1000)
+        assert not reply.startswith("❌"), reply
+        tokens.append(math.ceil(sum(StandIn.request_bytes[sent:]) / 4))
+    await bot.aclose()
+    return timings, tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="500:20000,5000:200000,20000:1000000")
+    args = parser.parse_args()
+
+    for proxy in ("HTTPS_PROXY", "https_proxy", "HTTP_PROXY", "http_proxy", "ALL_PROXY", "all_proxy"):
+        os.environ.pop(proxy, None)
+    print(f"{'products':>9} {'operations':>11}  {'mode':14} {'answer ms (median)':>19} {'prompt tokens (median / max)':>29}")
+    with tempfile.TemporaryDirectory() as tmp:
+        server, url, _ = start_server(tmp, 0)
+        for scale in args.scales.split(","):
+            products, operations = (int(n) for n in scale.split(":"))
+            db = DatabaseHandler(os.path.join(tmp, f"bench_{products}.db"))
+            populate(db, operations, products=products, materials=max(10, products // 5))
+            services.configure(db=db)
+
+            async def modes():
+                await answer_all(url, tools=False)  # warm the page cache
+                return [("context", await answer_all(url, tools=False)),
+                        ("tools", await answer_all(url, tools=True)),
+                        ("tools, cached", await answer_all(url, tools=True))]
+            for mode, (timings, tokens) in asyncio.run(modes()):
+                print(f"{products:>9} {operations:>11}  {mode:14} {statistics.median(timings):>19.1f} "
+                      f"{statistics.median(tokens):>20.0f} / {max(tokens):>6}")
+            asyncio.run(services.close())
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Recording a multi-line receipt: one add_operation_with_date call per line vs add_operations_batch.
+
+Usage:
+    python benchmarks/bench_checkout.py [--lines 50] [--receipts 50] [--profile balanced]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from bench_connection_pool import populate  # noqa: E402
+
+
+def make_receipt(rng: random.Random, lines: int, products: int, materials: int):
+    receipt = []
+    for _ in range(lines):
+        is_product = rng.random() < 0.8
+        quantity = rng.randint(1, 3)
+        receipt.append({
+            "item_id": rng.randint(1, products if is_product else materials),
+            "item_type": "product" if is_product else "laser",
+            "operation_type": "بيع",
+            "quantity": quantity,
+            "total_price": quantity * 25.0,
+        })
+    return receipt
+
+
+def per_item(db: DatabaseHandler, receipt):
+    for line in receipt:
+        db.add_operation_with_date(
+            line["item_id"], line["item_type"], line["operation_type"], "bench", None,
+            line["quantity"], line["total_price"],
+        )
+
+
+def batched(db: DatabaseHandler, receipt):
+    db.add_operations_batch(receipt, "bench")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=50)
+    parser.add_argument("--receipts", type=int, default=50)
+    parser.add_argument("--operations", type=int, default=100_000, help="history size before the run")
+    parser.add_argument("--profile", default="balanced")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    receipts = [make_receipt(rng, args.lines, 500, 100) for _ in range(args.receipts)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(os.path.join(tmp, "bench.db"), profile=args.profile)
+        populate(db, args.operations)
+
+        results = {}
+        for label, fn in (("per-item", per_item), ("batch", batched)):
+            t0 = time.perf_counter()
+            for receipt in receipts:
+                fn(db, receipt)
+            results[label] = (time.perf_counter() - t0) / len(receipts) * 1000
+            print(f"{label:<10} {results[label]:9.2f} ms per {args.lines}-line receipt")
+        assert not db.verify_daily_summary()
+        db.close()
+    print(f"speed-up   {results['per-item'] / results['batch']:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
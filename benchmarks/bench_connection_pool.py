@@ -0,0 +1,171 @@
+"""Per-call latency of DatabaseHandler with a connect-per-call pattern vs the pooled connection.
+
+Usage:
+    python benchmarks/bench_connection_pool.py [--operations 100000] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from src.database.Timestamps import to_timestamp  # noqa: E402
+
+
+class _Rows:
+    """The rows of a query whose connection is already closed, read like a cursor."""
+
+    def __init__(self, rows: list):
+        self._rows = rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self) -> list:
+        rows, self._rows = self._rows, []
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+class PerCallPool:
+    """Mimics the old behaviour: a fresh default-configured connection for every call, closed after it."""
+
+    def __init__(self, db_name: str):
+        self.db_name = db_name
+        self._open = []
+
+    def connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_name)
+        conn.row_factory = sqlite3.Row
+        self._open.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connection()
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._close(conn)
+
+    def execute(self, sql: str, params=()):
+        # The old handler fetched its rows and closed the connection before returning
+        conn = self.connection()
+        try:
+            return _Rows(conn.execute(sql, params).fetchall())
+        finally:
+            self._close(conn)
+
+    def _close(self, conn: sqlite3.Connection):
+        conn.close()
+        self._open.remove(conn)
+
+    def close_all(self):
+        # Connections handed out bare by connection() (a few maintenance calls)
+        for conn in self._open:
+            conn.close()
+        self._open = []
+
+
+def populate(db: DatabaseHandler, operations: int, products: int = 500, materials: int = 100):
+    rng = random.Random(42)
+    start = to_timestamp(datetime.now() - timedelta(days=365))
+    with db.pool.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO products (name, supplier, purchase_date, purchase_price, sale_price, stock) VALUES (?, ?, ?, ?, ?, ?)",
+            [(f"product {i}", f"supplier {i % 20}", "2025-01-01", 10 + i % 50, 20 + i % 50, 1000) for i in range(products)],
+        )
+        cursor.executemany(
+            "INSERT INTO laser_materials (name, material_side, supplier, purchase_date, purchase_price, sale_price, stock_quantity) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(f"material {i}", "وش" if i % 2 else "ظهر", None, "2025-01-01", 5 + i % 10, 15, 1000) for i in range(materials)],
+        )
+        rows = []
+        for _ in range(operations):
+            is_product = rng.random() < 0.8
+            quantity = rng.randint(1, 5)
+            item_id = rng.randint(1, products) if is_product else rng.randint(1, materials)
+            rows.append((
+                item_id if is_product else None,
+                None if is_product else item_id,
+                rng.choice(['بيع', 'بيع', 'بيع', 'استرجاع', 'تالف']),
+                f"customer {rng.randint(1, 2000)}",
+                None,
+                quantity,
+                quantity * 25.0,
+                start + rng.randint(0, 365 * 86400),
+                (10 + (item_id - 1) % 50) if is_product else (5 + (item_id - 1) % 10),
+                f"product {item_id - 1}" if is_product else f"material {item_id - 1}",
+            ))
+        cursor.executemany(
+            "INSERT INTO operations (product_id, laser_material_id, operation_type, customer_name, customer_phone, quantity, total_price, ts, unit_cost, item_name) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+
+def measure(label: str, fn, repeat: int) -> float:
+    fn()  # warm up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    per_call = (time.perf_counter() - t0) / repeat * 1000
+    print(f"  {label:<32} {per_call:9.3f} ms/call")
+    return per_call
+
+
+def run_suite(db: DatabaseHandler, repeat: int) -> dict:
+    today = datetime.now()
+    start = (today - timedelta(days=30)).strftime("%Y-%m-%d 00:00:00")
+    end = today.strftime("%Y-%m-%d 23:59:59")
+    return {
+        "get_product_by_name_and_price": measure("get_product_by_name_and_price", lambda: db.get_product_by_name_and_price("product 7", 17), repeat),
+        "get_all_products": measure("get_all_products", db.get_all_products, repeat),
+        "update_product_stock": measure("update_product_stock", lambda: db.update_product_stock(1, 0), repeat),
+        "add_operation": measure("add_operation", lambda: db.add_operation(1, 'product', 'استرجاع', "bench", None, 1, 0), repeat),
+        "get_analytics_data (30 days)": measure("get_analytics_data (30 days)", lambda: db.get_analytics_data(start, end), max(1, repeat // 20)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--profile", default="balanced")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(os.path.join(tmp, "bench.db"), profile=args.profile)
+        print(f"Populating {args.operations} operations...")
+        populate(db, args.operations)
+
+        print("Pooled connection:")
+        pooled = run_suite(db, args.repeat)
+
+        pool = db.pool
+        db.pool = PerCallPool(db.db_name)
+        print("Connect per call:")
+        per_call = run_suite(db, args.repeat)
+        db.pool.close_all()
+        db.pool = pool
+        db.close()
+
+    print("Speed-up:")
+    for name, value in pooled.items():
+        print(f"  {name:<32} {per_call[name] / value:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
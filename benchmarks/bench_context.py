@@ -0,0 +1,54 @@
+"""Chat context size and build time as the shop grows: ContextBuilder vs dumping the tables.
+
+For each scale (products:operations) a temporary database is populated; the
+context for a few typical questions is built and compared with the JSON of
+all products and laser materials (what a model would need without retrieval).
+
+Usage:
+    python benchmarks/bench_context.py [--scales 500:20000,5000:200000,20000:1000000] [--budget 800]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ChatBot.ContextBuilder import ContextBuilder, estimate_tokens  # noqa: E402
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from bench_connection_pool import populate  # noqa: E402
+
+QUESTIONS = ["ربح المحل النهارده", "متى اشترى customer 502؟", "كام product 17 في المخزون", "ربح الليزر الشهر ده"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="500:20000,5000:200000,20000:1000000")
+    parser.add_argument("--budget", type=int, default=800)
+    args = parser.parse_args()
+
+    print(f"{'products':>9} {'operations':>11} {'build ms (median)':>18} {'context tokens (max)':>21} {'table dump tokens':>18}")
+    for scale in args.scales.split(","):
+        products, operations = (int(n) for n in scale.split(":"))
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseHandler(os.path.join(tmp, "bench.db"))
+            populate(db, operations, products=products, materials=max(10, products // 5))
+            builder = ContextBuilder(db, budget_tokens=args.budget)
+            timings, sizes = [], []
+            for question in QUESTIONS:
+                builder.build(question)  # warm the page cache
+                t0 = time.perf_counter()
+                context = builder.build(question)
+                timings.append((time.perf_counter() - t0) * 1000)
+                sizes.append(estimate_tokens(context))
+            dump = json.dumps({"products": db.get_all_products(), "laser_materials": db.get_all_laser_materials()},
+                              ensure_ascii=False, separators=(",", ":"))
+            print(f"{products:>9} {operations:>11} {statistics.median(timings):>18.1f} {max(sizes):>21} {estimate_tokens(dump):>18}")
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
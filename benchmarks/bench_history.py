@@ -0,0 +1,57 @@
+"""History page latency: loading the whole log with get_all_operations vs one keyset page.
+
+Usage:
+    python benchmarks/bench_history.py [--operations 500000] [--page-size 25] [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from bench_connection_pool import populate  # noqa: E402
+
+
+def timed(fn, repeat: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", type=int, default=500_000)
+    parser.add_argument("--page-size", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(os.path.join(tmp, "bench.db"))
+        print(f"Populating {args.operations} operations...")
+        populate(db, args.operations)
+
+        # A cursor half-way through the history, as reached by paging forward
+        row = db.pool.execute("SELECT ts, id FROM operations ORDER BY ts DESC, id DESC LIMIT 1 OFFSET ?", (args.operations // 2,)).fetchone()
+        deep_cursor = (row["ts"], row["id"])
+
+        results = {
+            "get_all_operations": timed(db.get_all_operations, 1),
+            "first page": timed(lambda: db.get_operations_page(args.page_size), args.repeat),
+            "middle page": timed(lambda: db.get_operations_page(args.page_size, after=deep_cursor), args.repeat),
+            "first page, by price": timed(lambda: db.get_operations_page(args.page_size, sort_by="total_price"), args.repeat),
+            "first page, type filter": timed(lambda: db.get_operations_page(args.page_size, operation_type="تالف"), args.repeat),
+            "count_operations": timed(db.count_operations, args.repeat),
+        }
+        db.close()
+
+    for name, ms in results.items():
+        print(f"  {name:<26} {ms:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
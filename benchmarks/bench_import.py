@@ -0,0 +1,74 @@
+"""Bulk import throughput: row-at-a-time add_product/update_product_stock vs BulkImport.import_file.
+
+Usage:
+    python benchmarks/bench_import.py [--rows 100000] [--naive-rows 5000]
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.database.BulkImport import import_file, parse_rows, read_rows  # noqa: E402
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+
+
+def write_price_list(path: str, rows: int):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "supplier", "purchase_date", "purchase_price", "sale_price", "stock"])
+        for i in range(rows):
+            # Roughly one row in five restocks an item listed earlier in the file
+            item = i if i % 5 else i // 2
+            writer.writerow([f"item {item}", f"supplier {i % 20}", "2025-01-01", 10 + item % 50, 20 + item % 50, 1 + i % 9])
+
+
+def naive_import(db: DatabaseHandler, path: str, limit: int) -> int:
+    """What the UI form does per row: look up (name, price), then add or restock."""
+    count = 0
+    for row in parse_rows(read_rows(path), "product", {}):
+        if count == limit:
+            break
+        existing = db.get_product_by_name_and_price(row["name"], row["purchase_price"])
+        if existing:
+            db.update_product_stock(existing["id"], row["stock"])
+        else:
+            db.add_product(row["name"], row["supplier"], row["purchase_date"], row["purchase_price"], row["stock"])
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--naive-rows", type=int, default=5_000, help="rows to time for the row-at-a-time path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "prices.csv")
+        write_price_list(path, args.rows)
+
+        db = DatabaseHandler(os.path.join(tmp, "naive.db"))
+        t0 = time.perf_counter()
+        done = naive_import(db, path, args.naive_rows)
+        naive = done / (time.perf_counter() - t0)
+        db.close()
+
+        db = DatabaseHandler(os.path.join(tmp, "bulk.db"))
+        t0 = time.perf_counter()
+        summary = import_file(db, path, "product")
+        elapsed = time.perf_counter() - t0
+        bulk = summary["rows"] / elapsed
+        db.close()
+
+    print(f"row-at-a-time: {naive:10.0f} rows/s ({done} rows)")
+    print(f"import_file:   {bulk:10.0f} rows/s ({summary['rows']} rows in {elapsed:.2f} s, "
+          f"{summary['inserted']} new, {summary['updated']} restocked)")
+    print(f"speed-up:      {bulk / naive:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
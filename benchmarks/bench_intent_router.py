@@ -0,0 +1,114 @@
+"""LocalChatBot message classification: chained keyword scans vs IntentRouter, in messages per second.
+
+"chained any()" is the classification LocalChatBot used to do: an
+any(word in message) scan per keyword list and a split() and stop-word
+list per branch. "IntentRouter" splits the message once and looks each
+piece up in its dict of pieces already seen. "new words" adds a number
+no message had before to each one, so one piece per message is worked
+out afresh. "answers" times whole LocalChatBot answers (routing plus the
+database queries, response cache off) on a temporary database.
+
+Usage:
+    python benchmarks/bench_intent_router.py [--messages 100000] [--operations 50000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ChatBot.ChatBot import LocalChatBot  # noqa: E402
+from src.ChatBot.IntentRouter import IntentRouter  # noqa: E402
+from src.ChatBot.ResponseCache import ResponseCache  # noqa: E402
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from src.Services import services  # noqa: E402
+from bench_connection_pool import populate  # noqa: E402
+
+MESSAGES = [
+    "السلام عليكم", "مساعدة", "ربح المحل النهارده", "ربح الليزر الشهر ده", "منتجات المحل product 17 شاحن",
+    "خامات ليزر material 5 خشب", "متى اشترى customer 502 من المحل؟", "سجل الليزر customer 7 خامة",
+    "شكرا يا أسامة", "ازيك عامل ايه النهارده", "كام قطعة فاضلة من سماعة سامسونج الاصلية في المحل",
+]
+
+
+def chained_any(message: str) -> str:
+    """The old LocalChatBot.get_response branch selection."""
+    message_lower = message.lower().strip()
+    if 'مساعدة' in message_lower or 'help' in message_lower:
+        return 'help'
+    elif any(word in message_lower for word in ['سلام', 'السلام', 'مرحبا', 'أهلا']):
+        return 'greeting'
+    elif any(word in message_lower for word in ['شكرا', 'تسلم', 'ممتاز']):
+        return 'thanks'
+    if any(word in message_lower for word in ['محل', 'بضاعة', 'منتجات']) and not any(word in message_lower for word in ['ليزر', 'laser', 'خامات']):
+        if any(word in message_lower for word in ['ربح', 'مكسب', 'خسارة', 'مبيعات', 'دخل', 'إيراد']):
+            return 'sales'
+        elif len([w for w in message_lower.split() if len(w) > 2]) > 1:
+            [w for w in message_lower.split() if len(w) > 2 and w not in ['محل', 'بضاعة', 'منتجات']]
+            return 'search'
+    if any(word in message_lower for word in ['ليزر', 'laser', 'خامات', 'خامة']):
+        if any(word in message_lower for word in ['ربح', 'مكسب', 'خسارة', 'analytics']):
+            return 'sales'
+        elif len([w for w in message_lower.split() if len(w) > 2]) > 1:
+            [w for w in message_lower.split() if len(w) > 2 and w not in ['ليزر', 'خامة', 'خامات', 'laser', 'وش', 'ظهر']]
+            return 'search'
+    if any(word in message_lower for word in ['متى', 'امتى', 'تاريخ', 'عميل', 'اشترى', 'باع', 'سجل', 'ملاحظات']):
+        if 'ليزر' in message_lower or 'خامة' in message_lower:
+            [w for w in message_lower.split() if len(w) > 2 and w not in ['متى', 'امتى', 'تاريخ', 'عميل', 'اشترى', 'باع', 'سجل', 'ملاحظات', 'ليزر', 'خامة', 'خامات', 'laser']]
+            return 'history'
+        elif 'محل' in message_lower or 'بضاعة' in message_lower:
+            [w for w in message_lower.split() if len(w) > 2 and w not in ['متى', 'امتى', 'تاريخ', 'عميل', 'اشترى', 'باع', 'سجل', 'ملاحظات', 'محل', 'بضاعة']]
+            return 'history'
+    return 'overview'
+
+
+def rate(classify, count: int, runs: int = 5, new_words: bool = False) -> float:
+    """Best of `runs` passes over `count` messages."""
+    messages = (MESSAGES * (count // len(MESSAGES) + 1))[:count]
+    if new_words:
+        messages = [f"{message} {i}" for i, message in enumerate(messages)]
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        for message in messages:
+            classify(message)
+        best = min(best, time.perf_counter() - t0)
+    return count / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--operations", type=int, default=50_000)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    router = IntentRouter()
+    print(f"IntentRouter built in {(time.perf_counter() - t0) * 1000:.2f} ms")
+    print(f"  {'chained any()':14} {rate(chained_any, args.messages):>12,.0f} messages/s")
+    print(f"  {'IntentRouter':14} {rate(router.route, args.messages):>12,.0f} messages/s")
+    print("  new words:")
+    print(f"  {'chained any()':14} {rate(chained_any, args.messages, new_words=True):>12,.0f} messages/s")
+    print(f"  {'IntentRouter':14} {rate(router.route, args.messages, new_words=True):>12,.0f} messages/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(os.path.join(tmp, "bench.db"))
+        populate(db, args.operations)
+        services.configure(db=db)
+        bot = LocalChatBot()
+        bot.cache = ResponseCache(max_entries=0)
+
+        async def answers(count: int) -> float:
+            t0 = time.perf_counter()
+            for i in range(count):
+                await bot.get_response(MESSAGES[i % len(MESSAGES)])
+            return count / (time.perf_counter() - t0)
+        print(f"  {'answers':14} {asyncio.run(answers(len(MESSAGES) * 20)):>12,.0f} messages/s ({args.operations:,} operations)")
+        asyncio.run(services.close())
+
+
+if __name__ == "__main__":
+    main()
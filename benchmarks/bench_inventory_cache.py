@@ -0,0 +1,56 @@
+"""Inventory read latency with the write-versioned cache vs reading SQLite every time.
+
+Usage:
+    python benchmarks/bench_inventory_cache.py [--products 2000] [--materials 500] [--repeat 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from bench_connection_pool import populate  # noqa: E402
+
+
+def interaction(db: DatabaseHandler):
+    """The reads behind opening the receipt page and checking a new product for duplicates."""
+    db.get_all_products()
+    db.get_all_laser_materials()
+    db.get_product_by_name_and_price("product 7", 17)
+    db.get_products_by_name("product 7")
+    db.count_operations()
+
+
+def timed(fn, repeat: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--materials", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(os.path.join(tmp, "bench.db"))
+        populate(db, 10_000, products=args.products, materials=args.materials)
+
+        cached = timed(lambda: interaction(db), args.repeat)
+        # Every interaction preceded by a sale, so every read misses
+        uncached = timed(lambda: (db.cache.bump(), interaction(db)), max(1, args.repeat // 20))
+        print(f"  every read misses        {uncached:9.3f} ms")
+        print(f"  cached                   {cached:9.3f} ms   ({uncached / cached:.0f}x)")
+        print(f"  {db.cache_stats()}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""The manage-inventory product list: a card per product vs the paginated InventoryTable, as the shop grows.
+
+For each --products count a temporary database is populated and the list is
+built inside a NiceGUI client without a browser. "cards" is what the page
+used to render (a card with labels and buttons per product, rebuilt by
+refresh() after every edit); "table" is InventoryTable (one ui.table holding
+the page on screen, one row patched after an edit). Reported: elements
+created, bytes of element data the browser has to receive, time to build
+the list and time from saving an edit to the list being up to date.
+
+Usage:
+    python benchmarks/bench_inventory_page.py [--products 100,1000,10000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from nicegui import Client, ui  # noqa: E402
+from nicegui.page import page  # noqa: E402
+
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from src.GUI.InventoryTable import InventoryTable  # noqa: E402
+from src.Services import services  # noqa: E402
+from bench_connection_pool import populate  # noqa: E402
+
+
+def payload(client: Client) -> int:
+    return sum(len(json.dumps(element._to_dict(), default=str)) for element in client.elements.values())
+
+
+async def cards(product_id: int):
+    with Client(page('/'), request=None) as client:
+        async def products_table():
+            for product in await services.adb.get_all_products():
+                with ui.card().classes('w-full p-4 mb-2'):
+                    with ui.row().classes('w-full justify-between items-center'):
+                        with ui.column():
+                            ui.label(product['name']).classes('font-bold text-lg')
+                            ui.label(f"المورد: {product.get('supplier', 'N/A')} | الكمية: {product['stock']}").classes('text-sm text-gray-600')
+                            ui.label(f"شراء: {product['purchase_price']:.2f} | بيع: {product.get('sale_price', 'N/A') or 'لم يحدد'}").classes('text-sm text-gray-600')
+                        with ui.row():
+                            ui.button(icon='edit', on_click=lambda p=product: None).props('flat round')
+                            ui.button(icon='delete', on_click=lambda p=product: None).props('flat round color=negative')
+        t0 = time.perf_counter()
+        with ui.column() as container:
+            await products_table()
+        build = time.perf_counter() - t0
+        elements, size = len(client.elements), payload(client)
+        t0 = time.perf_counter()
+        await services.adb.update_product(product_id, "edited", "supplier 0", 10, 20, 999, None)
+        # What products_table.refresh() did: drop every card and build them all again
+        container.clear()
+        with container:
+            await products_table()
+        edit = time.perf_counter() - t0
+    return elements, size, build, edit
+
+
+async def table(product_id: int):
+    with Client(page('/'), request=None) as client:
+        t0 = time.perf_counter()
+        products = InventoryTable('product', on_edit=lambda p: None, on_delete=lambda p: None)
+        await products.load_page()
+        build = time.perf_counter() - t0
+        elements, size = len(client.elements), payload(client)
+        t0 = time.perf_counter()
+        await services.adb.update_product(product_id, "edited", "supplier 0", 10, 20, 999, None)
+        await products.patch(product_id)
+        edit = time.perf_counter() - t0
+    return elements, size, build, edit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", default="100,1000,10000")
+    args = parser.parse_args()
+
+    print(f"{'products':>9} {'list':>6} {'elements':>9} {'element data':>13} {'build ms':>9} {'edit ms':>8}")
+    for count in (int(n) for n in args.products.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseHandler(os.path.join(tmp, "bench.db"))
+            populate(db, 0, products=count, materials=10)
+            services.configure(db=db)
+            # The product on the first page in name order, so the patched row is on screen
+            first = db.get_items_page('product', 1)[0]['id']
+            for name, build_list in (("cards", cards), ("table", table)):
+                elements, size, build, edit = asyncio.run(build_list(first))
+                print(f"{count:>9} {name:>6} {elements:>9} {size / 1e3:>11.0f} kB {build * 1000:>9.1f} {edit * 1000:>8.1f}")
+            asyncio.run(services.close())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""LocalChatBot lookups: SQLite FTS5 queries vs the in-memory InvertedIndex, as the shop grows.
+
+For each scale (products:operations) a temporary database is populated and
+the item searches and customer histories LocalChatBot runs are timed both
+ways: "fts" is DatabaseHandler.search / get_operations_page, "index" is
+InvertedIndex.search. Also reported: the one-off index build, its memory
+(tracemalloc, in a separate build) and a lookup right after an item edit,
+which the index patches instead of rebuilding.
+
+Usage:
+    python benchmarks/bench_inverted_index.py [--scales 500:20000,5000:100000,20000:100000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from src.database.InvertedIndex import InvertedIndex  # noqa: E402
+from bench_connection_pool import populate  # noqa: E402
+
+# (words, kind); LocalChatBot searches the full phrase, then each word
+LOOKUPS = [
+    ("product 17", "product"), ("product", "product"), ("supplier 3", "product"), ("material 5", "laser"),
+    ("customer 502", "operation"), ("customer", "operation"), ("product 17", "operation"), ("material", "operation"),
+]
+
+
+def fts(db: DatabaseHandler, text: str, kind: str):
+    if kind == "operation":
+        return db.get_operations_page(limit=5, search=text)
+    return db.search(text, kinds=(kind,), limit=5)[kind]
+
+
+def median_ms(fn, *args, repeat: int = 20) -> float:
+    fn(*args)  # warm the page cache
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="500:20000,5000:100000,20000:100000")
+    args = parser.parse_args()
+
+    for scale in args.scales.split(","):
+        products, operations = (int(n) for n in scale.split(":"))
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseHandler(os.path.join(tmp, "bench.db"))
+            populate(db, operations, products=products, materials=max(10, products // 5))
+
+            tracemalloc.start()
+            InvertedIndex(db).search("x", "product")
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            index = InvertedIndex(db)
+            t0 = time.perf_counter()
+            index.search("x", "product")
+            build = (time.perf_counter() - t0) * 1000
+            print(f"{products} products, {operations} operations: index built in {build:.0f} ms, {size / 1e6:.1f} MB")
+
+            print(f"  {'lookup':24} {'fts ms':>8} {'index ms':>9}")
+            for text, kind in LOOKUPS:
+                print(f"  {text + ' (' + kind + ')':24} {median_ms(fts, db, text, kind):>8.2f} "
+                      f"{median_ms(index.search, text, kind, 5):>9.2f}")
+
+            def edit_and_find(i=[0]):
+                i[0] += 1
+                db.update_product(1, f"renamed {i[0]}", "supplier 0", 10, 20, 1000, None)
+                assert index.search(f"renamed {i[0]}", "product", 5)
+            print(f"  {'edit + lookup':24} {'':>8} {median_ms(edit_and_find):>9.2f}")
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Chatbot answers to repeated questions: computed/requested vs served from ResponseCache.
+
+LocalChatBot answers from a temporary database; ChatBot asks the local API
+stand-in from bench_chat_http.py (--tokens at --token-delay ms each). After
+the repeats, a stock update shows the cache being invalidated.
+
+Usage:
+    python benchmarks/bench_response_cache.py [--products 2000] [--repeat 200]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ChatBot.ChatBot import ChatBot, LocalChatBot  # noqa: E402
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from src.Services import services  # noqa: E402
+from bench_chat_http import StandIn, start_server  # noqa: E402
+from bench_connection_pool import populate  # noqa: E402
+
+QUESTIONS = ["ربح المحل", "منتجات المحل product 7 شاحن", "خامات ليزر خشب ابلكاش", "متى اشترى احمد من المحل؟"]
+
+
+async def ask(bot, message: str, context: str) -> float:
+    t0 = time.perf_counter()
+    await bot.get_response(message, context)
+    return (time.perf_counter() - t0) * 1e6
+
+
+async def run(bot, db: DatabaseHandler, context: str, repeat: int):
+    first = [await ask(bot, q, context) for q in QUESTIONS]
+    # Same questions as staff would retype them
+    repeats = [await ask(bot, f"  {q}؟ ", context) for _ in range(repeat) for q in QUESTIONS]
+    db.update_product_stock(1, 1)
+    after_write = await ask(bot, QUESTIONS[0], context)
+    print(f"  {type(bot).__name__:13} first ask median {statistics.median(first):10.0f} us   "
+          f"repeat median {statistics.median(repeats):7.1f} us   after a stock update {after_write:10.0f} us")
+    print(f"  {'':13} {bot.cache.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--token-delay", type=float, default=10, help="ms per generated token")
+    args = parser.parse_args()
+
+    StandIn.tokens = [f"كلمة{i} " for i in range(args.tokens)]
+    StandIn.token_delay = args.token_delay / 1000
+    for proxy in ("HTTPS_PROXY", "https_proxy", "HTTP_PROXY", "http_proxy", "ALL_PROXY", "all_proxy"):
+        os.environ.pop(proxy, None)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(os.path.join(tmp, "bench.db"))
+        populate(db, 10_000, products=args.products)
+        services.configure(db=db)
+        context = json.dumps({"main_shop": {"total_revenue": 1000, "products_count": args.products}, "laser": {}})
+        server, url, _ = start_server(tmp, 0)
+
+        api_bot = ChatBot(api_key="benchmark")
+        api_bot.base_url = url
+
+        async def both():
+            await run(LocalChatBot(), db, context, args.repeat)
+            await run(api_bot, db, context, max(1, args.repeat // 20))
+            await api_bot.aclose()
+        asyncio.run(both())
+        server.shutdown()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""The sales page item select: every product as an option vs the search-as-you-type ItemPicker, as the shop grows.
+
+For each --products count a temporary database is populated and the product
+select is built inside a NiceGUI client without a browser. "all" is what the
+page used to do (every product loaded into the options, the page reloaded
+after a sale); "picker" is ItemPicker (the first matches loaded, more
+fetched as the cashier types, the sold item's option patched after a sale).
+Reported: time to build the select, bytes of element data the browser has
+to receive, time per typed search (p50/max over a few prefixes) and time
+from saving a sale to the options showing the new stock.
+
+Usage:
+    python benchmarks/bench_sales_page.py [--products 100,10000,100000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from nicegui import Client, ui  # noqa: E402
+from nicegui.page import page  # noqa: E402
+
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from src.GUI.ItemPicker import ItemPicker  # noqa: E402
+from src.Services import services  # noqa: E402
+from bench_connection_pool import populate  # noqa: E402
+
+TYPED = ["p", "pro", "product 1", "product 42", "supplier 7", "Prod", "xyz"]
+
+
+def payload(client: Client) -> int:
+    return sum(len(json.dumps(element._to_dict(), default=str)) for element in client.elements.values())
+
+
+async def sell(product_id: int):
+    await services.adb.add_operations_batch(
+        lines=[{'item_id': product_id, 'item_type': 'product', 'operation_type': 'بيع', 'quantity': 1, 'total_price': 20}],
+        customer_name="bench",
+    )
+
+
+async def all_options(product_id: int):
+    async def build():
+        products = await services.adb.get_all_products()
+        product_options = {p['id']: f"{p['name']} (المتاح: {p['stock']})" for p in products}
+        return ui.select(options=product_options, label='اختر المنتج *').classes('w-full')
+
+    with Client(page('/'), request=None) as client:
+        t0 = time.perf_counter()
+        await build()
+        ready = time.perf_counter() - t0
+        size = payload(client)
+        t0 = time.perf_counter()
+        await sell(product_id)
+    # What ui.navigate.reload() did: the whole page, and so every option, built again
+    with Client(page('/'), request=None):
+        await build()
+    sale = time.perf_counter() - t0
+    # Filtering happened in the browser, over options already sent
+    return ready, size, None, sale
+
+
+async def picker(product_id: int):
+    with Client(page('/'), request=None) as client:
+        t0 = time.perf_counter()
+        products = ItemPicker('product', label='اختر المنتج *')
+        await products.search()
+        ready = time.perf_counter() - t0
+        size = payload(client)
+        searches = []
+        for text in TYPED:
+            t0 = time.perf_counter()
+            await products.search(text)
+            searches.append(time.perf_counter() - t0)
+        await products.search()
+        t0 = time.perf_counter()
+        await sell(product_id)
+        await products.patch(product_id)
+        sale = time.perf_counter() - t0
+    return ready, size, searches, sale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", default="100,10000,100000")
+    args = parser.parse_args()
+
+    print(f"{'products':>9} {'select':>7} {'ready ms':>9} {'element data':>13} {'search p50/max ms':>18} {'after sale ms':>14}")
+    for count in (int(n) for n in args.products.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseHandler(os.path.join(tmp, "bench.db"))
+            populate(db, 0, products=count, materials=10)
+            services.configure(db=db)
+            # The first product in name order, so it is among the picker's options
+            first = db.get_items_page('product', 1)[0]['id']
+            for name, build in (("all", all_options), ("picker", picker)):
+                ready, size, searches, sale = asyncio.run(build(first))
+                typed = (f"{statistics.median(searches) * 1000:.1f}/{max(searches) * 1000:.1f}"
+                         if searches else "in browser")
+                print(f"{count:>9} {name:>7} {ready * 1000:>9.1f} {size / 1e3:>10.0f} kB {typed:>18} {sale * 1000:>14.1f}")
+            asyncio.run(services.close())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Search latency: substring scans (LIKE) vs DatabaseHandler.search over the FTS5 indexes.
+
+Usage:
+    python benchmarks/bench_search.py [--operations 1000000] [--repeat 50]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.database.DatabaseHandler import DatabaseHandler  # noqa: E402
+from src.database.Timestamps import to_timestamp  # noqa: E402
+from bench_connection_pool import populate  # noqa: E402
+
+FIRST_NAMES = ["أحمد", "محمد", "محمود", "مصطفى", "إسلام", "عمر", "يوسف", "كريم", "مريم", "فاطمة", "نور", "سارة", "هدى", "آية"]
+LAST_NAMES = ["السيد", "إبراهيم", "حسن", "علي", "عبدالله", "سالم", "فتحي", "رمضان", "شريف", "منصور", "الشافعي", "النجار"]
+
+
+def populate_customers(db: DatabaseHandler, operations: int):
+    """Operations with realistic customer names and phones (~10k distinct customers)."""
+    rng = random.Random(7)
+    customers = [
+        (f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}", f"01{rng.choice('0125')}{rng.randint(10**7, 10**8 - 1)}")
+        for i in range(10_000)
+    ]
+    start = to_timestamp(datetime.now() - timedelta(days=365))
+    with db.pool.transaction() as cursor:
+        rows = []
+        for _ in range(operations):
+            name, phone = rng.choice(customers)
+            item_id = rng.randint(1, 500)
+            rows.append((item_id, 'بيع', name, phone, 1, 25.0, start + rng.randint(0, 365 * 86400), 10, f"product {item_id - 1}"))
+        cursor.executemany(
+            "INSERT INTO operations (product_id, operation_type, customer_name, customer_phone, quantity, total_price, ts, unit_cost, item_name) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+    return customers
+
+
+def like_search(db: DatabaseHandler, text: str, limit: int = 20):
+    pattern = f"%{text}%"
+    conn = db.pool.connection()
+    return [
+        conn.execute("SELECT * FROM products WHERE name LIKE ? OR supplier LIKE ? OR notes LIKE ? LIMIT ?", (pattern, pattern, pattern, limit)).fetchall(),
+        conn.execute("SELECT * FROM laser_materials WHERE name LIKE ? OR supplier LIKE ? OR notes LIKE ? LIMIT ?", (pattern, pattern, pattern, limit)).fetchall(),
+        conn.execute(
+            "SELECT * FROM operations WHERE item_name LIKE ? OR customer_name LIKE ? OR customer_phone LIKE ? ORDER BY ts DESC LIMIT ?",
+            (pattern, pattern, pattern, limit),
+        ).fetchall(),
+    ]
+
+
+def timed(fn, repeat: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(os.path.join(tmp, "bench.db"))
+        populate(db, 0)
+        print(f"Populating {args.operations} operations...")
+        customers = populate_customers(db, args.operations)
+        name, phone = customers[1234]
+
+        queries = {
+            "full customer name": name,
+            "first name + number": f"{name.split()[0]} {name.split()[-1]}",
+            "phone prefix": phone[:7],
+            "product name": "product 42",
+        }
+        print(f"{'query':<22} {'LIKE scan':>12} {'search()':>12} {'speed-up':>9}")
+        for label, text in queries.items():
+            like = timed(lambda: like_search(db, text), max(1, args.repeat // 10))
+            fts = timed(lambda: db.search(text), args.repeat)
+            print(f"{label:<22} {like:9.2f} ms {fts:9.2f} ms {like / fts:8.1f}x")
+        page = timed(lambda: db.get_operations_page(25, search=name), args.repeat)
+        print(f"history page for one customer: {page:.2f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Cold start: time to import app.py and time until the first page is served.
+
+The app is copied into a temporary directory (with a copy of its database) and
+started on a spare port, so the real data/ is never touched. --offline sets a
+dummy API key and routes HTTPS through a local proxy that accepts connections
+and never answers (a dead network), the situation in which a blocking chatbot
+probe delays startup the most.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--offline] [--tree PATH]
+"""
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def prepare(tree: str, workdir: str, port: int):
+    shutil.copytree(os.path.join(tree, "src"), os.path.join(workdir, "src"),
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    os.makedirs(os.path.join(workdir, "data"))
+    shutil.copy(os.path.join(tree, "data", "venom_shop.db"), os.path.join(workdir, "data"))
+    with open(os.path.join(tree, "app.py"), encoding="utf-8") as f:
+        source = f.read()
+    source = source.replace("port=8080", f"port={port}")
+    source = source.replace("threading.Thread(target=open_browser, daemon=True).start()", "pass")
+    with open(os.path.join(workdir, "app.py"), "w", encoding="utf-8") as f:
+        f.write(source)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_time(workdir: str, env: dict) -> float:
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1]) * 1000
+
+
+def first_page_time(workdir: str, env: dict, port: int, timeout: float = 60) -> float:
+    t0 = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "app.py"], cwd=workdir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/home", timeout=timeout) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - t0) * 1000
+            except OSError:
+                time.sleep(0.05)
+        raise TimeoutError("the app did not serve /home")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--offline", action="store_true")
+    parser.add_argument("--tree", default=ROOT, help="checkout to measure (default: this one)")
+    args = parser.parse_args()
+
+    env = {k: v for k, v in os.environ.items() if k != "OPENROUTER_API_KEY"}
+    env["NO_PROXY"] = "127.0.0.1,localhost"
+
+    # Connections complete in the listen backlog and then hang, like a dead link
+    blackhole = socket.socket()
+    blackhole.bind(("127.0.0.1", 0))
+    blackhole.listen(64)
+    if args.offline:
+        proxy = f"http://127.0.0.1:{blackhole.getsockname()[1]}"
+        env.update(OPENROUTER_API_KEY="offline-benchmark", HTTPS_PROXY=proxy, https_proxy=proxy)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        port = free_port()
+        prepare(args.tree, workdir, port)
+        imports = [import_time(workdir, env) for _ in range(args.repeat)]
+        pages = [first_page_time(workdir, env, port) for _ in range(args.repeat)]
+    blackhole.close()
+    print(f"  import app      median {statistics.median(imports):8.0f} ms   min {min(imports):8.0f} ms")
+    print(f"  first page      median {statistics.median(pages):8.0f} ms   min {min(pages):8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,23 @@
 from dotenv import load_dotenv
 import asyncio
-from typing import Optional, Dict, List
-import aiohttp
+import importlib.util
+from contextlib import aclosing
+from typing import AsyncIterator, Optional, Dict, List, Sequence
 import json
 import os
 from datetime import datetime
-from src.database.DatabaseHandler import DatabaseHandler
-db = DatabaseHandler()
+from src.database.Timestamps import DATE_FORMAT, format_timestamp
+from src.ChatBot.ContextBuilder import ContextBuilder
+from src.ChatBot.IntentRouter import IntentRouter
+from src.ChatBot.QueryTools import TOOLS
+from src.ChatBot.ResponseCache import ResponseCache
+from src.Services import services
+
+# The reply for HTTP 429; ChatRouter backs off when it sees it
+RATE_LIMITED = "❌ تم تجاوز حد الاستخدام، جرب مرة أخرى لاحقاً"
 
 class ChatBot:
-    def __init__(self, api_key: str = None, model: Optional[str] = None):
+    def __init__(self, api_key: str = None, model: Optional[str] = None, tools: Optional[bool] = None, scheduler=None):
         load_dotenv()
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
         if not self.api_key:
@@ -17,99 +25,347 @@ class ChatBot:
             self.api_key = None
         self.base_url = "https://openrouter.ai/api/v1/chat/completions"
         self.model = model or os.getenv("MODEL_NAME") or "meta-llama/llama-3.2-3b-instruct:free"
+        self._client = None
+        self._client_loop = None
+        self.cache = ResponseCache()
+        # Caps concurrent requests, shares identical ones and retries rate-limited ones
+        self.scheduler = scheduler or services.chat_scheduler
+        # Let the model look data up with QueryTools (off with CHAT_TOOLS=0, or by itself if the model can't)
+        self.tools_enabled = tools if tools is not None else os.getenv("CHAT_TOOLS", "1") != "0"
+        self.max_tool_rounds = 3
 
-    async def get_response(self, message: str, context: str = "") -> str:
-        """Get response from OpenRouter API with proper error handling"""
-        
+    @property
+    def wants_context(self) -> bool:
+        """Whether callers should send database context (with tools the bot decides per question)."""
+        return not self.tools_enabled
+
+    def _get_client(self):
+        """The long-lived HTTP client, created on first use in the running event loop.
+
+        Connections to OpenRouter are kept alive and reused, so follow-up
+        questions skip DNS, TCP and TLS setup. HTTP/2 is used when the h2
+        package is installed.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            # Imported on first use; the app starts without loading the HTTP stack
+            import httpx
+            self._client = httpx.AsyncClient(
+                http2=importlib.util.find_spec("h2") is not None,
+                timeout=httpx.Timeout(30, connect=10),
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=120),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                    "HTTP-Referer": "http://localhost:8080",
+                    "X-Title": "Venom Shop Assistant",
+                },
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self):
+        """Close pooled connections; the next request opens a new client."""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+    _PROMPT = (
+        "You are Osama, a helpful assistant for a mobile accessories shop called VENOM. "
+        "Respond in simple Arabic. When answering questions about inventory or sales, "
+        "Use Egyptian currency only"
+        "use the provided context data. If information is not in the context, say: "
+        "'لا أملك بيانات كافية عن هذا الموضوع'"
+    )
+    _TOOLS_PROMPT = (
+        "You are Osama, a helpful assistant for a mobile accessories shop called VENOM. "
+        "Respond in simple Arabic. Use Egyptian currency only. "
+        "Look up inventory, sales and customers with the provided tools instead of guessing; today is {today}. "
+        "If the tools return nothing relevant, say: 'لا أملك بيانات كافية عن هذا الموضوع'"
+    )
+
+    def _messages(self, message: str, context: str, tools: bool, history: Sequence[Dict] = ()) -> List[Dict]:
+        if tools:
+            system = self._TOOLS_PROMPT.format(today=datetime.now().strftime(DATE_FORMAT))
+        else:
+            system = self._PROMPT
+        return [
+            {"role": "system", "content": system},
+            *history,
+            {"role": "user", "content": f"سياق من قاعدة البيانات:\n{context}\n\nالسؤال: {message}" if context else message},
+        ]
+
+    def _payload(self, messages: List[Dict], stream: bool = False, tools: bool = False) -> Dict:
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": 500,
+            "temperature": 0.7,
+            "stream": stream
+        }
+        if tools:
+            payload["tools"] = TOOLS
+        return payload
+
+    def _check_request(self, message: str) -> Optional[str]:
+        """Error reply if the request can't be sent, else None."""
         # Check if API key is available
         if not self.api_key:
             return "❌ لم يتم تكوين مفتاح API. يرجى إضافة OPENROUTER_API_KEY في ملف .env"
-        
         # Validate input
         if not message or not message.strip():
             return "❌ يرجى كتابة رسالة صحيحة"
+        return None
+
+    @staticmethod
+    def _status_error(status_code: int, text: str) -> str:
+        if status_code == 401:
+            return "❌ مفتاح API غير صحيح أو منتهي الصلاحية"
+        elif status_code == 429:
+            return RATE_LIMITED
+        elif status_code == 400:
+            return "❌ خطأ في البيانات المرسلة للـ API"
+        return f"❌ خطأ API {status_code}: {text[:200]}"
+
+    def _failure(self, resp, tools: bool) -> tuple:
+        # OpenRouter rejects tools for models without tool support ("No endpoints found that support tool use")
+        if tools and resp.status_code in (400, 404) and "tool" in resp.text.lower():
+            return "no_tools", None
+        return "error", self._status_error(resp.status_code, resp.text)
+
+    async def get_response(self, message: str, context: str = "", history: Sequence[Dict] = ()) -> str:
+        """Get response from OpenRouter API with proper error handling.
+
+        history is the conversation so far as chat messages (ChatSession.messages()).
+        Answers to a question already asked about the same data, after the same
+        conversation, come from the cache.
+        """
+        error = self._check_request(message)
+        if error:
+            return error
+        key = self.cache.key(message, context, await services.adb.data_version(), history)
+        reply = self.cache.get(key)
+        if reply is None:
+            # The same question asked again while it is being answered shares the request
+            pieces = self.scheduler.shared(("reply", key), lambda: self._request_response(message, context, history))
+            reply = "".join([piece async for piece in pieces])
+            if not reply.startswith("❌"):
+                self.cache.put(key, reply)
+        return reply
+
+    async def _request_response(self, message: str, context: str, history: Sequence[Dict]) -> AsyncIterator[str]:
+        """get_response's reply, as the single piece RequestScheduler.shared() passes on."""
+        pieces = []
+        async with aclosing(self._events(message, context, history, stream=False)) as events:
+            async for kind, value in events:
+                if kind == "error":
+                    yield value
+                    return
+                if kind == "text":
+                    pieces.append(value)
+        reply = "".join(pieces).strip()
+        yield reply if reply else "❌ الرد فارغ من النموذج"
 
+    async def stream_response(self, message: str, context: str = "", history: Sequence[Dict] = ()) -> AsyncIterator[str]:
+        """Yield the reply piece by piece as the model generates it.
+
+        Reads OpenRouter's server-sent events. Errors are yielded as a final
+        message, like get_response returns them. Callers asking the same
+        question while it is being answered share one request, which is
+        aborted once all of them have closed the generator (or had the task
+        iterating it cancelled). Cached answers (shared with get_response)
+        arrive in one piece; only complete replies are cached.
+        """
+        error = self._check_request(message)
+        if error:
+            yield error
+            return
+        key = self.cache.key(message, context, await services.adb.data_version(), history)
+        reply = self.cache.get(key)
+        if reply is not None:
+            yield reply
+            return
+        shared = self.scheduler.shared(("stream", key), lambda: self._stream_reply(message, context, history, key))
+        async with aclosing(shared) as pieces:
+            async for piece in pieces:
+                yield piece
+
+    async def _stream_reply(self, message: str, context: str, history: Sequence[Dict], key: tuple) -> AsyncIterator[str]:
+        pieces, complete = [], True
+        async with aclosing(self._events(message, context, history, stream=True)) as events:
+            async for kind, value in events:
+                if kind == "text":
+                    pieces.append(value)
+                    yield value
+                else:
+                    complete = False
+                    if value:
+                        yield value
+        reply = "".join(pieces).strip()
+        if reply and complete:
+            self.cache.put(key, reply)
+
+    async def _events(self, message: str, context: str, history: Sequence[Dict], stream: bool) -> AsyncIterator[tuple]:
+        """The answer as ("text", piece) events; failures as ("error", message) or ("incomplete", None).
+
+        With tools enabled the model can ask for QueryTools lookups; they run
+        concurrently and their results are sent back, for up to
+        max_tool_rounds rounds before it must answer. The tool definitions go
+        out with every request, so they are only offered when the compact
+        ContextBuilder context has nothing on the question's words; otherwise
+        that context is sent. A model that doesn't support tools gets the
+        context instead, and tools stay off for this bot.
+        """
+        tools = self.tools_enabled
+        if tools and not context:
+            compact, covered = await services.adb.run(services.context_builder.build_checked, message)
+            if covered:
+                tools, context = False, compact
+        messages = self._messages(message, context, tools, history)
+        rounds = 0
+        while True:
+            offer_tools = tools and rounds < self.max_tool_rounds
+            text, calls, unsupported = [], None, False
+            async with aclosing(self._round(messages, offer_tools, stream)) as events:
+                async for kind, value in events:
+                    if kind == "tool_calls":
+                        calls = value
+                    elif kind == "no_tools":
+                        unsupported = True
+                    else:
+                        if kind == "text":
+                            text.append(value)
+                        yield kind, value
+            if unsupported:
+                print(f"ℹ️ {self.model} doesn't support tools, sending database context instead")
+                self.tools_enabled = tools = False
+                if not context:
+                    context = await services.adb.run(services.context_builder.build, message)
+                messages = self._messages(message, context, tools, history)
+                continue
+            if not calls:
+                return
+            messages.append({"role": "assistant", "content": "".join(text), "tool_calls": calls})
+            messages.extend(await services.query_tools.run_calls(calls))
+            rounds += 1
+
+    async def _round(self, messages: List[Dict], tools: bool, stream: bool) -> AsyncIterator[tuple]:
+        """One completion request.
+
+        Yields ("text", piece) as the reply arrives, then ("tool_calls", calls)
+        if the model asked for tools. Failures are yielded as ("error",
+        message), tools the model can't use as ("no_tools", None).
+        """
+        import httpx
+
+        payload = self._payload(messages, stream, tools)
+        attempt = 0
         try:
-            # Prepare the payload
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are Osama, a helpful assistant for a mobile accessories shop called VENOM. "
-                            "Respond in simple Arabic. When answering questions about inventory or sales, "
-                            "Use Egyptian currency only"
-                            "use the provided context data. If information is not in the context, say: "
-                            "'لا أملك بيانات كافية عن هذا الموضوع'"
-                        ),
-                    },
-                    {
-                        "role": "user",
-                        "content": f"سياق من قاعدة البيانات:\n{context}\n\nالسؤال: {message}",
-                    },
-                ],
-                "max_tokens": 500,
-                "temperature": 0.7,
-                "stream": False
-            }
-
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "http://localhost:8080",
-                "X-Title": "Venom Shop Assistant",
-            }
-
-            # Use timeout for the request
-            timeout = aiohttp.ClientTimeout(total=30)
-            
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                try:
-                    async with session.post(self.base_url, headers=headers, json=payload) as resp:
-                        response_text = await resp.text()
-                        
-                        if resp.status == 200:
-                            try:
-                                data = await resp.json()
-                                if "choices" in data and len(data["choices"]) > 0:
-                                    content = data["choices"][0]["message"]["content"]
-                                    return content.strip() if content else "❌ الرد فارغ من النموذج"
-                                else:
-                                    return f"❌ شكل الرد غير صحيح: {data}"
-                            except json.JSONDecodeError as e:
-                                return f"❌ خطأ في قراءة JSON: {str(e)}"
-                        
-                        elif resp.status == 401:
-                            return "❌ مفتاح API غير صحيح أو منتهي الصلاحية"
-                        elif resp.status == 429:
-                            return "❌ تم تجاوز حد الاستخدام، جرب مرة أخرى لاحقاً"
-                        elif resp.status == 400:
-                            return "❌ خطأ في البيانات المرسلة للـ API"
-                        else:
-                            return f"❌ خطأ API {resp.status}: {response_text[:200]}"
-                            
-                except aiohttp.ClientError as e:
-                    return f"❌ خطأ في الاتصال: {str(e)}"
-                    
-        except asyncio.TimeoutError:
-            return "❌ انتهت مهلة الاتصال، جرب مرة أخرى"
+            while True:
+                async with self.scheduler.slot():
+                    if not stream:
+                        resp = await self._get_client().post(self.base_url, json=payload)
+                        delay = self._retry_delay(resp, attempt)
+                        if delay is None:
+                            for event in self._completion_events(resp, tools):
+                                yield event
+                            return
+                    else:
+                        async with self._get_client().stream("POST", self.base_url, json=payload) as resp:
+                            if resp.status_code != 200:
+                                await resp.aread()
+                            delay = self._retry_delay(resp, attempt)
+                            if delay is None:
+                                if resp.status_code != 200:
+                                    yield self._failure(resp, tools)
+                                    return
+                                async with aclosing(self._stream_events(resp)) as events:
+                                    async for event in events:
+                                        yield event
+                                return
+                # Rate limited: wait without holding a slot, then ask again
+                attempt += 1
+                await asyncio.sleep(delay)
+        except httpx.TimeoutException:
+            yield "error", "❌ انتهت مهلة الاتصال، جرب مرة أخرى"
+        except httpx.HTTPError as e:
+            yield "error", f"❌ خطأ في الاتصال: {str(e)}"
         except Exception as e:
-            return f"❌ خطأ غير متوقع: {str(e)}"
+            yield "error", f"❌ خطأ غير متوقع: {str(e)}"
+
+    def _retry_delay(self, resp, attempt: int) -> Optional[float]:
+        """Seconds to wait before asking again after a 429, None to take the response as it is."""
+        if resp.status_code != 429:
+            return None
+        delay = self.scheduler.retry_delay(attempt, resp.headers.get("Retry-After"))
+        if delay is not None:
+            print(f"⏳ Chat API rate limited, retrying in {delay:.1f}s")
+        return delay
+
+    def _completion_events(self, resp, tools: bool) -> List[tuple]:
+        """_round's events from a non-streamed response."""
+        if resp.status_code != 200:
+            return [self._failure(resp, tools)]
+        try:
+            data = resp.json()
+        except json.JSONDecodeError as e:
+            return [("error", f"❌ خطأ في قراءة JSON: {str(e)}")]
+        if not data.get("choices"):
+            return [("error", f"❌ شكل الرد غير صحيح: {data}")]
+        reply = data["choices"][0]["message"]
+        events = []
+        if reply.get("content"):
+            events.append(("text", reply["content"]))
+        if reply.get("tool_calls"):
+            events.append(("tool_calls", reply["tool_calls"]))
+        return events
+
+    @staticmethod
+    async def _stream_events(resp) -> AsyncIterator[tuple]:
+        """_round's events from a server-sent events response."""
+        calls: Dict[int, Dict] = {}
+        async for line in resp.aiter_lines():
+            # Skips the blank lines between events and ": OPENROUTER PROCESSING" keep-alive comments
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                if calls:
+                    yield "tool_calls", [calls[i] for i in sorted(calls)]
+                return
+            try:
+                chunk = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+            if "error" in chunk:
+                yield "error", f"❌ خطأ API: {chunk['error'].get('message', chunk['error'])}"
+                return
+            choices = chunk.get("choices") or []
+            delta = (choices[0].get("delta") or {}) if choices else {}
+            if delta.get("content"):
+                yield "text", delta["content"]
+            # A tool call arrives in fragments: its id and name, then the arguments piece by piece
+            for fragment in delta.get("tool_calls") or []:
+                call = calls.setdefault(fragment.get("index", 0), {"id": "", "type": "function", "function": {"name": "", "arguments": ""}})
+                call["id"] = fragment.get("id") or call["id"]
+                function = fragment.get("function") or {}
+                call["function"]["name"] += function.get("name") or ""
+                call["function"]["arguments"] += function.get("arguments") or ""
+        # The stream ended without [DONE]
+        yield "incomplete", None
 
-    def test_connection(self) -> bool:
-        """Test if the API key and connection are working (synchronous version)"""
+    async def test_connection(self) -> bool:
+        """Test if the API key and connection are working.
+
+        Uses the pooled client, so a successful check leaves a warm connection
+        for the first question.
+        """
         if not self.api_key:
             return False
         
-        import requests
         try:
-            response = requests.post(
+            response = await self._get_client().post(
                 self.base_url,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
                 json={
                     "model": self.model,
                     "messages": [{"role": "user", "content": "test"}],
@@ -122,119 +378,11 @@ class ChatBot:
             return False
         
 class LocalChatBot:
-    def __init__(self):
-        self.responses = {
-            'سلام': 'وعليكم السلام! أهلاً بك في محل VENOM 😊',
-            'مرحبا': 'أهلاً وسهلاً! كيف يمكنني مساعدتك اليوم؟',
-            'مبيعات': 'إجمالي المبيعات موجود في الرئيسية، أو اسألني عن منتج معين',
-            'مخزون': 'يمكنك مشاهدة المخزون في صفحة إدارة المنتجات',
-            'ربح': 'صافي الربح معروض في لوحة التحكم الرئيسية',
-            'مساعدة': 'يمكنني مساعدتك في:\n- معلومات عن المبيعات\n- حالة المخزون\n- البحث عن المنتجات\n- حساب الأرباح'
-        }
+    """Offline assistant: IntentRouter picks the intent, a handler answers it from the database."""
 
-    def _search_products(self, search_term: str, products_data: List[Dict]) -> List[Dict]:
-        """Search for products containing the search term in name, supplier, or notes"""
-        if not products_data:
-            return []
-        
-        results = []
-        search_lower = search_term.lower()
-        for product in products_data:
-            if (search_lower in product.get('name', '').lower() or
-                search_lower in product.get('supplier_name', '').lower() or
-                search_lower in product.get('notes', '').lower()):
-                results.append(product)
-        return results
-
-    def _search_materials(self, search_term: str, materials_data: List[Dict]) -> List[Dict]:
-        """Search for laser materials containing the search term in name, supplier, or notes"""
-        if not materials_data:
-            return []
-        
-        results = []
-        search_lower = search_term.lower()
-        for material in materials_data:
-            if (search_lower in material.get('name', '').lower() or 
-                search_lower in material.get('material_side', '').lower() or
-                search_lower in material.get('supplier_name', '').lower() or
-                search_lower in material.get('notes', '').lower()):
-                results.append(material)
-        return results
-
-    def _search_orders(self, search_term: str, orders_data: List[Dict]) -> List[Dict]:
-        """Search for orders containing the search term"""
-        if not orders_data:
-            return []
-        
-        results = []
-        search_lower = search_term.lower()
-        for order in orders_data:
-            if (search_lower in order.get('name', '').lower() or 
-                search_lower in order.get('product_name', '').lower() or
-                search_lower in order.get('date', '') or
-                search_lower in order.get('customer_phone', '')):
-                results.append(order)
-        return results
-        
-    def _search_laser_transactions(self, search_term: str, transactions_data: List[Dict]) -> List[Dict]:
-        """Search for laser transactions"""
-        if not transactions_data:
-            return []
-        
-        results = []
-        search_lower = search_term.lower()
-        for transaction in transactions_data:
-            if (search_lower in transaction.get('material_name', '').lower() or 
-                search_lower in transaction.get('customer_name', '').lower() or
-                search_lower in transaction.get('customer_phone', '').lower() or
-                search_lower in transaction.get('notes', '').lower() or
-                search_lower in transaction.get('date', '')):
-                results.append(transaction)
-        return results
-    
-    def _format_date_arabic(self, date_str: str) -> str:
-        """Formats a date string to a more readable Arabic format (without time)"""
-        try:
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-            return date_obj.strftime("%d/%m/%Y")
-        except:
-            return date_str
-
-    def _add_to_memory(self, user_message: str, bot_response: str):
-        """Adds message and response to memory (placeholder)"""
-        pass
-    
-    async def get_response(self, message: str, context: str = "") -> str:
-        """Get response using local logic and context data"""
-        message_lower = message.lower().strip()
-        
-        analytics_data = {}
-        laser_analytics = {}
-        full_orders = []
-        full_products = []
-        laser_materials = []
-        laser_transactions = []
-        
-        if context:
-            try:
-                data = json.loads(context)
-                analytics_data = data.get('main_shop', {})
-                laser_analytics = data.get('laser', {})
-                
-                # Get full data from database
-                full_orders = db.get_all_orders()
-                full_products = db.get_all_products()
-                laser_materials = db.get_all_laser_materials()
-                laser_transactions = db.get_laser_transactions()
-                
-            except:
-                pass
-
-        response = ""
-        
-        # General queries
-        if 'مساعدة' in message_lower or 'help' in message_lower:
-            response = '''يمكنني مساعدتك في:
+    wants_context = False
+
+    HELP = '''يمكنني مساعدتك في:
     🔸 معلومات المحل الرئيسي (مبيعات، مخزون، أرباح)
     ⚡ معلومات مكينة الليزر (خامات، مبيعات، مكاسب)
     🔍 البحث بالتواريخ، الموردين، العملاء، أو الملاحظات
@@ -245,162 +393,140 @@ class LocalChatBot:
     • "متى اشترى احمد؟"
     • "مين مورد سامسونج؟"
     • "ابحث عن خامة ملاحظتها فيها تلف"'''
-        elif any(word in message_lower for word in ['سلام', 'السلام', 'مرحبا', 'أهلا']):
-            response = 'أهلاً وسهلاً! 😊 اسألني عن المحل الرئيسي أو مكينة الليزر'
-        elif any(word in message_lower for word in ['شكرا', 'تسلم', 'ممتاز']):
-            response = 'العفو! 😊 أي خدمة تانية للمحل أو الليزر؟'
-
-        # Main Shop-specific queries
-        if not response and any(word in message_lower for word in ['محل', 'بضاعة', 'منتجات']) and not any(word in message_lower for word in ['ليزر', 'laser', 'خامات']):
-            
-            # Main shop analytics query
-            if any(word in message_lower for word in ['ربح', 'مكسب', 'خسارة', 'مبيعات', 'دخل', 'إيراد']):
-                if analytics_data:
-                    response = f'''📊 إحصائيات المحل الرئيسي:
-    💰 إجمالي الدخل: {analytics_data.get("total_revenue", 0):.2f} جنيه
-    📈 صافي الربح: {analytics_data.get("total_profit", 0):.2f} جنيه
-    📉 إجمالي الخسارة (بيع تحت التكلفة): {analytics_data.get("total_loss", 0):.2f} جنيه
-    🛒 عدد الطلبات: {analytics_data.get("total_orders", 0)}
-    📦 عدد المنتجات: {analytics_data.get("products_count", 0)}'''
-                else:
-                    response = "مالقيتش بيانات عن المحل الرئيسي"
-            
-            # Specific product search
-            elif len([w for w in message_lower.split() if len(w) > 2]) > 1:
-                search_terms = [w for w in message_lower.split() if len(w) > 2 and w not in ['محل', 'بضاعة', 'منتجات']]
-                found_products = []
-                for term in search_terms:
-                    found_products.extend(self._search_products(term, full_products))
-                
-                if found_products:
-                    response = "🔍 المنتجات اللي لقيتها:\n\n"
-                    for product in found_products[:5]:
-                        profit = product['sale_price'] - product['purchase_price']
-                        response += f"📦 {product['name']}\n"
-                        response += f"   المورد: {product['supplier_name'] or 'لا يوجد'}\n"
-                        response += f"   المتوفر: {product['stock']:.0f}\n"
-                        response += f"   الشراء: {product['purchase_price']:.2f} | البيع: {product['sale_price']:.2f}\n"
-                        response += f"   الربح: {profit:.2f} جنيه للقطعة\n"
-                        if product['notes']:
-                            response += f"   ملاحظات: {product['notes']}\n"
-                        response += "\n"
-                else:
-                    response = f"مالقيتش منتجات تحتوي على: {', '.join(search_terms)}"
-
-        # Laser-specific queries
-        if not response and any(word in message_lower for word in ['ليزر', 'laser', 'خامات', 'خامة']):
-            
-            # Laser analytics query
-            if any(word in message_lower for word in ['ربح', 'مكسب', 'خسارة', 'analytics']):
-                if laser_analytics:
-                    response = f'''⚡ إحصائيات مكينة الليزر:
-    💰 إجمالي المشتريات: {laser_analytics.get("total_purchases", 0):.2f} جنيه
-    💵 صافي المبيعات: {laser_analytics.get("net_sales", 0):.2f} جنيه  
-    📈 المكسب/الخسارة: {laser_analytics.get("net_profit", 0):.2f} جنيه
-    🗑️ قيمة الفاقد: {laser_analytics.get("total_waste", 0):.2f} جنيه
-    📦 عدد أنواع الخامات: {laser_analytics.get("materials_count", 0)}'''
-                else:
-                    response = "مالقيتش بيانات كافية عن مكينة الليزر"
-            
-            # Specific material search
-            elif len([w for w in message_lower.split() if len(w) > 2]) > 1:
-                search_terms = [w for w in message_lower.split() if len(w) > 2 and w not in ['ليزر', 'خامة', 'خامات', 'laser', 'وش', 'ظهر']]
-                found_materials = []
-                for term in search_terms:
-                    found_materials.extend(self._search_materials(term, laser_materials))
-                
-                if found_materials:
-                    response = "🔍 الخامات اللي لقيتها:\n\n"
-                    for material in found_materials[:5]:
-                        profit = material['sale_price'] - material['purchase_price']
-                        response += f"📦 {material['name']} ({material['material_side']})\n"
-                        response += f"   المورد: {material['supplier_name'] or 'لا يوجد'}\n"
-                        response += f"   المتوفر: {material['stock_quantity']:.0f}\n"
-                        response += f"   الشراء: {material['purchase_price']:.2f} | البيع: {material['sale_price']:.2f}\n"
-                        response += f"   الربح: {profit:.2f} جنيه للقطعة\n"
-                        if material['notes']:
-                             response += f"   ملاحظات: {material['notes']}\n"
-                        response += "\n"
-                else:
-                    response = f"مالقيتش خامات تحتوي على: {', '.join(search_terms)}"
-
-        # Order/Transaction queries (main shop & laser)
-        if not response and any(word in message_lower for word in ['متى', 'امتى', 'تاريخ', 'عميل', 'اشترى', 'باع', 'سجل', 'ملاحظات']):
-            
-            if 'ليزر' in message_lower or 'خامة' in message_lower:
-                search_terms = [w for w in message_lower.split() if len(w) > 2 and w not in ['متى', 'امتى', 'تاريخ', 'عميل', 'اشترى', 'باع', 'سجل', 'ملاحظات', 'ليزر', 'خامة', 'خامات', 'laser']]
-                found_transactions = []
-                for term in search_terms:
-                    found_transactions.extend(self._search_laser_transactions(term, laser_transactions))
-                
-                if found_transactions:
-                    response = "🕐 معاملات الليزر اللي لقيتها:\n\n"
-                    for transaction in found_transactions[:5]:
-                        transaction_type_ar = {
-                            'purchase': 'شراء',
-                            'sale': 'بيع', 
-                            'return': 'استرجاع',
-                            'waste': 'تالف'
-                        }.get(transaction['transaction_type'], transaction['transaction_type'])
-                        
-                        formatted_date = self._format_date_arabic(transaction['date'])
-                        response += f"⚡ {transaction_type_ar} - {transaction['material_name']} ({transaction['material_side']})\n"
-                        response += f"   الكمية: {transaction['quantity']:.0f} | المبلغ: {transaction['total_amount']:.2f} جنيه\n"
-                        if transaction['customer_name']:
-                            response += f"   العميل: {transaction['customer_name'] or 'لا يوجد'}\n"
-                        if transaction['notes']:
-                            response += f"   ملاحظات: {transaction['notes']}\n"
-                        response += f"   📅 {formatted_date}\n\n"
-                else:
-                    response = f"مالقيتش معاملات ليزر تحتوي على: {', '.join(search_terms)}"
-            
-            elif 'محل' in message_lower or 'بضاعة' in message_lower:
-                search_terms = [w for w in message_lower.split() if len(w) > 2 and w not in ['متى', 'امتى', 'تاريخ', 'عميل', 'اشترى', 'باع', 'سجل', 'ملاحظات', 'محل', 'بضاعة']]
-                found_orders = []
-                for term in search_terms:
-                    found_orders.extend(self._search_orders(term, full_orders))
-                
-                if found_orders:
-                    response = "📋 الأوردرات اللي لقيتها:\n\n"
-                    for order in found_orders[:5]:
-                        formatted_date = self._format_date_arabic(order['date'])
-                        response += f"🛒 بيع - {order['product_name']}\n"
-                        response += f"   العميل: {order['name'] or 'لا يوجد'}\n"
-                        response += f"   الكمية: {order['quantity']} | المبلغ: {order['total_price']:.2f} جنيه\n"
-                        response += f"   📅 {formatted_date}\n\n"
-                else:
-                    response = f"مالقيتش أوردرات تحتوي على: {', '.join(search_terms)}"
-
-        # If no specific response, fall back to enhanced default response
-        if not response:
-            main_info = ""
-            laser_info = ""
-            
-            if analytics_data:
-                main_info = f'''💰 المحل الرئيسي: {analytics_data.get("total_revenue", "؟")} جنيه مبيعات
-    📦 المنتجات: {analytics_data.get("products_count", "؟")} منتج'''
-            
-            if laser_analytics:
-                laser_info = f'''⚡ مكينة الليزر: {laser_analytics.get("net_profit", "؟")} جنيه ربح
-    🔥 الخامات: {laser_analytics.get("materials_count", "؟")} نوع'''
-            
-            if main_info or laser_info:
-                response = f'''معلومات سريعة:
-{main_info}
-{laser_info}
+
+    PERIOD_NAMES = {
+        'today': 'النهارده', 'yesterday': 'امبارح', 'last 7 days': 'آخر 7 أيام',
+        'this month': 'الشهر ده', 'last 365 days': 'آخر سنة', 'last 30 days': 'آخر 30 يوم',
+    }
+
+    def __init__(self):
+        self.router = IntentRouter()
+        self.handlers = {
+            'help': lambda message, route: self.HELP,
+            'greeting': lambda message, route: 'أهلاً وسهلاً! 😊 اسألني عن المحل الرئيسي أو مكينة الليزر',
+            'thanks': lambda message, route: 'العفو! 😊 أي خدمة تانية للمحل أو الليزر؟',
+            'sales': self._sales,
+            'search': self._search,
+            'history': self._history,
+            'overview': self._overview,
+        }
+        self.cache = ResponseCache()
+
+    def _format_date_arabic(self, date_value) -> str:
+        """Formats an integer timestamp (or legacy date string) to a more readable Arabic format (without time)"""
+        try:
+            if isinstance(date_value, int):
+                return format_timestamp(date_value, "%d/%m/%Y")
+            date_obj = datetime.strptime(date_value, "%Y-%m-%d %H:%M:%S")
+            return date_obj.strftime("%d/%m/%Y")
+        except:
+            return str(date_value)
+
+    async def get_response(self, message: str, context: str = "", history: Sequence[Dict] = ()) -> str:
+        """Get response using local logic and the database; repeated questions about unchanged data are cached.
+
+        Every question is answered on its own, so history is ignored.
+        """
+        key = self.cache.key(message, context, await services.adb.data_version())
+        response = self.cache.get(key)
+        if response is None:
+            response = await services.adb.run(self._answer, message)
+            self.cache.put(key, response)
+        return response
+
+    def _answer(self, message: str) -> str:
+        """Route message to its handler (runs on a database thread)."""
+        route = self.router.route(message)
+        return self.handlers[route['intent']](message, route)
+
+    @staticmethod
+    def _queries(terms: List[str]) -> List[str]:
+        """All terms together ("customer 502"), then each term on its own."""
+        return ([" ".join(terms)] if len(terms) > 1 else []) + terms
+
+    # ---------- Handlers ----------
+    def _sales(self, message: str, route: Dict) -> str:
+        label, start, end = ContextBuilder.period(message, datetime.now())
+        period = self.PERIOD_NAMES.get(label, label)
+        analytics = services.db.get_analytics_data(start, end)
+        inventory = services.db.inventory_summary()
+        blocks = []
+        if route['line'] != 'laser':
+            blocks.append(f'''📊 إحصائيات المحل الرئيسي ({period}):
+    💰 إجمالي الدخل: {analytics["shop_revenue"]:.2f} جنيه
+    📈 صافي الربح: {analytics["shop_profit"]:.2f} جنيه
+    📦 عدد المنتجات: {inventory["shop"]["items"]}''')
+        if route['line'] != 'shop':
+            blocks.append(f'''⚡ إحصائيات مكينة الليزر ({period}):
+    💵 صافي المبيعات: {analytics["laser_revenue"]:.2f} جنيه
+    📈 المكسب/الخسارة: {analytics["laser_profit"]:.2f} جنيه
+    📦 عدد أنواع الخامات: {inventory["laser"]["items"]}''')
+        return "\n\n".join(blocks)
+
+    def _search(self, message: str, route: Dict) -> str:
+        laser = route['line'] == 'laser'
+        kind = 'laser' if laser else 'product'
+        found, seen = [], set()
+        for query in self._queries(route['terms']):
+            for item in services.search_index.search(query, kind, limit=5):
+                if item['id'] not in seen:
+                    seen.add(item['id'])
+                    found.append(item)
+            if found:
+                break
+        if not found:
+            return f"مالقيتش {'خامات' if laser else 'منتجات'} تحتوي على: {', '.join(route['terms'])}"
+
+        response = "🔍 الخامات اللي لقيتها:\n\n" if laser else "🔍 المنتجات اللي لقيتها:\n\n"
+        for item in found[:5]:
+            stock = item['stock_quantity'] if laser else item['stock']
+            sale_price, purchase_price = item['sale_price'] or 0, item['purchase_price'] or 0
+            profit = sale_price - purchase_price
+            response += f"📦 {item['name']} ({item['material_side']})\n" if laser else f"📦 {item['name']}\n"
+            response += f"   المورد: {item['supplier'] or 'لا يوجد'}\n"
+            response += f"   المتوفر: {stock or 0:.0f}\n"
+            response += f"   الشراء: {purchase_price:.2f} | البيع: {sale_price:.2f}\n"
+            response += f"   الربح: {profit:.2f} جنيه للقطعة\n"
+            if item['notes']:
+                response += f"   ملاحظات: {item['notes']}\n"
+            response += "\n"
+        return response
+
+    def _history(self, message: str, route: Dict) -> str:
+        """Latest operations of the customers or items named in the message."""
+        found = {}
+        for query in self._queries(route['terms']):
+            for operation in services.search_index.search(query, 'operation', limit=5, line=route['line']):
+                found[operation['id']] = operation
+            if found:
+                break
+        if not found:
+            return f"مالقيتش معاملات تحتوي على: {', '.join(route['terms'])}"
+
+        icon = {'shop': '🛒', 'laser': '⚡'}.get(route['line'], '📋')
+        response = "🕐 المعاملات اللي لقيتها:\n\n"
+        for operation in sorted(found.values(), key=lambda o: (o['ts'], o['id']), reverse=True)[:5]:
+            response += f"{icon} {operation['operation_type']} - {operation['item_name']}\n"
+            response += f"   العميل: {operation['customer_name'] or 'لا يوجد'}\n"
+            response += f"   الكمية: {operation['quantity']:g} | المبلغ: {operation['total_price']:.2f} جنيه\n"
+            response += f"   📅 {self._format_date_arabic(operation['ts'])}\n\n"
+        return response
+
+    def _overview(self, message: str, route: Dict) -> str:
+        label, start, end = ContextBuilder.period("", datetime.now())
+        analytics = services.db.get_analytics_data(start, end)
+        inventory = services.db.inventory_summary()
+        return f'''معلومات سريعة ({self.PERIOD_NAMES[label]}):
+💰 المحل الرئيسي: {analytics["shop_revenue"]:.2f} جنيه مبيعات
+    📦 المنتجات: {inventory["shop"]["items"]} منتج
+⚡ مكينة الليزر: {analytics["laser_profit"]:.2f} جنيه ربح
+    🔥 الخامات: {inventory["laser"]["items"]} نوع
 
 جرب تسأل عن:
 🔹 "ربح الليزر" أو "خامات متوفرة"
-🔹 "متى العميل فلان اشترى؟"  
-🔹 "آخر معاملات الليزر"'''
-            else:
-                response = '''أسف، مش فاهم سؤالك. جرب تسأل عن:
-🔹 المبيعات والأرباح (المحل أو الليزر)
-🔹 المخزون والمنتجات
 🔹 "متى العميل فلان اشترى؟"
-🔹 "خامات الليزر المتوفرة"'''
+🔹 "آخر معاملات الليزر"'''
 
-        # Add to memory
-        self._add_to_memory(message, response)
-        
-        return response
\ No newline at end of file
+    async def stream_response(self, message: str, context: str = "", history: Sequence[Dict] = ()) -> AsyncIterator[str]:
+        """Same interface as ChatBot.stream_response; local answers arrive in one piece."""
+        yield await self.get_response(message, context)
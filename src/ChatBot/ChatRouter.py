@@ -0,0 +1,247 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, Dict, Optional, Sequence
+
+from src.ChatBot.ChatBot import RATE_LIMITED
+
+
+class LatencyStats:
+    """Answer latencies of one backend over its last `window` answers, plus failure counts."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self.answers = 0
+        self.failures = 0
+        self.timeouts = 0
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+        self.answers += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Nearest-rank percentile (0 < q <= 1) of the recent latencies in seconds, None before the first answer."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+    def summary(self) -> Dict:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "answers": self.answers,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class CircuitBreaker:
+    """Stops sending requests to a backend that keeps failing.
+
+    closed: requests go through. failure_threshold failures in a row, or one
+    rate-limit answer, open the circuit.
+    open: requests are refused for the current backoff, `backoff` seconds at
+    first, doubling (up to max_backoff) every time a probe fails.
+    half-open: once the backoff has passed, allow() lets one request through
+    as a probe; its success closes the circuit, its failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold: int = 3, backoff: float = 5.0, max_backoff: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.current_backoff = backoff
+        self._opened_at = 0.0
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a probe through (0 when it would now)."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.current_backoff - self._clock())
+
+    def available(self) -> bool:
+        """Whether allow() would let a request through now; doesn't claim the probe."""
+        return self.state == self.CLOSED or (self.state == self.OPEN and self.retry_in() == 0)
+
+    def allow(self) -> bool:
+        """Whether to send a request now; in an open circuit past its backoff, the caller becomes the probe."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and self.retry_in() == 0:
+            self.state = self.HALF_OPEN
+            return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.current_backoff = self.backoff
+
+    def record_failure(self, rate_limited: bool = False):
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self.current_backoff = min(self.current_backoff * 2, self.max_backoff)
+            self._open()
+        elif self.state == self.CLOSED and (rate_limited or self.failures >= self.failure_threshold):
+            self._open()
+        elif self.state == self.OPEN and rate_limited:
+            # Still rate limited by a request that was already running; restart the wait
+            self._opened_at = self._clock()
+
+    def trip(self):
+        """Open the circuit now, whatever its state."""
+        self.failures += 1
+        self._open()
+
+    def abandon(self):
+        """The request allowed through was cancelled before it succeeded or failed.
+
+        An abandoned probe leaves the circuit open with its backoff already
+        over, so the next request probes instead.
+        """
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+            self._opened_at = self._clock() - self.current_backoff
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = self._clock()
+        self.trips += 1
+
+
+class ChatRouter:
+    """Answers with ChatBot, or with LocalChatBot when the API is slow or failing, question by question.
+
+    Each question goes to the remote model with a deadline (`deadline`
+    seconds until its first words; for get_response, until the whole
+    reply). A missed deadline, an error reply or a rate limit is answered by
+    the local bot instead and counts against the remote's CircuitBreaker.
+    While the circuit is open questions go straight to the local bot, and
+    once its backoff has passed one question probes the remote again.
+    stats() reports p50/p95 latency (time to the first words) per backend.
+    """
+
+    def __init__(self, remote, local, deadline: float = 10.0, breaker: Optional[CircuitBreaker] = None,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.remote = remote
+        self.local = local
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = {"remote": LatencyStats(), "local": LatencyStats()}
+        self._clock = clock
+
+    @property
+    def wants_context(self) -> bool:
+        """Context is only needed when the question will go to a remote model that doesn't use tools."""
+        return self.breaker.available() and self.remote.wants_context
+
+    def stats(self) -> Dict:
+        """Circuit state and latency percentiles per backend."""
+        return {
+            "circuit": self.breaker.state,
+            "retry_in_s": round(self.breaker.retry_in(), 1),
+            "remote": self.latency["remote"].summary(),
+            "local": self.latency["local"].summary(),
+        }
+
+    def _succeeded(self, started: float):
+        if self.breaker.state != CircuitBreaker.CLOSED:
+            print("✅ Chat API is answering again")
+        self.breaker.record_success()
+        self.latency["remote"].add(self._clock() - started)
+
+    def _failed(self, reply: Optional[str]):
+        stats = self.latency["remote"]
+        stats.failures += 1
+        if reply is None:
+            stats.timeouts += 1
+        trips = self.breaker.trips
+        self.breaker.record_failure(rate_limited=reply == RATE_LIMITED)
+        if self.breaker.trips != trips:
+            print(f"⚠️ Chat API failing ({reply or 'no answer in time'}), "
+                  f"answering locally for {self.breaker.current_backoff:g}s")
+
+    async def _local_stream(self, message: str) -> AsyncIterator[str]:
+        started = self._clock()
+        first = True
+        async for piece in self.local.stream_response(message):
+            if first:
+                self.latency["local"].add(self._clock() - started)
+                first = False
+            yield piece
+
+    async def stream_response(self, message: str, context: str = "", history: Sequence[Dict] = ()) -> AsyncIterator[str]:
+        """ChatBot.stream_response, falling back to LocalChatBot's answer before anything was shown."""
+        if self.breaker.allow():
+            started = self._clock()
+            try:
+                async with aclosing(self.remote.stream_response(message, context, history)) as pieces:
+                    try:
+                        first = await asyncio.wait_for(anext(pieces, ""), self.deadline)
+                    except asyncio.TimeoutError:
+                        first = None
+                    if first and not first.startswith("❌"):
+                        self._succeeded(started)
+                        yield first
+                        async for piece in pieces:
+                            if piece.startswith("❌"):
+                                # Failed after the answer started; too late to switch bots
+                                self.breaker.record_failure(rate_limited=piece == RATE_LIMITED)
+                            yield piece
+                        return
+                    self._failed(first)
+            except (asyncio.CancelledError, GeneratorExit):
+                self.breaker.abandon()
+                raise
+        async with aclosing(self._local_stream(message)) as pieces:
+            async for piece in pieces:
+                yield piece
+
+    async def get_response(self, message: str, context: str = "", history: Sequence[Dict] = ()) -> str:
+        """ChatBot.get_response, or LocalChatBot's answer when the remote fails or misses the deadline."""
+        if self.breaker.allow():
+            started = self._clock()
+            try:
+                reply = await asyncio.wait_for(self.remote.get_response(message, context, history), self.deadline)
+            except asyncio.TimeoutError:
+                reply = None
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            if reply and not reply.startswith("❌"):
+                self._succeeded(started)
+                return reply
+            self._failed(reply)
+        started = self._clock()
+        reply = await self.local.get_response(message)
+        self.latency["local"].add(self._clock() - started)
+        return reply
+
+    async def probe(self):
+        """Check the API once (app startup); a failed check opens the circuit right away."""
+        if not self.breaker.allow():
+            return
+        try:
+            ok = await self.remote.test_connection()
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        if ok:
+            self.breaker.record_success()
+        else:
+            print("⚠️ Warning: ChatBot API connection test failed, answering locally until it recovers")
+            self.breaker.trip()
+
+    async def aclose(self):
+        await self.remote.aclose()
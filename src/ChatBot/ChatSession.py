@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List
+
+from src.ChatBot.ContextBuilder import estimate_tokens
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class ChatSession:
+    """One browser tab's conversation, bounded however long it runs.
+
+    The newest max_turns (question, answer) turns are kept in a ring buffer;
+    a turn pushed out of it is folded into `summary`, one clipped
+    "question → answer" line per turn, whose oldest lines are dropped past
+    summary_tokens. messages() sends the model the summary and as many of the
+    newest turns as fit in history_tokens, so the prompt stays the same size
+    from the tenth question to the thousandth. With a ChatHistory store every
+    turn is written through and a reopened tab picks up where it left off.
+    """
+
+    SUMMARY_NOTE = "ملخص ما دار قبل ذلك في المحادثة:\n"
+
+    def __init__(self, session_id: str, store=None, max_turns: int = 6, summary_tokens: int = 250,
+                 history_tokens: int = 1200, clip_chars: int = 120):
+        self.session_id = session_id
+        self.store = store
+        self.summary_tokens = summary_tokens
+        self.history_tokens = history_tokens
+        self.clip_chars = clip_chars
+        self.turns = deque(maxlen=max_turns)
+        self.summary = ""
+        self.seq = 0
+        if store is not None:
+            self.summary, self.seq, turns = store.load(session_id, max_turns)
+            self.turns.extend(turns)
+        self._lock = threading.Lock()
+
+    def add(self, question: str, answer: str):
+        """Record a completed turn (and write it to the store)."""
+        with self._lock:
+            if len(self.turns) == self.turns.maxlen:
+                self._fold(*self.turns[0])
+            self.turns.append((question, answer))
+            self.seq += 1
+            seq, summary = self.seq, self.summary
+        if self.store is not None:
+            self.store.append(self.session_id, seq, question, answer, summary)
+
+    def _fold(self, question: str, answer: str):
+        lines = self.summary.splitlines()
+        lines.append(f"- {_clip(question, self.clip_chars)} → {_clip(answer, self.clip_chars)}")
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_tokens:
+            del lines[0]
+        self.summary = "\n".join(lines)
+
+    def messages(self) -> List[Dict]:
+        """Chat messages that put the model back into the conversation, oldest first."""
+        with self._lock:
+            summary, turns = self.summary, list(self.turns)
+        budget = self.history_tokens - estimate_tokens(summary)
+        recent = []
+        for question, answer in reversed(turns):
+            budget -= estimate_tokens(question) + estimate_tokens(answer)
+            if budget < 0:
+                break
+            recent[:0] = [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+        if summary:
+            recent.insert(0, {"role": "system", "content": self.SUMMARY_NOTE + summary})
+        return recent
+
+
+class ChatSessions:
+    """The live ChatSessions by session id, at most max_sessions of them (least recently used go first).
+
+    A session that was dropped, or belongs to an earlier run of the app, is
+    loaded back from the store on its next get(). Sessions idle for longer
+    than the store's max_age_days are pruned when the registry is created.
+    """
+
+    def __init__(self, store=None, max_sessions: int = 100, **session_options):
+        self.store = store
+        self.max_sessions = max_sessions
+        self.session_options = session_options
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        if store is not None:
+            store.prune()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> ChatSession:
+        """The session with this id, loading or creating it (reads the store; run it off the event loop)."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                return session
+        session = ChatSession(session_id, self.store, **self.session_options)
+        with self._lock:
+            session = self._sessions.setdefault(session_id, session)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def close(self):
+        self._sessions.clear()
+        if self.store is not None:
+            self.store.close()
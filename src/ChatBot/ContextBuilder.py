@@ -0,0 +1,185 @@
+import json
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.database.DatabaseHandler import DatabaseHandler
+from src.database.TextSearch import normalize
+from src.database.Timestamps import DATE_FORMAT
+
+# Question words and shop vocabulary that say what is asked, not which item or
+# customer it is about; they are not searched for. Stored folded (see normalize).
+STOPWORDS = {normalize(w) for w in (
+    'متى', 'امتى', 'كام', 'كم', 'ايه', 'إيه', 'ايش', 'ما', 'ماذا', 'هل', 'في', 'فى', 'من', 'مين', 'على',
+    'عن', 'الى', 'إلى', 'فين', 'عند', 'عندي', 'عندنا', 'لو', 'يا', 'او', 'أو', 'اللي', 'هو', 'هي', 'ده',
+    'دي', 'دا', 'كل', 'قد', 'بكام', 'سعر', 'محل', 'المحل', 'منتج', 'منتجات', 'المنتجات', 'بضاعة',
+    'البضاعة', 'مخزون', 'المخزون', 'متوفر', 'متاح', 'خامة', 'خامات', 'الخامات', 'ليزر', 'الليزر', 'اشترى',
+    'اشتري', 'باع', 'بيع', 'مبيعات', 'المبيعات', 'ربح', 'الربح', 'مكسب', 'دخل', 'عميل', 'العميل', 'زبون',
+    'النهارده', 'النهاردة', 'اليوم', 'امبارح', 'أمس', 'الاسبوع', 'الأسبوع', 'الشهر', 'السنة', 'السنه',
+    'آخر', 'اخر', 'اكتر', 'أكثر', 'افضل', 'أفضل', 'مورد', 'المورد', 'laser', 'shop',
+)}
+
+# (words that select the period, label, days back from today or None for "since the 1st")
+PERIODS = [
+    (('النهارده', 'النهاردة', 'اليوم'), 'today', 0),
+    (('امبارح', 'أمس'), 'yesterday', 1),
+    (('الاسبوع', 'الأسبوع', 'اسبوع', 'أسبوع'), 'last 7 days', 6),
+    (('الشهر', 'شهر'), 'this month', None),
+    (('السنة', 'السنه', 'سنة'), 'last 365 days', 364),
+]
+DEFAULT_PERIOD = ('last 30 days', 29)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about 4 UTF-8 bytes per token (so ~2 Arabic letters)."""
+    return math.ceil(len(text.encode('utf-8')) / 4)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class ContextBuilder:
+    """Builds the database context for one chat question within a token budget.
+
+    Everything comes from indexed queries: period totals from the daily_summary
+    rollup, counts from the inventory summary, and products, laser materials
+    and customer operations matching the question's words through the FTS
+    indexes. Sections are packed in priority order until the budget is used,
+    so the prompt stays the same size however large the shop's data grows.
+    """
+
+    def __init__(self, db: DatabaseHandler, budget_tokens: int = 800, rows_per_term: int = 5, max_terms: int = 6):
+        self.db = db
+        self.budget_tokens = budget_tokens
+        self.rows_per_term = rows_per_term
+        self.max_terms = max_terms
+
+    @staticmethod
+    def search_terms(question: str) -> List[str]:
+        """The words of question that may name an item, supplier or customer."""
+        words = normalize(question).replace('؟', ' ').split()
+        terms = []
+        for word in words:
+            word = word.strip('.,!?:;()"\'')
+            if (len(word) >= 2 or word.isdigit()) and word not in STOPWORDS and word.lower() not in STOPWORDS and word not in terms:
+                terms.append(word)
+        return terms
+
+    @staticmethod
+    def period(question: str, today: datetime) -> Tuple[str, str, str]:
+        """(label, start date, end date) of the period the question is about."""
+        words = set(normalize(question).replace('؟', ' ').split())
+        for names, label, days in PERIODS:
+            if words & {normalize(n) for n in names}:
+                break
+        else:
+            label, days = DEFAULT_PERIOD
+        end = today
+        if days is None:
+            start = today.replace(day=1)
+        else:
+            start = today - timedelta(days=days)
+            if label == 'yesterday':
+                end = start
+        return label, start.strftime(DATE_FORMAT), end.strftime(DATE_FORMAT)
+
+    def _matches(self, terms: List[str]) -> Dict[str, List[Dict]]:
+        """Rows matching any term, those matching more terms first.
+
+        All terms together are searched first, so an item named by the whole
+        phrase ("شاحن سامسونج 2") is found even when each word alone matches
+        too many rows to reach it.
+        """
+        hits: Dict[str, Dict[int, list]] = {'product': {}, 'laser': {}, 'operation': {}}
+        terms = terms[:self.max_terms]
+        queries = ([" ".join(terms)] if len(terms) > 1 else []) + terms
+        for rank, query in enumerate(queries):
+            for kind, rows in self.db.search(query, limit=self.rows_per_term).items():
+                for position, row in enumerate(rows):
+                    entry = hits[kind].setdefault(row['id'], [0, rank, position, row])
+                    entry[0] += len(query.split())
+        return {
+            kind: [e[3] for e in sorted(found.values(), key=lambda e: (-e[0], e[1], e[2]))]
+            for kind, found in hits.items()
+        }
+
+    def sections(self, question: str, today: Optional[datetime] = None) -> List[Tuple[str, Any]]:
+        """(name, value) pairs in priority order, before packing."""
+        return self._sections(question, today)[0]
+
+    def _sections(self, question: str, today: Optional[datetime]) -> Tuple[List[Tuple[str, Any]], bool]:
+        today = today or datetime.now()
+        label, start, end = self.period(question, today)
+        analytics = self.db.get_analytics_data(start, end)
+        inventory = self.db.inventory_summary()
+        terms = self.search_terms(question)
+        matches = self._matches(terms)
+        covered = not terms or any(matches.values())
+        return [
+            ('main_shop', {
+                'period': label, 'from': start, 'to': end,
+                'total_revenue': round(analytics['shop_revenue'], 2),
+                'total_profit': round(analytics['shop_profit'], 2),
+                'products_count': inventory['shop']['items'],
+                'units_in_stock': inventory['shop']['units'],
+                'low_stock_products': inventory['shop']['low_stock_items'],
+            }),
+            ('laser', {
+                'period': label,
+                'net_sales': round(analytics['laser_revenue'], 2),
+                'net_profit': round(analytics['laser_profit'], 2),
+                'materials_count': inventory['laser']['items'],
+                'low_stock_materials': inventory['laser']['low_stock_items'],
+            }),
+            ('products', [
+                {'name': p['name'], 'supplier': p['supplier'], 'stock': p['stock'],
+                 'purchase_price': p['purchase_price'], 'sale_price': p['sale_price'], 'notes': p['notes']}
+                for p in matches['product']
+            ]),
+            ('laser_materials', [
+                {'name': m['name'], 'side': m['material_side'], 'supplier': m['supplier'], 'stock': m['stock_quantity'],
+                 'purchase_price': m['purchase_price'], 'sale_price': m['sale_price'], 'notes': m['notes']}
+                for m in matches['laser']
+            ]),
+            ('operations', [
+                {'date': o['date'][:10], 'type': o['operation_type'], 'item': o['item_name'], 'quantity': o['quantity'],
+                 'total': o['total_price'], 'customer': o['customer_name'], 'phone': o['customer_phone']}
+                for o in matches['operation']
+            ]),
+            ('top_products', analytics['top_shop_products']),
+            ('top_laser_materials', analytics['top_laser_materials']),
+        ], covered
+
+    def pack(self, sections: List[Tuple[str, Any]]) -> str:
+        """Compact JSON of as many sections (and list rows) as fit in the budget, in order."""
+        context: Dict[str, Any] = {}
+        used = estimate_tokens('{}')
+        for name, value in sections:
+            overhead = estimate_tokens(_dumps(name)) + 1
+            if isinstance(value, list):
+                rows = []
+                for row in value:
+                    cost = estimate_tokens(_dumps(row)) + 1
+                    if used + overhead + cost > self.budget_tokens:
+                        break
+                    rows.append(row)
+                    used += cost
+                if rows:
+                    context[name] = rows
+                    used += overhead
+            else:
+                cost = overhead + estimate_tokens(_dumps(value))
+                if used + cost <= self.budget_tokens:
+                    context[name] = value
+                    used += cost
+        return _dumps(context)
+
+    def build(self, question: str, today: Optional[datetime] = None) -> str:
+        """Context for question as compact JSON, at most about budget_tokens tokens."""
+        return self.pack(self.sections(question, today))
+
+    def build_checked(self, question: str, today: Optional[datetime] = None) -> Tuple[str, bool]:
+        """build()'s context, and whether it has rows for the question's words (True if it names none)."""
+        sections, covered = self._sections(question, today)
+        return self.pack(sections), covered
@@ -0,0 +1,161 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from src.ChatBot.ContextBuilder import STOPWORDS
+from src.database.TextSearch import normalize
+
+# label -> keywords, matched against whole words of the message (after
+# normalize() and lower()); a trailing * makes a stem matching every word
+# that starts with it ("ربح*": ربح, ربحنا, ربحية)
+KEYWORDS: Dict[str, tuple] = {
+    'help': ('مساعدة', 'help'),
+    'greeting': ('سلام', 'مرحبا', 'أهلا'),
+    'thanks': ('شكر*', 'تسلم*', 'ممتاز'),
+    'shop': ('محل*', 'بضاع*', 'منتج*'),
+    'laser': ('ليزر', 'laser', 'خامات', 'خامة'),
+    'money': ('ربح*', 'مكسب*', 'خسار*', 'مبيعات', 'دخل', 'إيراد*', 'analytics'),
+    'history': ('متى', 'امتى', 'تاريخ', 'عميل', 'اشتر*', 'باع', 'سجل*', 'ملاحظات'),
+}
+
+# (intent, labels that must all be present, needs search terms); the first match wins
+ROUTES = [
+    ('help', {'help'}, False),
+    ('greeting', {'greeting'}, False),
+    ('thanks', {'thanks'}, False),
+    ('history', {'history'}, True),
+    ('sales', {'money'}, False),
+    ('search', {'shop'}, True),
+    ('search', {'laser'}, True),
+]
+FALLBACK = 'overview'
+
+_WORD = re.compile(r"\w+")
+# Conjunctions and the article glued to the front of a word: "والمحل", "بالليزر", "السلام"
+_CONJUNCTIONS = ('و', 'ف')
+_ARTICLES = ('بال', 'كال', 'لل', 'ال')
+_NO_LABELS: FrozenSet[str] = frozenset()
+
+
+class IntentRouter:
+    """Classifies a chat message by the ROUTES table.
+
+    The message is split on whitespace once. Each word is folded and looked
+    up, with any conjunction and article in front of it removed, among the
+    keywords and then among the stems, so a keyword inside a longer word
+    (the "سلام" in the name "اسلام") doesn't count. Chat messages reuse a
+    small vocabulary, so what a piece of the message holds (its words and
+    their labels) is worked out once and then read from a dict of up to
+    max_pieces pieces, shared by the database threads LocalChatBot answers
+    on and guarded by a lock. Returns the intent, the business line it is about
+    ('shop', 'laser' or None for both) and the search words: the words that
+    are not keywords, less stop words unless that leaves none.
+    """
+
+    def __init__(self, keywords: Dict[str, Iterable[str]] = KEYWORDS, routes=ROUTES, max_pieces: int = 4096):
+        self.keywords: Dict[str, FrozenSet[str]] = {}
+        self.stems: Dict[str, FrozenSet[str]] = {}
+        for label, words in keywords.items():
+            for keyword in words:
+                folded = normalize(keyword).lower()
+                table = self.stems if folded.endswith('*') else self.keywords
+                key = folded.rstrip('*')
+                table[key] = table.get(key, _NO_LABELS) | {label}
+        self.stem_lengths = sorted({len(stem) for stem in self.stems}, reverse=True)
+        self.routes = routes
+        self.stopwords = STOPWORDS
+        self.max_pieces = max_pieces
+        self._pieces: OrderedDict = OrderedDict()
+        self._decisions: Dict[FrozenSet[str], Tuple] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _forms(word: str) -> List[str]:
+        """word, then word without a leading conjunction and/or article."""
+        forms = [word]
+        if word[0] in _CONJUNCTIONS and len(word) > 3:
+            forms.append(word[1:])
+        for form in forms[:]:
+            for article in _ARTICLES:
+                if form.startswith(article) and len(form) - len(article) >= 2:
+                    forms.append(form[len(article):])
+                    break
+        return forms
+
+    def _word_labels(self, word: str) -> FrozenSet[str]:
+        labels = self.keywords.get(word, _NO_LABELS)
+        for length in self.stem_lengths:
+            stem_labels = self.stems.get(word[:length])
+            if stem_labels:
+                labels = labels | stem_labels
+        return labels
+
+    def _piece(self, piece: str) -> Tuple[FrozenSet[str], Tuple[str, ...], Tuple[str, ...]]:
+        """(labels, words to search for, those that aren't stop words) of a lower-case, whitespace-free piece of a message."""
+        if piece.isdigit():
+            # Quantities and phone numbers: never keywords, seldom seen again, not kept
+            return _NO_LABELS, (piece,), (piece,)
+        # Folding, conjunctions and articles only concern Arabic
+        arabic = not piece.isascii()
+        text = normalize(piece) if arabic else piece
+        labels, candidates = _NO_LABELS, []
+        for word in [text] if text.isalnum() else _WORD.findall(text):
+            if arabic:
+                word_labels = _NO_LABELS.union(*[self._word_labels(form) for form in self._forms(word)])
+            else:
+                word_labels = self._word_labels(word)
+            labels = labels | word_labels
+            if not word_labels and (len(word) > 2 or word.isdigit()):
+                candidates.append(word)
+        entry = (labels, tuple(candidates), tuple(w for w in candidates if w not in self.stopwords))
+        with self._lock:
+            if len(self._pieces) >= self.max_pieces:
+                self._pieces.popitem(last=False)  # the oldest
+            self._pieces[piece] = entry
+        return entry
+
+    @staticmethod
+    def terms(pieces: List[Tuple]) -> List[str]:
+        """The folded words of a message to search for, from its _piece() entries."""
+        candidates, searchable = [], []
+        for _, words, search in pieces:
+            candidates += words
+            searchable += search
+        # A question made only of common words ("سجل العميل زبون") still searches for them
+        return list(dict.fromkeys(searchable or candidates))
+
+    def _decide(self, labels: FrozenSet[str]) -> Tuple[List[Tuple[str, bool]], Optional[str]]:
+        """The routes a message with these labels may take, in order, and its business line."""
+        routes = []
+        for name, required, needs_terms in self.routes:
+            if required <= labels:
+                routes.append((name, needs_terms))
+                if not needs_terms:
+                    break
+        line = 'laser' if 'laser' in labels else 'shop' if 'shop' in labels else None
+        decision = (routes, line)
+        # At most one entry per combination of labels
+        with self._lock:
+            self._decisions[labels] = decision
+        return decision
+
+    def route(self, message: str) -> Dict:
+        words = message.lower().split()
+        with self._lock:
+            pieces = [self._pieces.get(piece) for piece in words]
+        pieces = [entry or self._piece(piece) for piece, entry in zip(words, pieces)]
+        labels = frozenset().union(*[piece[0] for piece in pieces])
+        with self._lock:
+            decision = self._decisions.get(labels)
+        routes, line = decision or self._decide(labels)
+        terms = []  # worked out only for routes that search
+        intent = FALLBACK
+        for name, needs_terms in routes:
+            if needs_terms:
+                terms = terms or self.terms(pieces)
+                if not terms:
+                    continue
+            intent = name
+            break
+        return {'intent': intent, 'line': line, 'terms': terms, 'labels': labels}
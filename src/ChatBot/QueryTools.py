@@ -0,0 +1,211 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from src.ChatBot.ResponseCache import ResponseCache
+from src.database.Timestamps import DATE_FORMAT
+
+# Function definitions in the OpenAI format OpenRouter passes on to the model.
+# They go out with every request of a tools answer, so they are kept to short
+# descriptions and the parameters a question needs; the tools' other
+# arguments (line, limit, threshold) keep their defaults.
+_DATE = {"type": "string"}
+_TEXT = {"type": "string"}
+
+
+def _tool(name: str, description: str, required=(), /, **properties) -> Dict:
+    parameters = {"type": "object", "properties": properties}
+    if required:
+        parameters["required"] = list(required)
+    return {"type": "function", "function": {"name": name, "description": description, "parameters": parameters}}
+
+
+TOOLS: List[Dict] = [
+    _tool("sales_summary", "Shop and laser revenue and profit, dates YYYY-MM-DD, default last 30 days",
+          start_date=_DATE, end_date=_DATE),
+    _tool("item_stock", "Stock and prices of items by name, supplier or notes", ("name",), name=_TEXT),
+    _tool("customer_purchases", "A customer's latest operations, by name or phone", ("customer",), customer=_TEXT),
+    _tool("top_sellers", "Best sellers, dates YYYY-MM-DD, default last 30 days", start_date=_DATE, end_date=_DATE),
+    _tool("low_stock", "Items with 3 units or fewer left"),
+]
+
+_KINDS = {"shop": ("product",), "laser": ("laser",), "all": ("product", "laser")}
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _kinds(line: str) -> tuple:
+    if line not in _KINDS:
+        raise ValueError(f"line must be one of {', '.join(_KINDS)}")
+    return _KINDS[line]
+
+
+def _date(value: Optional[str], default: datetime) -> str:
+    """value checked as a YYYY-MM-DD date, or default."""
+    if not value:
+        return default.strftime(DATE_FORMAT)
+    return datetime.strptime(value[:10], DATE_FORMAT).strftime(DATE_FORMAT)
+
+
+class _Call:
+    """One tool call on a database thread, so a timeout stops that call and nothing else.
+
+    The database threads keep one connection each and run the next queued
+    job on it as soon as this one returns, so the connection is only
+    interrupted while this call's tool is still running on it.
+    """
+
+    def __init__(self, tool, arguments: Dict):
+        self.tool = tool
+        self.arguments = arguments
+        self._lock = threading.Lock()
+        self._connection = None
+        self._abandoned = False
+
+    def __call__(self, pool):
+        connection = pool.connection()
+        with self._lock:
+            if self._abandoned:
+                return None  # timed out while queued; nobody waits for the result
+            self._connection = connection
+        try:
+            return self.tool(**self.arguments)
+        finally:
+            with self._lock:
+                self._connection = None
+
+    def abandon(self):
+        """Interrupt the call's query if it is running; skip it if it hasn't started."""
+        with self._lock:
+            self._abandoned = True
+            if self._connection is not None:
+                self._connection.interrupt()
+
+
+class QueryTools:
+    """Read-only database queries the chat model can call while answering.
+
+    Each tool runs fixed, parameterized statements of DatabaseHandler (no SQL
+    is built from model output) on the database threads, capped at max_rows
+    rows. A call running longer than timeout seconds is interrupted in SQLite
+    and reported to the model as an error. Results are cached per tool,
+    arguments, data version and date (the default ranges end today), so a
+    lookup repeated in a follow-up question doesn't touch the database.
+    """
+
+    def __init__(self, adb, timeout: float = 5.0, max_rows: int = 20):
+        self.adb = adb
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self.cache = ResponseCache(max_entries=512)
+        self.timeouts = 0
+        self._tools = {
+            "sales_summary": self.sales_summary,
+            "item_stock": self.item_stock,
+            "customer_purchases": self.customer_purchases,
+            "top_sellers": self.top_sellers,
+            "low_stock": self.low_stock,
+        }
+
+    definitions = TOOLS
+
+    def _limit(self, limit: Optional[int], default: int) -> int:
+        return max(1, min(int(limit or default), self.max_rows))
+
+    @staticmethod
+    def _period(start_date: Optional[str], end_date: Optional[str]):
+        today = datetime.now()
+        return _date(start_date, today - timedelta(days=29)), _date(end_date, today)
+
+    # ---------- Tools (run on a database thread) ----------
+    def sales_summary(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
+        start, end = self._period(start_date, end_date)
+        analytics = self.adb.db.get_analytics_data(start, end)
+        return {
+            "from": start, "to": end,
+            "shop": {"revenue": round(analytics["shop_revenue"], 2), "profit": round(analytics["shop_profit"], 2)},
+            "laser": {"revenue": round(analytics["laser_revenue"], 2), "profit": round(analytics["laser_profit"], 2)},
+        }
+
+    def item_stock(self, name: str, line: str = "all") -> List[Dict]:
+        found = self.adb.db.search(name, kinds=_kinds(line), limit=self._limit(None, 10))
+        items = [
+            {"line": "shop", "name": p["name"], "supplier": p["supplier"], "stock": p["stock"],
+             "purchase_price": p["purchase_price"], "sale_price": p["sale_price"]}
+            for p in found.get("product", [])
+        ]
+        items += [
+            {"line": "laser", "name": m["name"], "side": m["material_side"], "supplier": m["supplier"],
+             "stock": m["stock_quantity"], "purchase_price": m["purchase_price"], "sale_price": m["sale_price"]}
+            for m in found.get("laser", [])
+        ]
+        return items
+
+    def customer_purchases(self, customer: str, limit: Optional[int] = None) -> List[Dict]:
+        operations = self.adb.db.search(customer, kinds=("operation",), limit=self._limit(limit, 10))["operation"]
+        return [
+            {"date": o["date"][:10], "type": o["operation_type"], "item": o["item_name"], "quantity": o["quantity"],
+             "total": o["total_price"], "customer": o["customer_name"], "phone": o["customer_phone"]}
+            for o in operations
+        ]
+
+    def top_sellers(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                    line: str = "all", limit: Optional[int] = None) -> Dict:
+        _kinds(line)
+        start, end = self._period(start_date, end_date)
+        top = self.adb.db.get_top_selling_items(start, end, self._limit(limit, 5))
+        result = {"from": start, "to": end}
+        if line in ("shop", "all"):
+            result["shop"] = top["top_shop_products"]
+        if line in ("laser", "all"):
+            result["laser"] = top["top_laser_materials"]
+        return result
+
+    def low_stock(self, line: str = "all", threshold: float = 3, limit: Optional[int] = None) -> Dict:
+        found = self.adb.db.low_stock_items(float(threshold), self._limit(limit, 10), kinds=_kinds(line))
+        return {("shop" if kind == "product" else "laser"): rows for kind, rows in found.items()}
+
+    # ---------- Calling ----------
+    async def run(self, name: str, arguments: str) -> str:
+        """JSON result of one tool call; bad calls and failures come back as {"error": ...} for the model."""
+        tool = self._tools.get(name)
+        if tool is None:
+            return _dumps({"error": f"unknown tool: {name}"})
+        try:
+            args = json.loads(arguments or "{}")
+            if not isinstance(args, dict):
+                raise ValueError("arguments must be a JSON object")
+        except ValueError as e:
+            return _dumps({"error": f"invalid arguments: {e}"})
+
+        key = (f"{name} {_dumps(sorted(args.items()))}", await self.adb.data_version(), self.cache.today())
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+        call = _Call(tool, args)
+        try:
+            value = await asyncio.wait_for(self.adb.run(call, self.adb.db.pool), self.timeout)
+        except asyncio.TimeoutError:
+            # The thread can't be cancelled; stop its query instead
+            call.abandon()
+            self.timeouts += 1
+            return _dumps({"error": f"query took longer than {self.timeout:g}s"})
+        except Exception as e:
+            return _dumps({"error": str(e)})
+        result = _dumps(value)
+        self.cache.put(key, result)
+        return result
+
+    async def run_calls(self, tool_calls: List[Dict]) -> List[Dict]:
+        """Run the model's tool calls concurrently; returns the "tool" messages to send back."""
+        results = await asyncio.gather(*(
+            self.run(call["function"]["name"], call["function"].get("arguments")) for call in tool_calls
+        ))
+        return [
+            {"role": "tool", "tool_call_id": call["id"], "content": result}
+            for call, result in zip(tool_calls, results)
+        ]
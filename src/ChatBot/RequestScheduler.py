@@ -0,0 +1,222 @@
+import asyncio
+import random
+import time
+from contextlib import aclosing, asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Callable, Coroutine, Dict, Hashable, Optional
+
+from src.ChatBot.ChatRouter import LatencyStats
+
+
+def parse_retry_after(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay-seconds or an HTTP date), None if absent or unreadable."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+class _Broadcast:
+    """The pieces of one in-flight reply, replayed to every caller asking the same question."""
+
+    def __init__(self):
+        self.pieces = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.listeners = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def put(self, piece: str):
+        self.pieces.append(piece)
+        self._wake()
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.done, self.error = True, error
+        self._wake()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def changed(self):
+        await self._changed.wait()
+
+
+class RequestScheduler:
+    """Admission control for the chat API: how many requests run, which ones run, and when to retry.
+
+    - At most max_concurrent requests are sent at once (slot()); the others
+      wait in line, and a request cancelled while waiting is never sent.
+    - Callers asking the same question while it is being answered share one
+      request (shared()); it is aborted once none of them is listening.
+    - Every chat session has at most one question in flight (submit()): a
+      new one cancels the one it supersedes, waiting or running.
+    - Rate-limited requests are retried up to max_retries times after
+      retry_delay(): the server's Retry-After when it sends one, else
+      exponential backoff (backoff, 2*backoff, ... up to max_backoff) with
+      full jitter, so clients that were refused together don't return
+      together.
+
+    stats() reports queue depth, time spent waiting for a slot, retries,
+    shared and superseded requests.
+    """
+
+    def __init__(self, max_concurrent: int = 2, max_retries: int = 3, backoff: float = 1.0, max_backoff: float = 30.0,
+                 rng: Callable[[], float] = random.random, clock: Callable[[], float] = time.perf_counter):
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._rng = rng
+        self._clock = clock
+        self._loop = None
+        self._semaphore = None
+        self._inflight: Dict[Hashable, _Broadcast] = {}
+        self._sessions: Dict[Hashable, asyncio.Task] = {}
+        self.waits = LatencyStats()
+        self.running = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.coalesced = 0
+        self.superseded = 0
+
+    def _bind(self):
+        # asyncio primitives belong to one event loop; benchmarks run several in turn
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._inflight.clear()
+            self._sessions.clear()
+            self.running = self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the max_concurrent request slots, waiting in line for it if needed."""
+        self._bind()
+        started = self._clock()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.waits.add(self._clock() - started)
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+    def retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> Optional[float]:
+        """Seconds to wait before retry number attempt + 1 of a rate-limited request, None to give up.
+
+        A Retry-After longer than max_backoff isn't waited out: the caller
+        gets the rate-limit error (and ChatRouter answers locally meanwhile).
+        """
+        self.rate_limited += 1
+        if attempt >= self.max_retries:
+            return None
+        wait = parse_retry_after(retry_after)
+        if wait is None:
+            wait = self._rng() * min(self.max_backoff, self.backoff * 2 ** attempt)
+        elif wait > self.max_backoff:
+            return None
+        else:
+            # Spread the clients the server asked to come back at the same moment
+            wait += self._rng() * self.backoff
+        self.retries += 1
+        return wait
+
+    async def shared(self, key: Hashable, request: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """The pieces of request(), sent once for every caller asking with the same key at the same time.
+
+        The request runs in its own task; a caller joining late first gets
+        the pieces already received. Closing the last listener aborts it.
+        """
+        self._bind()
+        broadcast = self._inflight.get(key)
+        if broadcast is None:
+            broadcast = self._inflight[key] = _Broadcast()
+            broadcast.task = asyncio.create_task(self._produce(key, broadcast, request))
+        else:
+            self.coalesced += 1
+        broadcast.listeners += 1
+        seen = 0
+        try:
+            while True:
+                while seen < len(broadcast.pieces):
+                    seen += 1
+                    yield broadcast.pieces[seen - 1]
+                if broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                await broadcast.changed()
+        finally:
+            broadcast.listeners -= 1
+            if broadcast.listeners == 0 and not broadcast.done:
+                broadcast.task.cancel()
+                if self._inflight.get(key) is broadcast:
+                    del self._inflight[key]
+
+    async def _produce(self, key: Hashable, broadcast: _Broadcast, request: Callable[[], AsyncIterator[str]]):
+        error = None
+        try:
+            async with aclosing(request()) as pieces:
+                async for piece in pieces:
+                    broadcast.put(piece)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            broadcast.finish(error)
+            if self._inflight.get(key) is broadcast:
+                del self._inflight[key]
+
+    def submit(self, session_id: Hashable, question: Coroutine) -> asyncio.Task:
+        """Run a session's question as a task, cancelling the session's previous question if still running."""
+        self._bind()
+        previous = self._sessions.get(session_id)
+        if previous is not None and not previous.done():
+            previous.cancel()
+            self.superseded += 1
+        task = self._sessions[session_id] = asyncio.create_task(question)
+
+        def forget(done: asyncio.Task):
+            if self._sessions.get(session_id) is done:
+                del self._sessions[session_id]
+        task.add_done_callback(forget)
+        return task
+
+    def stats(self) -> Dict:
+        p50, p95 = self.waits.percentile(0.5), self.waits.percentile(0.95)
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self.running,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "wait_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "wait_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "in_flight_questions": len(self._inflight),
+            "coalesced": self.coalesced,
+            "superseded": self.superseded,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+        }
@@ -0,0 +1,95 @@
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Optional, Sequence
+
+from src.database.TextSearch import normalize
+from src.database.Timestamps import DATE_FORMAT
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+class ResponseCache:
+    """Bounded LRU cache of chatbot replies with a time-to-live.
+
+    Keys combine the normalized question, the database's data version, the
+    date and a digest of the context sent with it, so any sale, return or
+    inventory edit makes earlier answers unreachable, and answers about
+    "today" don't outlive midnight. Entries from an older data version are
+    dropped as soon as a newer version is seen.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 600.0, clock: Callable[[], float] = time.monotonic,
+                 today: Callable[[], str] = lambda: datetime.now().strftime(DATE_FORMAT)):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self.today = today
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._data_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def normalize_message(message: str) -> str:
+        """Fold case, Arabic letter variants, punctuation and spacing: "ربح المحل؟" == " ربح  المحل "."""
+        text = _PUNCTUATION.sub(" ", normalize(message).lower())
+        return _SPACES.sub(" ", text).strip()
+
+    def key(self, message: str, context: str, data_version: int, history: Sequence[Dict] = ()) -> tuple:
+        """history: the earlier turns sent with the question; a follow-up means something else after them."""
+        digest = hashlib.blake2b((context or "").encode("utf-8"), digest_size=16)
+        for turn in history:
+            digest.update(b"\0" + turn["role"].encode("utf-8") + b"\0" + turn["content"].encode("utf-8"))
+        return self.normalize_message(message), data_version, self.today(), digest.digest()
+
+    def _see_version(self, data_version: int):
+        if data_version != self._data_version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._data_version = data_version
+
+    def get(self, key: tuple) -> Optional[str]:
+        """Cached reply for key, or None."""
+        self._see_version(key[1])
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, reply = entry
+            if expires > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return reply
+            del self._entries[key]
+            self.expirations += 1
+        self.misses += 1
+        return None
+
+    def put(self, key: tuple, reply: str):
+        self._see_version(key[1])
+        self._entries[key] = (self._clock() + self.ttl, reply)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
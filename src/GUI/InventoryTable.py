@@ -0,0 +1,97 @@
+from typing import Callable, Dict, Optional
+from nicegui import ui
+from src.Services import services
+
+_PRICE = 'v => v == null ? "" : Number(v).toFixed(2)'
+
+COLUMNS = {
+    'product': [
+        {'name': 'name', 'label': 'الاسم', 'field': 'name', 'align': 'left', 'classes': 'font-bold'},
+        {'name': 'supplier', 'label': 'المورد', 'field': 'supplier', 'align': 'left', ':format': 'v => v || "N/A"'},
+        {'name': 'stock', 'label': 'الكمية', 'field': 'stock', 'align': 'center'},
+        {'name': 'purchase_price', 'label': 'شراء', 'field': 'purchase_price', 'align': 'center', ':format': _PRICE},
+        {'name': 'sale_price', 'label': 'بيع', 'field': 'sale_price', 'align': 'center', ':format': 'v => v || "لم يحدد"'},
+        {'name': 'actions', 'label': '', 'field': 'id', 'align': 'right'},
+    ],
+    'laser': [
+        {'name': 'name', 'label': 'الاسم', 'field': 'name', 'align': 'left', 'classes': 'font-bold'},
+        {'name': 'material_side', 'label': 'النوع', 'field': 'material_side', 'align': 'center'},
+        {'name': 'supplier', 'label': 'المورد', 'field': 'supplier', 'align': 'left', ':format': 'v => v || "N/A"'},
+        {'name': 'stock_quantity', 'label': 'الكمية', 'field': 'stock_quantity', 'align': 'center'},
+        {'name': 'purchase_price', 'label': 'شراء', 'field': 'purchase_price', 'align': 'center', ':format': _PRICE},
+        {'name': 'sale_price', 'label': 'بيع', 'field': 'sale_price', 'align': 'center', ':format': 'v => v || "لم يحدد"'},
+        {'name': 'actions', 'label': '', 'field': 'id', 'align': 'right'},
+    ],
+}
+
+EMPTY = {'product': 'لا توجد منتجات حالياً.', 'laser': 'لا توجد خامات حالياً.'}
+
+
+class InventoryTable:
+    """Paginated grid of products ('product') or laser materials ('laser').
+
+    One ui.table however big the inventory is: only the page on screen is
+    fetched (DatabaseHandler.get_items_page, narrowed by the search box) and
+    sent to the browser, and the edit/delete buttons are a slot template
+    rather than elements per row.
+    After an edit or delete, patch() re-reads that one row and updates it in
+    place instead of reloading the table.
+    """
+
+    def __init__(self, item_type: str, on_edit: Callable[[Dict], None], on_delete: Callable[[Dict], None],
+                 rows_per_page: int = 25):
+        self.item_type = item_type
+        self._loads = 0
+        self.table = ui.table(columns=COLUMNS[item_type], rows=[], row_key='id', pagination={
+            'page': 1, 'rowsPerPage': rows_per_page, 'rowsNumber': 0,
+        }).props(f':rows-per-page-options="[10, 25, 50, 100]" no-data-label="{EMPTY[item_type]}"').classes('w-full shadow-lg')
+        self.table.add_slot('body-cell-actions', r'''
+            <q-td :props="props">
+                <q-btn flat round icon="edit" @click="() => $parent.$emit('edit', props.row.id)" />
+                <q-btn flat round icon="delete" color="negative" @click="() => $parent.$emit('delete', props.row.id)" />
+            </q-td>
+        ''')
+        with self.table.add_slot('top-right'):
+            with ui.input(placeholder='ابحث...', on_change=lambda: self.load_page({**self.table.pagination, 'page': 1})) \
+                    .props('dense clearable debounce=300') as self.search:
+                with self.search.add_slot('append'):
+                    ui.icon('search')
+        self.table.on('request', lambda e: self.load_page(e.args['pagination']))
+        self.table.on('edit', lambda e: self._with_row(e.args, on_edit))
+        self.table.on('delete', lambda e: self._with_row(e.args, on_delete))
+
+    def _with_row(self, item_id: int, handler: Callable[[Dict], None]):
+        # The row as the server has it, not as the browser sent it
+        row = next((r for r in self.table.rows if r['id'] == item_id), None)
+        if row is not None:
+            handler(row)
+
+    async def load_page(self, pagination: Optional[Dict] = None):
+        """Fetch and show one page (the current one by default)."""
+        pagination = pagination or self.table.pagination
+        per_page = pagination.get('rowsPerPage') or 25
+        search = self.search.value
+        self._loads += 1
+        load = self._loads
+        total = await services.adb.count_items(self.item_type, search)
+        page = min(max(1, pagination.get('page', 1)), max(1, -(-total // per_page)))
+        rows = await services.adb.get_items_page(self.item_type, per_page, (page - 1) * per_page, search)
+        if load != self._loads:
+            return  # typed on or paged on meanwhile; that newer load shows its own page
+        # A copy: the cached page is shared, and patch() edits this list
+        self.table.rows = list(rows)
+        self.table.pagination = {**pagination, 'page': page, 'rowsPerPage': per_page, 'rowsNumber': total}
+        self.table.update()
+
+    async def patch(self, item_id: int):
+        """Show the current state of one row after it was edited or deleted."""
+        row = await services.adb.get_item(self.item_type, item_id)
+        for i, current in enumerate(self.table.rows):
+            if current['id'] == item_id:
+                if row is None:
+                    del self.table.rows[i]
+                    self.table.pagination = {**self.table.pagination, 'rowsNumber': self.table.pagination['rowsNumber'] - 1}
+                else:
+                    self.table.rows[i] = row
+                self.table.update()
+                return
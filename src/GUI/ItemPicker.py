@@ -0,0 +1,67 @@
+from typing import Dict
+from nicegui import ui
+from src.Services import services
+
+LABELS = {
+    'product': lambda p: f"{p['name']} (المتاح: {p['stock']})",
+    'laser': lambda m: f"{m['name']} ({m['material_side']}) (المتاح: {m['stock_quantity']})",
+}
+
+
+class _ServerSelect(ui.select, component='item_picker.js'):
+    """ui.select that shows the options as the server sets them, without narrowing them to the typed text.
+
+    ui.select filters its options in the browser to those whose label
+    contains the text typed. The server's matches for "احمر" include
+    "أحمر ...", and matches can come from a supplier or notes rather than
+    the label, so that filter would hide them.
+    """
+
+
+class ItemPicker:
+    """Select for a product ('product') or laser material ('laser') that searches as the cashier types.
+
+    The options are only the top `limit` matches for what is typed
+    (DatabaseHandler.find_items), fetched from the server with their
+    current stock, so the page doesn't load or send the whole catalog.
+    After a sale, patch() refreshes the stock of just the items sold.
+    """
+
+    def __init__(self, item_type: str, label: str, limit: int = 20):
+        self.item_type = item_type
+        self.limit = limit
+        self._searches = 0
+        self.select = _ServerSelect(options={}, label=label, with_input=True).classes('w-full')
+        self.select.on('input-value', lambda e: self.search(e.args), throttle=0.2)
+
+    def _option(self, item: Dict) -> str:
+        return LABELS[self.item_type](item)
+
+    async def search(self, text: str = ''):
+        """Show the items matching text (the first ones in name order if empty)."""
+        selected = self.select.value
+        if selected is not None and text == self.select.options.get(selected):
+            return  # the input echoing the chosen option, not the cashier typing
+        self._searches += 1
+        search = self._searches
+        items = await services.adb.find_items(self.item_type, text, self.limit)
+        if search != self._searches:
+            return  # typed on meanwhile; that newer search shows its own matches
+        options = {item['id']: self._option(item) for item in items}
+        # Keep the chosen item, or the select would drop it
+        selected = self.select.value
+        if selected is not None and selected not in options:
+            options[selected] = self.select.options[selected]
+        self.select.set_options(options)
+
+    async def patch(self, item_id: int):
+        """Show the current stock of one item, if it is among the options."""
+        if item_id not in self.select.options:
+            return
+        item = await services.adb.get_item(self.item_type, item_id)
+        options = dict(self.select.options)
+        if item is None:
+            del options[item_id]
+        else:
+            options[item_id] = self._option(item)
+        self.select.set_options(options)
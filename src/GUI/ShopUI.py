@@ -1,17 +1,11 @@
 from nicegui import ui
 import asyncio
-from src.database.DatabaseHandler import DatabaseHandler
-import json
-from src.ChatBot.ChatBot import ChatBot
-
-db = DatabaseHandler()
-chatbot = ChatBot()
+from collections import deque
+from src.Services import services
 
 class ShopUI:
     def __init__(self):
         self.current_page = "home"
-        self.chat_visible = False
-        self.chat_messages = []  # Store chat history
 
     def create_header(self):
         """Create the header with logo and updated navigation"""
@@ -33,75 +27,128 @@ class ShopUI:
         self.current_page = page_name
         ui.navigate.to(f'/{page_name}')
 
-    def create_chat_button(self):
-        chat_button = ui.button('💬', on_click=self.toggle_chat).classes(
-            'fixed bottom-4 right-4 z-50 bg-blue-500 hover:bg-blue-600 text-white rounded-full w-16 h-16 text-2xl shadow-lg'
-        )
-        return chat_button
+    def create_chat(self):
+        """Add the chat button and chat window to the page being built."""
+        return ChatPanel()
+
 
-    def toggle_chat(self):
-        self.chat_visible = not self.chat_visible
-        if hasattr(self, 'chat_container'):
-            self.chat_container.visible = self.chat_visible
+class ChatPanel:
+    """One page's chat: the 💬 button, the chat window and the conversation shown in it.
 
-    def create_chat_interface(self):
-        with ui.card().classes('fixed bottom-20 right-4 w-80 h-96 z-40 shadow-xl').bind_visibility_from(self, 'chat_visible') as chat_container:
-            self.chat_container = chat_container
+    Every page builds its own, so browser tabs don't share (and overwrite)
+    one chat. The conversation is the tab's ChatSession, looked up by
+    NiceGUI's tab id once the browser connects; the tab id outlives page
+    changes, so the conversation follows the user from page to page. Only
+    the newest max_labels messages stay on the page.
+    """
+
+    USER_CLASSES = 'text-blue-600 font-semibold mb-2 p-2 bg-blue-100 rounded'
+    REPLY_CLASSES = 'text-gray-700 mb-4 p-2 bg-gray-100 rounded'
+
+    def __init__(self, max_labels: int = 40):
+        self.visible = False
+        self.session = None  # the tab's ChatSession, once connected
+        self.max_labels = max_labels
+        self._labels = deque()
+
+        ui.button('💬', on_click=self.toggle).classes(
+            'fixed bottom-4 right-4 z-50 bg-blue-500 hover:bg-blue-600 text-white rounded-full w-16 h-16 text-2xl shadow-lg'
+        )
+        with ui.card().classes('fixed bottom-20 right-4 w-80 h-96 z-40 shadow-xl').bind_visibility_from(self, 'visible'):
             ui.label('🤖 أسامة - مساعد المحل').classes('text-lg font-bold text-center text-blue-600 p-2')
-            
+
             with ui.scroll_area().classes('h-64 border rounded p-2 bg-gray-50 mb-2') as chat_area:
                 self.chat_area = chat_area
-                # Add welcome message
-                with self.chat_area:
-                    ui.label('أسامة: أهلاً! اسأل عن أي حاجة في المحل 😊').classes('text-gray-700 mb-2 p-2 bg-blue-50 rounded')
-            
+                ui.label('أسامة: أهلاً! اسأل عن أي حاجة في المحل 😊').classes('text-gray-700 mb-2 p-2 bg-blue-50 rounded')
+
             with ui.row().classes('w-full gap-2'):
                 chat_input = ui.input(placeholder='اسأل عن أي حاجة في المحل...').classes('flex-1')
-                send_btn = ui.button('ابعت', on_click=lambda: asyncio.create_task(self.send_message(chat_input))).classes('bg-blue-500 text-white')
-                
+                ui.button('ابعت', on_click=lambda: self.submit(chat_input)).classes('bg-blue-500 text-white')
+
                 # Allow Enter key to send message
-                chat_input.on('keydown.enter', lambda: asyncio.create_task(self.send_message(chat_input)))
+                chat_input.on('keydown.enter', lambda: self.submit(chat_input))
 
-    async def send_message(self, input_field):
-        message = input_field.value.strip() if input_field.value else ''
-        if not message:
-            return
+        self.client = ui.context.client
+        self.client.on_connect(self._open_session)
 
-        input_field.value = ''
+    @property
+    def session_id(self) -> str:
+        """The browser tab's id (known once it has connected)."""
+        return self.client.tab_id or self.client.id
 
-        # Add user message to chat
-        with self.chat_area:
-            ui.label(f"أنت: {message}").classes('text-blue-600 font-semibold mb-2 p-2 bg-blue-100 rounded')
+    def toggle(self):
+        self.visible = not self.visible
 
-        # Show loading message
-        with self.chat_area:
-            loading_label = ui.label('أسامة: جاري التفكير... ⏳').classes('text-gray-500 italic mb-2')
+    async def _open_session(self):
+        """Load the tab's conversation and show its recent turns (on the first connect only)."""
+        if self.session is not None:
+            return
+        session = await services.adb.run(services.chat_sessions.get, self.session_id)
+        if self.session is not None:
+            return
+        self.session = session
+        for question, answer in session.turns:
+            self._add_label(f"أنت: {question}", self.USER_CLASSES)
+            self._add_label(f"أسامة: {answer}", self.REPLY_CLASSES)
 
-        try:
-            # The context gathering can be simplified as the chatbot logic can also be updated
-            # For now, this is a placeholder to ensure it doesn't crash.
-            context = {
-                "main_shop_products": len(db.get_all_products()),
-                "laser_materials": len(db.get_all_laser_materials()),
-                "operations": len(db.get_all_operations()),
-            }
+    def submit(self, input_field):
+        """Answer the question in input_field; a new question replaces the one still being answered.
 
-            # Get AI response
-            context_str = json.dumps(context, ensure_ascii=False, indent=2)
-            reply = await chatbot.get_response(message=message, context=context_str)
+        The field is emptied right away, so a double submit (Enter, then the
+        button) doesn't ask twice.
+        """
+        message = input_field.value.strip() if input_field.value else ''
+        if not message:
+            return
+        input_field.value = ''
+        services.chat_scheduler.submit(self.session_id, self.send_message(message))
 
-            # Remove loading message
-            loading_label.delete()
+    def _add_label(self, text: str, classes: str):
+        with self.chat_area:
+            label = ui.label(text).classes(classes)
+        self._labels.append(label)
+        while len(self._labels) > self.max_labels:
+            self._labels.popleft().delete()
+        return label
 
-            # Add AI response to chat
-            with self.chat_area:
-                ui.label(f"أسامة: {reply}").classes('text-gray-700 mb-4 p-2 bg-gray-100 rounded')
+    async def send_message(self, message: str):
+        # Add user message to chat
+        self._add_label(f"أنت: {message}", self.USER_CLASSES)
 
-            # Auto-scroll to bottom
-            self.chat_area.scroll_to(percent=1.0)
+        # Show loading message until the first words arrive
+        reply_label = self._add_label('أسامة: جاري التفكير... ⏳', 'text-gray-500 italic mb-2')
 
+        reply, failed = '', False
+        try:
+            chatbot = services.chatbot
+            # Only the rows relevant to the question, within a fixed token budget,
+            # for bots that don't look the data up themselves
+            if chatbot.wants_context:
+                context_str = await services.adb.run(services.context_builder.build, message)
+            else:
+                context_str = ""
+            # The summary and newest turns of this tab's conversation, within their own budget
+            history = self.session.messages() if self.session is not None else ()
+
+            # Stream the AI response into the label
+            async for piece in chatbot.stream_response(message=message, context=context_str, history=history):
+                if not reply:
+                    reply_label.classes(replace=self.REPLY_CLASSES)
+                failed = failed or piece.startswith("❌")
+                reply += piece
+                reply_label.text = f"أسامة: {reply}"
+                # Auto-scroll to bottom
+                self.chat_area.scroll_to(percent=1.0)
+
+            if not reply:
+                reply_label.text = "أسامة: ❌ الرد فارغ من النموذج"
+            elif not failed and self.session is not None:
+                await services.adb.run(self.session.add, message, reply)
+
+        except asyncio.CancelledError:
+            reply_label.text = f"أسامة: {reply} (تم الإيقاف)" if reply else "أسامة: (تم الإيقاف)"
+            raise
         except Exception as e:
-            # Remove loading message and show error
-            loading_label.delete()
-            with self.chat_area:
-                ui.label(f"أسامة: ❌ حدث خطأ: {str(e)}").classes('text-red-600 mb-4 p-2 bg-red-50 rounded')
\ No newline at end of file
+            # Show the error in place of the reply
+            reply_label.text = f"أسامة: ❌ حدث خطأ: {str(e)}"
+            reply_label.classes(replace='text-red-600 mb-4 p-2 bg-red-50 rounded')
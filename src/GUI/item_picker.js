@@ -0,0 +1,33 @@
+// ui.select's component (nicegui/elements/select.js) without its filtering:
+// the options are the matches ItemPicker.search() sent for what was typed,
+// and they are shown as they are.
+export default {
+  props: ["options"],
+  template: `
+    <q-select
+      ref="qRef"
+      v-bind="$attrs"
+      :options="options"
+      @filter="(val, update) => update()"
+      @popup-show="addClass"
+      @popup-hide="removeClass"
+    >
+      <template v-for="(_, slot) in $slots" v-slot:[slot]="slotProps">
+        <slot :name="slot" v-bind="slotProps || {}" />
+      </template>
+    </q-select>
+  `,
+  methods: {
+    addClass() {
+      // As in select.js: keep the page from scrolling when the popup closes
+      document.documentElement.classList.add("nicegui-select-popup-open");
+    },
+    async removeClass() {
+      await this.$nextTick();
+      document.documentElement.classList.remove("nicegui-select-popup-open");
+    },
+  },
+  unmounted() {
+    this.removeClass();
+  },
+};
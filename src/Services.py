@@ -0,0 +1,152 @@
+import os
+import threading
+
+
+class Services:
+    """The app's shared, lazily created singletons.
+
+    Importing a module costs nothing; the database is opened (and migrated) on
+    first use of `services.db`, and the chatbot is built on first use of
+    `services.chatbot`. Every page, ShopUI and LocalChatBot share these
+    instances instead of constructing their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._db = None
+        self._adb = None
+        self._chatbot = None
+        self._context_builder = None
+        self._query_tools = None
+        self._search_index = None
+        self._chat_sessions = None
+        self._chat_scheduler = None
+
+    def configure(self, db=None, chatbot=None):
+        """Use these instances instead of the defaults (for tools and benchmarks)."""
+        with self._lock:
+            if db is not None:
+                self._db, self._adb, self._context_builder, self._query_tools, self._search_index = db, None, None, None, None
+            if chatbot is not None:
+                self._chatbot = chatbot
+
+    @property
+    def db(self):
+        """The DatabaseHandler."""
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    from src.database.DatabaseHandler import DatabaseHandler
+                    self._db = DatabaseHandler()
+        return self._db
+
+    @property
+    def adb(self):
+        """The AsyncDatabaseHandler wrapping db, for UI handlers."""
+        if self._adb is None:
+            with self._lock:
+                if self._adb is None:
+                    from src.database.AsyncDatabaseHandler import AsyncDatabaseHandler
+                    self._adb = AsyncDatabaseHandler(self.db)
+        return self._adb
+
+    @property
+    def context_builder(self):
+        """The ContextBuilder turning a chat question into database context."""
+        if self._context_builder is None:
+            with self._lock:
+                if self._context_builder is None:
+                    from src.ChatBot.ContextBuilder import ContextBuilder
+                    self._context_builder = ContextBuilder(self.db)
+        return self._context_builder
+
+    @property
+    def query_tools(self):
+        """The QueryTools the chat model calls to look up shop data."""
+        if self._query_tools is None:
+            with self._lock:
+                if self._query_tools is None:
+                    from src.ChatBot.QueryTools import QueryTools
+                    self._query_tools = QueryTools(self.adb)
+        return self._query_tools
+
+    @property
+    def search_index(self):
+        """The InvertedIndex LocalChatBot looks items and operations up in (built on its first lookup)."""
+        if self._search_index is None:
+            with self._lock:
+                if self._search_index is None:
+                    from src.database.InvertedIndex import InvertedIndex
+                    self._search_index = InvertedIndex(self.db)
+        return self._search_index
+
+    @property
+    def chat_sessions(self):
+        """The ChatSessions registry, one conversation per browser tab, persisted in data/chat_history.db."""
+        if self._chat_sessions is None:
+            with self._lock:
+                if self._chat_sessions is None:
+                    from src.ChatBot.ChatSession import ChatSessions
+                    from src.database.ChatHistory import ChatHistory
+                    self._chat_sessions = ChatSessions(ChatHistory())
+        return self._chat_sessions
+
+    @property
+    def chat_scheduler(self):
+        """The RequestScheduler every chat API request goes through (CHAT_CONCURRENCY at once, default 2)."""
+        if self._chat_scheduler is None:
+            with self._lock:
+                if self._chat_scheduler is None:
+                    from src.ChatBot.RequestScheduler import RequestScheduler
+                    self._chat_scheduler = RequestScheduler(max_concurrent=int(os.getenv("CHAT_CONCURRENCY") or 2))
+        return self._chat_scheduler
+
+    @property
+    def chatbot(self):
+        """ChatRouter over ChatBot and LocalChatBot when an API key is configured, else LocalChatBot.
+
+        The API isn't contacted here; probe_chatbot() checks it in the background.
+        """
+        if self._chatbot is None:
+            with self._lock:
+                if self._chatbot is None:
+                    from src.ChatBot.ChatBot import ChatBot, LocalChatBot
+                    from src.ChatBot.ChatRouter import ChatRouter
+                    try:
+                        chatbot = ChatBot()
+                        if not chatbot.api_key:
+                            print("ℹ️ No API key found, using local chatbot")
+                            chatbot = LocalChatBot()
+                        else:
+                            # Seconds to wait for the API's first words before answering locally
+                            deadline = float(os.getenv("CHAT_DEADLINE") or 10)
+                            chatbot = ChatRouter(chatbot, LocalChatBot(), deadline=deadline)
+                    except Exception as e:
+                        print(f"⚠️ ChatBot initialization failed, using local chatbot: {e}")
+                        chatbot = LocalChatBot()
+                    self._chatbot = chatbot
+        return self._chatbot
+
+    async def probe_chatbot(self):
+        """Check the chatbot API (run as a background task); while it fails, LocalChatBot answers."""
+        from src.ChatBot.ChatRouter import ChatRouter
+        chatbot = self.chatbot
+        if isinstance(chatbot, ChatRouter):
+            await chatbot.probe()
+
+    async def close(self):
+        """Close the chatbot's HTTP connections, stop the database threads and close the databases."""
+        if hasattr(self._chatbot, 'aclose'):
+            await self._chatbot.aclose()
+        with self._lock:
+            if self._adb is not None:
+                self._adb.close()
+            if self._db is not None:
+                self._db.close()
+            if self._chat_sessions is not None:
+                self._chat_sessions.close()
+            self._adb = self._db = self._context_builder = self._query_tools = self._search_index = None
+            self._chat_sessions = None
+
+
+services = Services()
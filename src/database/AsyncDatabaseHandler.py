@@ -0,0 +1,43 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from src.database.DatabaseHandler import DatabaseHandler
+
+
+class AsyncDatabaseHandler:
+    """Awaitable facade over DatabaseHandler for NiceGUI event handlers.
+
+    `await adb.get_all_products()` runs db.get_all_products() on a small,
+    bounded thread pool so a slow report or import never blocks the event loop
+    (and with it every connected client). Each worker thread gets its own
+    pooled SQLite connection; WAL lets the readers run side by side while
+    writers queue on SQLite's lock.
+
+    Pure helpers that don't touch the database (e.g. operation_cursor) are
+    still reachable synchronously through `adb.db`.
+    """
+
+    def __init__(self, db: DatabaseHandler, max_workers: int = 4):
+        self.db = db
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run any blocking callable (e.g. BulkImport.import_file) on the database threads."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.db, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+        return call
+
+    def close(self):
+        """Wait for running calls, then stop the worker threads."""
+        self._executor.shutdown(wait=True)
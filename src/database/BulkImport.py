@@ -0,0 +1,164 @@
+import csv
+import io
+import os
+from datetime import date, datetime
+from typing import IO, Any, Callable, Dict, Iterator, Optional, Union
+
+from src.database.DatabaseHandler import DatabaseHandler
+
+# Accepted header names per field (English and the Arabic labels used in the app)
+PRODUCT_FIELDS = {
+    'name': ['name', 'اسم المنتج', 'المنتج', 'الاسم'],
+    'supplier': ['supplier', 'المورد', 'اسم المورد'],
+    'purchase_date': ['purchase_date', 'date', 'تاريخ الشراء', 'التاريخ'],
+    'purchase_price': ['purchase_price', 'price', 'سعر الشراء', 'سعر الشراء (الجملة)', 'السعر'],
+    'sale_price': ['sale_price', 'سعر البيع'],
+    'stock': ['stock', 'quantity', 'الكمية'],
+    'notes': ['notes', 'ملاحظات'],
+}
+LASER_FIELDS = {
+    'name': ['name', 'اسم الخامة', 'الخامة', 'الاسم'],
+    'material_side': ['material_side', 'side', 'نوع الخامة', 'النوع'],
+    'supplier': ['supplier', 'المورد', 'اسم المورد'],
+    'purchase_date': ['purchase_date', 'date', 'تاريخ الشراء', 'التاريخ'],
+    'purchase_price': ['purchase_price', 'price', 'سعر الشراء', 'السعر'],
+    'sale_price': ['sale_price', 'سعر البيع'],
+    'stock_quantity': ['stock_quantity', 'stock', 'quantity', 'الكمية'],
+    'notes': ['notes', 'ملاحظات'],
+}
+FIELDS = {'product': PRODUCT_FIELDS, 'laser': LASER_FIELDS}
+REQUIRED = {
+    'product': ('name', 'purchase_price', 'stock'),
+    'laser': ('name', 'material_side', 'purchase_price', 'stock_quantity'),
+}
+MATERIAL_SIDES = ('وش', 'ظهر')
+
+Source = Union[str, IO[bytes]]
+
+
+def _read_csv(source: Source) -> Iterator[Dict[str, Any]]:
+    if isinstance(source, str):
+        with open(source, newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+    else:
+        yield from csv.DictReader(io.TextIOWrapper(source, encoding='utf-8-sig', newline=''))
+
+
+def _read_xlsx(source: Source) -> Iterator[Dict[str, Any]]:
+    # Checked now rather than on the first row, so the file is refused before the import starts
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ImportError("openpyxl is required to import .xlsx files (pip install openpyxl)") from e
+    return _xlsx_rows(load_workbook, source)
+
+
+def _xlsx_rows(load_workbook, source: Source) -> Iterator[Dict[str, Any]]:
+    # read_only streams rows from the archive instead of building the whole sheet
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(h).strip() if h is not None else '' for h in header]
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def read_rows(source: Source, filename: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream raw rows (header -> value) from a CSV or XLSX path or binary file object."""
+    name = filename or (source if isinstance(source, str) else getattr(source, 'name', '')) or ''
+    extension = os.path.splitext(str(name))[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        return _read_xlsx(source)
+    if extension in ('.csv', '.txt', ''):
+        return _read_csv(source)
+    raise ValueError(f"Unsupported file type: {extension}")
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    return float(str(value).strip().replace(',', ''))
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _date(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y-%m-%d')
+    return _text(value) or datetime.now().strftime('%Y-%m-%d')
+
+
+def parse_rows(raw_rows: Iterator[Dict[str, Any]], item_type: str, skipped: Dict, max_errors: int = 50) -> Iterator[Dict]:
+    """Map raw rows to DatabaseHandler.import_items rows, skipping invalid ones.
+
+    skipped['count'] counts skipped rows; skipped['errors'] describes the first max_errors.
+    """
+    skipped.setdefault('count', 0)
+    skipped.setdefault('errors', [])
+    fields = FIELDS[item_type]
+    columns = None
+    for line_number, raw in enumerate(raw_rows, start=2):  # line 1 is the header
+        if columns is None:
+            normalized = {str(h).strip().lower(): h for h in raw.keys() if h is not None}
+            columns = {
+                field: next((normalized[a.lower()] for a in aliases if a.lower() in normalized), None)
+                for field, aliases in fields.items()
+            }
+            missing = [f for f in REQUIRED[item_type] if columns[f] is None]
+            if missing:
+                raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+        values = {field: (raw.get(column) if column else None) for field, column in columns.items()}
+        if all(v in (None, '') for v in values.values()):
+            continue
+        try:
+            name = _text(values['name'])
+            if not name:
+                raise ValueError("empty name")
+            row = {
+                'name': name,
+                'supplier': _text(values['supplier']),
+                'purchase_date': _date(values['purchase_date']),
+                'purchase_price': _number(values['purchase_price']),
+                'sale_price': _number(values['sale_price']) if _text(values['sale_price']) else None,
+                'notes': _text(values['notes']),
+            }
+            if item_type == 'product':
+                row['stock'] = int(_number(values['stock']))
+            else:
+                side = _text(values['material_side'])
+                if side not in MATERIAL_SIDES:
+                    raise ValueError(f"material side must be one of {', '.join(MATERIAL_SIDES)}")
+                row['material_side'] = side
+                row['stock_quantity'] = _number(values['stock_quantity'])
+        except (TypeError, ValueError) as e:
+            skipped['count'] += 1
+            if len(skipped['errors']) < max_errors:
+                skipped['errors'].append(f"line {line_number}: {e}")
+            continue
+        yield row
+
+
+def import_file(db: DatabaseHandler, source: Source, item_type: str, filename: Optional[str] = None,
+                chunk_size: int = 5000, progress: Optional[Callable[[int], None]] = None) -> Dict:
+    """Stream a supplier price list (CSV/XLSX) into products or laser materials.
+
+    Returns DatabaseHandler.import_items' summary plus 'skipped' (row count) and
+    'errors' (the first few skipped rows and why).
+    """
+    skipped: Dict = {}
+    rows = parse_rows(read_rows(source, filename), item_type, skipped)
+    summary = db.import_items(item_type, rows, chunk_size=chunk_size, progress=progress)
+    summary['skipped'] = skipped['count']
+    summary['errors'] = skipped['errors']
+    return summary
@@ -0,0 +1,76 @@
+import os
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from src.database.ConnectionPool import ConnectionPool
+from src.database.DatabaseHandler import resource_path
+from src.database.Timestamps import to_timestamp
+
+
+class ChatHistory:
+    """Chat conversations persisted in their own SQLite file.
+
+    Kept out of the shop database on purpose: a commit there changes the data
+    version, and a chat turn must not invalidate the inventory and answer
+    caches. Each session keeps its summary and its newest keep_turns turns;
+    older turns are deleted as new ones are written, and sessions idle for
+    more than max_age_days are removed by prune().
+    """
+
+    def __init__(self, db_name: str = "data/chat_history.db", keep_turns: int = 20, max_age_days: int = 30):
+        self.db_name = resource_path(db_name)
+        os.makedirs(os.path.dirname(self.db_name), exist_ok=True)
+        self.pool = ConnectionPool(self.db_name)
+        self.keep_turns = keep_turns
+        self.max_age_days = max_age_days
+        with self.pool.transaction() as cursor:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                "id TEXT PRIMARY KEY, summary TEXT NOT NULL DEFAULT '', updated INTEGER NOT NULL)"
+            )
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated ON chat_sessions (updated)")
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS chat_turns ("
+                "session_id TEXT NOT NULL, seq INTEGER NOT NULL, question TEXT NOT NULL, answer TEXT NOT NULL, "
+                "ts INTEGER NOT NULL, PRIMARY KEY (session_id, seq)) WITHOUT ROWID"
+            )
+
+    def close(self):
+        self.pool.close_all()
+
+    def load(self, session_id: str, limit: int) -> Tuple[str, int, List[Tuple[str, str]]]:
+        """(summary, last turn number, newest `limit` (question, answer) turns oldest first) of a session."""
+        row = self.pool.execute("SELECT summary FROM chat_sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return "", 0, []
+        turns = self.pool.execute(
+            "SELECT seq, question, answer FROM chat_turns WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+            (session_id, limit)
+        ).fetchall()
+        last = turns[0]["seq"] if turns else 0
+        return row["summary"], last, [(t["question"], t["answer"]) for t in reversed(turns)]
+
+    def append(self, session_id: str, seq: int, question: str, answer: str, summary: str):
+        """Write turn number seq and the session's current summary; drops turns past keep_turns."""
+        ts = to_timestamp(datetime.now())
+        with self.pool.transaction() as cursor:
+            cursor.execute(
+                "INSERT OR REPLACE INTO chat_turns (session_id, seq, question, answer, ts) VALUES (?, ?, ?, ?, ?)",
+                (session_id, seq, question, answer, ts)
+            )
+            cursor.execute("DELETE FROM chat_turns WHERE session_id = ? AND seq <= ?", (session_id, seq - self.keep_turns))
+            cursor.execute(
+                "INSERT INTO chat_sessions (id, summary, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET summary = excluded.summary, updated = excluded.updated",
+                (session_id, summary, ts)
+            )
+
+    def prune(self) -> int:
+        """Delete sessions idle for more than max_age_days; returns how many."""
+        cutoff = to_timestamp(datetime.now() - timedelta(days=self.max_age_days))
+        with self.pool.transaction() as cursor:
+            cursor.execute(
+                "DELETE FROM chat_turns WHERE session_id IN (SELECT id FROM chat_sessions WHERE updated < ?)", (cutoff,)
+            )
+            cursor.execute("DELETE FROM chat_sessions WHERE updated < ?", (cutoff,))
+            return cursor.rowcount
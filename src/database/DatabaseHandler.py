@@ -1,8 +1,17 @@
+import json
+import re
 import sqlite3
-from typing import List, Dict, Optional
+from contextlib import contextmanager
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
 import os
 import sys
+from src.database.ConnectionPool import ConnectionPool, DEFAULT_PROFILE
+from src.database.InventoryCache import InventoryCache
+from src.database.Migrations import migrate
+from src.database.TextSearch import match_query
+from src.database.Timestamps import DATE_FORMAT, SECONDS_PER_DAY, to_timestamp, format_timestamp, day_number, day_range
 
 def resource_path(relative_path: str) -> str:
     """Get absolute path to resource, works for dev and for PyInstaller exe"""
@@ -13,151 +22,164 @@ def resource_path(relative_path: str) -> str:
     return os.path.join(base_path, relative_path)
 
 class DatabaseHandler:
-    def __init__(self, db_name: str = "data/venom_shop.db"):
+    def __init__(self, db_name: str = "data/venom_shop.db", profile: str = DEFAULT_PROFILE, **pool_options):
         self.db_name = resource_path(db_name)
         os.makedirs(os.path.dirname(self.db_name), exist_ok=True)
+        self.pool = ConnectionPool(self.db_name, profile=profile, **pool_options)
+        self.cache = InventoryCache(self.pool.open)
+        self._listeners: List[Callable[[str, int], None]] = []
         self.create_database()
 
-    def _ensure_column(self, cursor, table: str, column: str, decl: str):
-        cursor.execute(f"PRAGMA table_info({table})")
-        cols = [r[1] for r in cursor.fetchall()]
-        if column not in cols:
-            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    def close(self):
+        """Close all pooled connections"""
+        self.cache.close()
+        self.pool.close_all()
 
-    def create_database(self):
-        """Create database and tables if they don't exist, and migrate schema if needed"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Cursor]:
+        """pool.transaction() that also invalidates the inventory cache."""
+        try:
+            with self.pool.transaction() as cursor:
+                yield cursor
+        finally:
+            self.cache.bump()
 
-        # Products Table
-        cursor.execute(
-            '''
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                supplier TEXT,
-                purchase_date TEXT,
-                purchase_price REAL NOT NULL,
-                sale_price REAL,
-                stock INTEGER NOT NULL,
-                notes TEXT,
-                UNIQUE(name, purchase_price)
-            )
-            '''
-        )
+    def _cached(self, key, load: Callable):
+        return self.cache.get(key, load)
 
-        # Operations Table (replaces Orders)
-        cursor.execute(
-            '''
-            CREATE TABLE IF NOT EXISTS operations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_id INTEGER,
-                laser_material_id INTEGER,
-                operation_type TEXT NOT NULL, -- sale, return, waste
-                customer_name TEXT,
-                customer_phone TEXT,
-                quantity REAL NOT NULL,
-                total_price REAL NOT NULL,
-                date TEXT NOT NULL,
-                FOREIGN KEY (product_id) REFERENCES products (id),
-                FOREIGN KEY (laser_material_id) REFERENCES laser_materials (id)
-            )
-            '''
-        )
+    def cache_stats(self) -> Dict:
+        """Inventory cache hit/miss counters and current write version."""
+        return self.cache.stats()
 
-        # Laser Materials Table
-        cursor.execute(
-            '''
-            CREATE TABLE IF NOT EXISTS laser_materials (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                material_side TEXT NOT NULL, -- 'وش' or 'ظهر'
-                supplier TEXT,
-                purchase_date TEXT,
-                purchase_price REAL NOT NULL,
-                sale_price REAL,
-                stock_quantity REAL NOT NULL DEFAULT 0,
-                notes TEXT,
-                UNIQUE(name, material_side, purchase_price)
-            )
-            '''
-        )
-        conn.commit()
-        conn.close()
+    def add_listener(self, callback: Callable[[str, int], None]):
+        """Call callback(table, row_id) after this handler commits an edit or deletion of an item.
+
+        New rows aren't reported: ids only grow, so readers find them by id.
+        """
+        self._listeners.append(callback)
+
+    def _edited(self, table: str, row_id: int):
+        for callback in self._listeners:
+            try:
+                callback(table, row_id)
+            except Exception as e:
+                # The write is committed; a failing listener must not report it as failed
+                print(f"⚠️ Write listener failed: {e}")
+
+    def data_version(self) -> int:
+        """A number that changes whenever inventory or operations change, through any connection."""
+        return self.cache.version()
+
+    def create_database(self):
+        """Create or upgrade the schema; a single PRAGMA read once it is current."""
+        migrate(self.pool.connection())
 
     # ---------- Products ----------
     def add_product(self, name: str, supplier: Optional[str], purchase_date: str, purchase_price: float, stock: int) -> bool:
         """Add a new product to the database"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO products (name, supplier, purchase_date, purchase_price, stock) VALUES (?, ?, ?, ?, ?)",
-                (name, supplier, purchase_date, float(purchase_price), int(stock))
-            )
-            conn.commit()
-            conn.close()
+            with self._write() as cursor:
+                cursor.execute(
+                    "INSERT INTO products (name, supplier, purchase_date, purchase_price, stock) VALUES (?, ?, ?, ?, ?)",
+                    (name, supplier, purchase_date, float(purchase_price), int(stock))
+                )
             return True
         except sqlite3.IntegrityError:
-            conn.close()
             return False
         except Exception:
-            conn.close()
             return False
 
 
     def get_product_by_name_and_price(self, name: str, purchase_price: float) -> Optional[Dict]:
         """Get product by name and purchase price"""
-        conn = sqlite3.connect(self.db_name)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        def load() -> Optional[Dict]:
+            row = self.pool.execute(
+                "SELECT * FROM products WHERE name = ? AND purchase_price = ?",
+                (name, purchase_price),
+            ).fetchone()
+            return dict(row) if row else None
+        return self._cached(("product", name, purchase_price), load)
+
+    # A product whose name is taken at another purchase price is added as "name (n)"
+    _RENAMED = re.compile(r" \((\d+)\)$")
+
+    def _products_named(self, cursor, names: Sequence[str]) -> Dict[str, Dict[float, Tuple[Optional[int], str]]]:
+        """For each name: purchase_price -> (id, name) of the products named it or "it (n)"."""
+        found: Dict[str, Dict[float, Tuple[Optional[int], str]]] = {name: {} for name in names}
+        if not names:
+            return found
+        # One range per name along the (name, purchase_price) index: name itself up to "name )"
         cursor.execute(
-            "SELECT * FROM products WHERE name = ? AND purchase_price = ?",
-            (name, purchase_price),
+            f"WITH k(base) AS (VALUES {', '.join(['(?)'] * len(found))}) "
+            "SELECT k.base, t.id, t.name, t.purchase_price FROM k CROSS JOIN products t "
+            "ON t.name >= k.base AND t.name < k.base || ' )'",
+            list(found)
         )
-        row = cursor.fetchone()
-        conn.close()
-        return dict(row) if row else None
+        for base, product_id, name, price in cursor.fetchall():
+            if name == base or (name.startswith(base) and self._RENAMED.fullmatch(name[len(base):])):
+                found[base][price] = (product_id, name)
+        return found
+
+    @staticmethod
+    def _product_name(name: str, purchase_price: float, named: Dict[float, Tuple[Optional[int], str]]) -> Tuple[Optional[int], str]:
+        """(id, name) of the product name at purchase_price restocks, or (None, the name a new one gets)."""
+        if purchase_price in named:
+            return named[purchase_price]
+        taken = {existing for _, existing in named.values()}
+        if name not in taken:
+            return None, name
+        n = 2
+        while f"{name} ({n})" in taken:
+            n += 1
+        return None, f"{name} ({n})"
+
+    def resolve_product(self, name: str, purchase_price: float) -> Tuple[Optional[int], str]:
+        """The product an entry of name at purchase_price adds stock to, as (id, its name), or (None, the name to add it under).
+
+        Products are told apart by name in the pickers and top sellers, so
+        the same name at a new price is added as "name (n)"; a later entry
+        at that price finds "name (n)" again. The add-items form and
+        import_items both follow this rule.
+        """
+        purchase_price = float(purchase_price)
+        named = self._products_named(self.pool.connection().cursor(), [name])[name]
+        return self._product_name(name, purchase_price, named)
+
+    def get_products_by_name(self, name: str) -> List[Dict]:
+        """All products with exactly this name (one per purchase price)"""
+        return self._cached(("products_named", name), lambda: [
+            dict(r) for r in self.pool.execute("SELECT * FROM products WHERE name = ? ORDER BY id", (name,)).fetchall()
+        ])
 
 
     def update_product_stock(self, product_id: int, quantity_change: int) -> bool:
         """Update product stock"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE products SET stock = stock + ? WHERE id = ?",
-                (quantity_change, product_id)
-            )
-            conn.commit()
-            conn.close()
+            with self._write() as cursor:
+                cursor.execute(
+                    "UPDATE products SET stock = stock + ? WHERE id = ?",
+                    (quantity_change, product_id)
+                )
             return True
         except Exception:
-            conn.close()
             return False
 
 
     def get_all_products(self) -> List[Dict]:
-        """Get all products"""
-        conn = sqlite3.connect(self.db_name)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM products ORDER BY name")
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        """Get all products (cached; treat the result as read-only)"""
+        return self._cached("products", lambda: [
+            dict(r) for r in self.pool.execute("SELECT * FROM products ORDER BY name").fetchall()
+        ])
 
     def update_product(self, product_id: int, name: str, supplier: str, purchase_price: float, sale_price: float, stock: int, notes: str) -> bool:
         """Update product information"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE products SET name = ?, supplier = ?, purchase_price = ?, sale_price = ?, stock = ?, notes = ? WHERE id = ?",
-                (name, supplier, purchase_price, sale_price, stock, notes, product_id)
-            )
-            conn.commit()
-            conn.close()
+            with self._write() as cursor:
+                cursor.execute(
+                    "UPDATE products SET name = ?, supplier = ?, purchase_price = ?, sale_price = ?, stock = ?, notes = ? WHERE id = ?",
+                    (name, supplier, purchase_price, sale_price, stock, notes, product_id)
+                )
+            self._edited('products', product_id)
             return True
         except Exception:
             return False
@@ -165,12 +187,10 @@ class DatabaseHandler:
     def delete_product(self, product_id: int) -> bool:
         """Delete a product"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM operations WHERE product_id = ?", (product_id,))
-            cursor.execute("DELETE FROM products WHERE id = ?", (product_id,))
-            conn.commit()
-            conn.close()
+            with self._write() as cursor:
+                cursor.execute("DELETE FROM operations WHERE product_id = ?", (product_id,))
+                cursor.execute("DELETE FROM products WHERE id = ?", (product_id,))
+            self._edited('products', product_id)
             return True
         except Exception:
             return False
@@ -179,14 +199,11 @@ class DatabaseHandler:
     def add_laser_material(self, name: str, material_side: str, supplier: Optional[str], purchase_date: str, purchase_price: float, stock_quantity: float) -> bool:
         """Add a new laser material"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO laser_materials (name, material_side, supplier, purchase_date, purchase_price, stock_quantity) VALUES (?, ?, ?, ?, ?, ?)",
-                (name, material_side, supplier, purchase_date, purchase_price, stock_quantity)
-            )
-            conn.commit()
-            conn.close()
+            with self._write() as cursor:
+                cursor.execute(
+                    "INSERT INTO laser_materials (name, material_side, supplier, purchase_date, purchase_price, stock_quantity) VALUES (?, ?, ?, ?, ?, ?)",
+                    (name, material_side, supplier, purchase_date, purchase_price, stock_quantity)
+                )
             return True
         except sqlite3.IntegrityError:
             return False
@@ -195,55 +212,43 @@ class DatabaseHandler:
 
     def get_laser_material_by_name_side_price(self, name: str, material_side: str, purchase_price: float) -> Optional[Dict]:
         """Get laser material by name, side, and purchase price"""
-        conn = sqlite3.connect(self.db_name)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT * FROM laser_materials WHERE name = ? AND material_side = ? AND purchase_price = ?",
-            (name, material_side, purchase_price),
-        )
-        row = cursor.fetchone()
-        conn.close()
-        return dict(row) if row else None
+        def load() -> Optional[Dict]:
+            row = self.pool.execute(
+                "SELECT * FROM laser_materials WHERE name = ? AND material_side = ? AND purchase_price = ?",
+                (name, material_side, purchase_price),
+            ).fetchone()
+            return dict(row) if row else None
+        return self._cached(("laser_material", name, material_side, purchase_price), load)
 
 
     def update_laser_material_stock(self, material_id: int, quantity_change: float) -> bool:
         """Update laser material stock"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE laser_materials SET stock_quantity = stock_quantity + ? WHERE id = ?",
-                (quantity_change, material_id)
-            )
-            conn.commit()
-            conn.close()
+            with self._write() as cursor:
+                cursor.execute(
+                    "UPDATE laser_materials SET stock_quantity = stock_quantity + ? WHERE id = ?",
+                    (quantity_change, material_id)
+                )
             return True
         except Exception:
             return False
 
 
     def get_all_laser_materials(self) -> List[Dict]:
-        """Get all laser materials"""
-        conn = sqlite3.connect(self.db_name)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM laser_materials ORDER BY name")
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        """Get all laser materials (cached; treat the result as read-only)"""
+        return self._cached("laser_materials", lambda: [
+            dict(r) for r in self.pool.execute("SELECT * FROM laser_materials ORDER BY name").fetchall()
+        ])
 
     def update_laser_material(self, material_id: int, name: str, material_side: str, supplier: str, purchase_price: float, sale_price: float, stock_quantity: float, notes: str) -> bool:
         """Update laser material information"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE laser_materials SET name = ?, material_side = ?, supplier = ?, purchase_price = ?, sale_price = ?, stock_quantity = ?, notes = ? WHERE id = ?",
-                (name, material_side, supplier, purchase_price, sale_price, stock_quantity, notes, material_id)
-            )
-            conn.commit()
-            conn.close()
+            with self._write() as cursor:
+                cursor.execute(
+                    "UPDATE laser_materials SET name = ?, material_side = ?, supplier = ?, purchase_price = ?, sale_price = ?, stock_quantity = ?, notes = ? WHERE id = ?",
+                    (name, material_side, supplier, purchase_price, sale_price, stock_quantity, notes, material_id)
+                )
+            self._edited('laser_materials', material_id)
             return True
         except Exception:
             return False
@@ -251,221 +256,554 @@ class DatabaseHandler:
     def delete_laser_material(self, material_id: int) -> bool:
         """Delete a laser material"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM operations WHERE laser_material_id = ?", (material_id,))
-            cursor.execute("DELETE FROM laser_materials WHERE id = ?", (material_id,))
-            conn.commit()
-            conn.close()
+            with self._write() as cursor:
+                cursor.execute("DELETE FROM operations WHERE laser_material_id = ?", (material_id,))
+                cursor.execute("DELETE FROM laser_materials WHERE id = ?", (material_id,))
+            self._edited('laser_materials', material_id)
             return True
         except Exception:
             return False
 
-    # ---------- Operations ----------
-    def add_operation(self, item_id: int, item_type: str, operation_type: str, customer_name: str, customer_phone: Optional[str], quantity: float, total_price: float) -> bool:
-        """Add a new operation (sale, return, waste) and update stock in a single transaction."""
-        conn = None
-        try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            product_id = item_id if item_type == 'product' else None
-            laser_material_id = item_id if item_type == 'laser' else None
-
-            cursor.execute(
-                "INSERT INTO operations (product_id, laser_material_id, operation_type, customer_name, customer_phone, quantity, total_price, date) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                (product_id, laser_material_id, operation_type, customer_name, customer_phone, quantity, total_price, date)
-            )
+    # ---------- Inventory pages ----------
+    def _items_filter(self, item_type: str, search: Optional[str]) -> tuple:
+        table = self._IMPORT_SPECS[item_type]['table']
+        query = match_query(search)
+        if not query:
+            return table, "", ()
+        return table, f" WHERE id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)", (query,)
+
+    def get_items_page(self, item_type: str, limit: int = 25, offset: int = 0, search: Optional[str] = None) -> List[Dict]:
+        """One page of products ('product') or laser materials ('laser') in name order.
+
+        Ordered on the table's unique key, so the page is a walk along its
+        index; search keeps the items matching every word (as in search()).
+        Cached until the next write (treat the result as read-only).
+        """
+        table, where, params = self._items_filter(item_type, search)
+        order = ', '.join(self._IMPORT_SPECS[item_type]['key'])
+        return self._cached(("items_page", item_type, limit, offset, params), lambda: [
+            dict(r) for r in self.pool.execute(
+                f"SELECT * FROM {table}{where} ORDER BY {order} LIMIT ? OFFSET ?", params + (limit, offset)
+            ).fetchall()
+        ])
+
+    def count_items(self, item_type: str, search: Optional[str] = None) -> int:
+        """Number of products ('product') or laser materials ('laser'), matching search if given."""
+        table, where, params = self._items_filter(item_type, search)
+        return self._cached(("items_count", item_type, params),
+                            lambda: self.pool.execute(f"SELECT COUNT(*) FROM {table}{where}", params).fetchone()[0])
+
+    def find_items(self, item_type: str, text: Optional[str], limit: int = 20) -> List[Dict]:
+        """Up to `limit` products ('product') or laser materials ('laser') for a picker, as the user types.
+
+        Names starting with `text` come first, read off the unique index on
+        name; the rest are items matching every word of it anywhere in their
+        name, supplier or notes (as in search(), unranked). Both lookups stop
+        after `limit` rows, so the cost doesn't grow with the catalog. Without
+        text, the first items in name order (get_items_page).
+        """
+        if not match_query(text):
+            return self.get_items_page(item_type, limit)
+        table = self._IMPORT_SPECS[item_type]['table']
+        order = ', '.join(self._IMPORT_SPECS[item_type]['key'])
+        text = text.strip()
+        # U+10FFFF sorts after every other character, so this is a range scan
+        rows = [dict(r) for r in self.pool.execute(
+            f"SELECT * FROM {table} WHERE name >= ? AND name < ? ORDER BY {order} LIMIT ?",
+            (text, text + '\U0010ffff', limit),
+        ).fetchall()]
+        if len(rows) < limit:
+            seen = {row['id'] for row in rows}
+            rows += [dict(r) for r in self.pool.execute(
+                f"SELECT * FROM {table} WHERE id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ? LIMIT ?)",
+                (match_query(text), limit + len(rows)),
+            ).fetchall() if r['id'] not in seen][:limit - len(rows)]
+        return rows
+
+    def get_item(self, item_type: str, item_id: int) -> Optional[Dict]:
+        """One product ('product') or laser material ('laser') by id, None if it no longer exists."""
+        row = self.pool.execute(f"SELECT * FROM {self._IMPORT_SPECS[item_type]['table']} WHERE id = ?", (item_id,)).fetchone()
+        return dict(row) if row else None
 
-            # Adjust stock within the same transaction
-            stock_change = -quantity if operation_type in ['بيع', 'تالف'] else quantity
-            if item_type == 'product':
-                cursor.execute(
-                    "UPDATE products SET stock = stock + ? WHERE id = ?",
-                    (stock_change, product_id)
-                )
-            elif item_type == 'laser':
+    # ---------- Bulk import ----------
+    _IMPORT_SPECS = {
+        'product': {
+            'table': 'products',
+            'key': ('name', 'purchase_price'),
+            'stock': 'stock',
+            'columns': ('name', 'supplier', 'purchase_date', 'purchase_price', 'sale_price', 'stock', 'notes'),
+            'renames': True,
+        },
+        'laser': {
+            'table': 'laser_materials',
+            'key': ('name', 'material_side', 'purchase_price'),
+            'stock': 'stock_quantity',
+            'columns': ('name', 'material_side', 'supplier', 'purchase_date', 'purchase_price', 'sale_price', 'stock_quantity', 'notes'),
+        },
+    }
+
+    def import_items(self, item_type: str, rows: Iterable[Dict], chunk_size: int = 5000, progress: Optional[Callable[[int], None]] = None) -> Dict:
+        """Upsert products ('product') or laser materials ('laser') from an iterable of row dicts.
+
+        Rows are consumed in chunks so the source is never held in memory. Each
+        chunk resolves its existing (name, [side,] price) rows with one indexed
+        lookup, then adds stock to those and inserts the rest in one statement.
+        A product whose name is taken at another price is renamed as in
+        resolve_product(). The whole import is one transaction. progress(rows_done) is called after
+        every chunk. Returns counts of rows read, inserted (renamed among
+        them) and updated.
+        """
+        spec = self._IMPORT_SPECS[item_type]
+        table, key, stock, columns = spec['table'], spec['key'], spec['stock'], spec['columns']
+        key_list = ", ".join(key)
+        key_placeholders = "(" + ", ".join("?" * len(key)) + ")"
+        key_join = " AND ".join(f"t.{c} = k.{c}" for c in key)
+        # One INSERT ... SELECT per chunk rather than executemany: the full-text
+        # index triggers flush their pending terms at the end of every statement
+        extracts = ", ".join(f"json_extract(value, '$[{i}]')" for i in range(len(columns)))
+        insert_sql = f"INSERT INTO {table} ({', '.join(columns)}) SELECT {extracts} FROM json_each(?)"
+        update_sql = f"UPDATE {table} SET {stock} = {stock} + ? WHERE id = ?"
+
+        # The per-chunk lookup binds every key value; stay under SQLite's variable limit
+        conn = self.pool.connection()
+        max_variables = conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER) if hasattr(conn, "getlimit") else 999
+        chunk_size = max(1, min(chunk_size, max_variables // len(key)))
+
+        summary = {"rows": 0, "inserted": 0, "updated": 0, "renamed": 0}
+        rows = iter(rows)
+        with self._write() as cursor:
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+
+                # Repeated keys inside the chunk add up like repeated manual entries
+                merged: Dict[tuple, Dict] = {}
+                for row in chunk:
+                    row_key = tuple(row[c] for c in key)
+                    if row_key in merged:
+                        merged[row_key][stock] += row[stock]
+                    else:
+                        merged[row_key] = dict(row)
+
+                keys = list(merged)
                 cursor.execute(
-                    "UPDATE laser_materials SET stock_quantity = stock_quantity + ? WHERE id = ?",
-                    (stock_change, laser_material_id)
+                    f"WITH k({key_list}) AS (VALUES {', '.join([key_placeholders] * len(keys))}) "
+                    f"SELECT t.id, {', '.join('t.' + c for c in key)} FROM k CROSS JOIN {table} t ON {key_join}",
+                    [value for row_key in keys for value in row_key]
                 )
+                existing = {tuple(r[1:]): r[0] for r in cursor.fetchall()}
+                if spec.get('renames'):
+                    missing = [k for k in keys if k not in existing]
+                    named = self._products_named(cursor, list(dict.fromkeys(name for name, _ in missing)))
+                    for row_key in missing:
+                        name, price = row_key
+                        product_id, merged[row_key]['name'] = self._product_name(name, price, named[name])
+                        if product_id is not None:
+                            existing[row_key] = product_id
+                        else:
+                            # Later rows of this chunk see the name as taken
+                            named[name][price] = (None, merged[row_key]['name'])
+                            summary["renamed"] += merged[row_key]['name'] != name
+
+                updates = [(merged[k][stock], existing[k]) for k in keys if k in existing]
+                inserts = [tuple(merged[k].get(c) for c in columns) for k in keys if k not in existing]
+                if updates:
+                    cursor.executemany(update_sql, updates)
+                if inserts:
+                    cursor.execute(insert_sql, (json.dumps(inserts),))
+
+                summary["rows"] += len(chunk)
+                summary["updated"] += len(updates)
+                summary["inserted"] += len(inserts)
+                if progress:
+                    progress(summary["rows"])
+        return summary
 
-            conn.commit()
+    # ---------- Operations ----------
+    def add_operation(self, item_id: int, item_type: str, operation_type: str, customer_name: str, customer_phone: Optional[str], quantity: float, total_price: float) -> bool:
+        """Add a new operation (sale, return, waste) and update stock in a single transaction."""
+        return self.add_operation_with_date(item_id, item_type, operation_type, customer_name, customer_phone, quantity, total_price)
+
+    def add_operation_with_date(self, item_id: int, item_type: str, operation_type: str, customer_name: str, customer_phone: Optional[str], quantity: float, total_price: float, operation_date: Optional[str] = None) -> bool:
+        """Add an operation on a given day ('YYYY-MM-DD', default today) and update stock in a single transaction."""
+        line = {
+            "item_id": item_id,
+            "item_type": item_type,
+            "operation_type": operation_type,
+            "quantity": quantity,
+            "total_price": total_price,
+        }
+        return self.add_operations_batch([line], customer_name, customer_phone, operation_date)
+
+    # Snapshot the item's current cost and display name onto the row so history
+    # and profit don't change when the item is edited later.
+    _INSERT_OPERATION_SQL = {
+        'product': (
+            "INSERT INTO operations (product_id, laser_material_id, operation_type, customer_name, customer_phone, quantity, total_price, ts, unit_cost, item_name) "
+            "SELECT id, NULL, ?, ?, ?, ?, ?, ?, purchase_price, name FROM products WHERE id = ?"
+        ),
+        'laser': (
+            "INSERT INTO operations (product_id, laser_material_id, operation_type, customer_name, customer_phone, quantity, total_price, ts, unit_cost, item_name) "
+            "SELECT NULL, id, ?, ?, ?, ?, ?, ?, purchase_price, name || ' (' || material_side || ')' FROM laser_materials WHERE id = ?"
+        ),
+    }
+    _UPDATE_STOCK_SQL = {
+        'product': "UPDATE products SET stock = stock + ? WHERE id = ?",
+        'laser': "UPDATE laser_materials SET stock_quantity = stock_quantity + ? WHERE id = ?",
+    }
+
+    @staticmethod
+    def _operation_ts(operation_date: Optional[str] = None) -> int:
+        """Timestamp for an operation recorded now, optionally backdated to another day."""
+        now = datetime.now()
+        ts = to_timestamp(now)
+        if operation_date and operation_date != now.strftime(DATE_FORMAT):
+            # Backdated: keep the current time of day so same-day ordering stays sensible
+            ts = day_number(operation_date) * SECONDS_PER_DAY + ts % SECONDS_PER_DAY
+        return ts
+
+    def add_operations_batch(self, lines: List[Dict], customer_name: str, customer_phone: Optional[str] = None, operation_date: Optional[str] = None) -> bool:
+        """Record a multi-line receipt and adjust stock for every line in one transaction.
+
+        Each line is a dict with item_id, item_type ('product' or 'laser'),
+        operation_type, quantity and total_price. Either all lines are written
+        or none are.
+        """
+        if not lines:
+            return False
+        ts = self._operation_ts(operation_date)
+        operations = {item_type: [] for item_type in self._INSERT_OPERATION_SQL}
+        stock_changes = {item_type: [] for item_type in self._UPDATE_STOCK_SQL}
+        try:
+            for line in lines:
+                item_type = line["item_type"]
+                if item_type not in operations:
+                    raise ValueError(f"unknown item type: {item_type}")
+                quantity = float(line["quantity"])
+                operations[item_type].append((
+                    line["operation_type"], customer_name, customer_phone,
+                    quantity, float(line["total_price"]), ts, line["item_id"]
+                ))
+                stock_change = -quantity if line["operation_type"] in ['بيع', 'تالف'] else quantity
+                stock_changes[item_type].append((stock_change, line["item_id"]))
+
+            with self._write() as cursor:
+                # daily_summary is updated by trigger within this transaction
+                for item_type, rows in operations.items():
+                    if not rows:
+                        continue
+                    cursor.executemany(self._INSERT_OPERATION_SQL[item_type], rows)
+                    if cursor.rowcount != len(rows):
+                        raise ValueError(f"{len(rows) - cursor.rowcount} {item_type} item(s) not found")
+                    cursor.executemany(self._UPDATE_STOCK_SQL[item_type], stock_changes[item_type])
             return True
         except Exception as e:
-            print(f"Error in add_operation: {e}")
-            if conn:
-                conn.rollback()
+            print(f"Error in add_operations_batch: {e}")
             return False
-        finally:
-            if conn:
-                conn.close()
 
     def get_all_operations(self) -> List[Dict]:
         """Get all operations with item names"""
-        conn = sqlite3.connect(self.db_name)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute(
+        rows = self.pool.execute(
             '''
-            SELECT o.id, o.date, o.operation_type,
-                   CASE
-                       WHEN o.product_id IS NOT NULL THEN p.name
-                       WHEN o.laser_material_id IS NOT NULL THEN lm.name || ' (' || lm.material_side || ')'
-                   END as item_name,
-                   o.quantity, o.total_price, o.customer_name
-            FROM operations o
-            LEFT JOIN products p ON o.product_id = p.id
-            LEFT JOIN laser_materials lm ON o.laser_material_id = lm.id
-            ORDER BY o.date DESC
+            SELECT id, ts, operation_type, item_name, quantity, total_price, customer_name
+            FROM operations
+            ORDER BY ts DESC
             '''
-        )
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
-
-    # ---------- Analytics ----------
-    def get_analytics_data(self, start_date: str, end_date: str) -> Dict:
-        """Get analytics data for a specific period."""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-
-        # --- Shop Analytics ---
-        cursor.execute(
+        ).fetchall()
+        return [self._operation_row(r) for r in rows]
+
+    # History sort keys -> indexed column; id breaks ties so every cursor is unique
+    _HISTORY_SORT_COLUMNS = {'date': 'ts', 'total_price': 'total_price'}
+
+    # Searches matching at most this many operations are resolved to an id list
+    # up front; broader ones filter a scan in page order, which fills a page quickly
+    _SEARCH_ID_LIST_LIMIT = 5000
+
+    def _operation_filters(self, search: Optional[str], operation_type: Optional[str]):
+        clauses, params = [], []
+        if operation_type:
+            clauses.append("operation_type = ?")
+            params.append(operation_type)
+        query = match_query(search)
+        if query:
+            # Customer name or phone, or any operation of a matching item
+            item_query = f"name : ({query})"
+            matches = """
+                SELECT rowid FROM operations_fts WHERE operations_fts MATCH ?
+                UNION SELECT id FROM operations WHERE product_id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)
+                UNION SELECT id FROM operations WHERE laser_material_id IN (SELECT rowid FROM laser_materials_fts WHERE laser_materials_fts MATCH ?)
             """
-            SELECT
-                SUM(CASE WHEN operation_type = 'بيع' THEN total_price ELSE 0 END) -
-                SUM(CASE WHEN operation_type = 'استرجاع' THEN total_price ELSE 0 END)
+            ids = [r[0] for r in self.pool.execute(
+                f"{matches} LIMIT ?", (query, item_query, item_query, self._SEARCH_ID_LIST_LIMIT + 1)
+            ).fetchall()]
+            if len(ids) <= self._SEARCH_ID_LIST_LIMIT:
+                clauses.append("id IN (SELECT value FROM json_each(?))")
+                params.append(json.dumps(ids))
+            else:
+                # Unary + keeps the planner on the page-order index instead of sorting every match
+                clauses.append(f"+id IN ({matches})")
+                params += [query, item_query, item_query]
+        return clauses, params
+
+    def get_operations_page(self, limit: int = 50, after: Optional[tuple] = None, before: Optional[tuple] = None,
+                            sort_by: str = 'date', descending: bool = True,
+                            search: Optional[str] = None, operation_type: Optional[str] = None,
+                            line: Optional[str] = None) -> List[Dict]:
+        """One page of the operations history, keyset-paginated on (sort column, id).
+
+        after/before are cursors from operation_cursor(): the page starts right
+        after `after`, or ends right before `before`, in the requested order.
+        Each page is an index range scan, so its cost depends on limit rather
+        than on how far into the history it is. line ('shop' or 'laser')
+        keeps one business line's operations.
+        """
+        column = self._HISTORY_SORT_COLUMNS[sort_by]
+        clauses, params = self._operation_filters(search, operation_type)
+        if line:
+            clauses.append("product_id IS NOT NULL" if line == 'shop' else "laser_material_id IS NOT NULL")
+        # Walking backwards from `before` is the same scan in the opposite direction
+        scan_descending = descending if before is None else not descending
+        cursor = after if before is None else before
+        if cursor is not None:
+            clauses.append(f"({column}, id) {'<' if scan_descending else '>'} (?, ?)")
+            params += list(cursor)
+        direction = "DESC" if scan_descending else "ASC"
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.pool.execute(
+            f'''
+            SELECT id, ts, operation_type, item_name, quantity, total_price, customer_name
             FROM operations
-            WHERE product_id IS NOT NULL AND date BETWEEN ? AND ?
-            """,
-            (start_date, end_date)
-        )
-        shop_revenue = cursor.fetchone()[0] or 0.0
+            {where}
+            ORDER BY {column} {direction}, id {direction}
+            LIMIT ?
+            ''',
+            params + [limit]
+        ).fetchall()
+        if scan_descending != descending:
+            rows.reverse()
+        return [self._operation_row(r) for r in rows]
+
+    @classmethod
+    def operation_cursor(cls, operation: Dict, sort_by: str = 'date') -> tuple:
+        """Keyset cursor of an operation returned by get_operations_page."""
+        return (operation[cls._HISTORY_SORT_COLUMNS[sort_by]], operation['id'])
+
+    def count_operations(self, search: Optional[str] = None, operation_type: Optional[str] = None) -> int:
+        """Number of operations matching the history filters."""
+        if not match_query(search):
+            # The rollup already counts operations per type, no need to walk the log
+            def load() -> int:
+                where, params = (" WHERE operation_type = ?", (operation_type,)) if operation_type else ("", ())
+                return int(self.pool.execute(f"SELECT COALESCE(SUM(operations_count), 0) FROM daily_summary{where}", params).fetchone()[0])
+            return self._cached(("operations_count", operation_type or None), load)
+        clauses, params = self._operation_filters(search, operation_type)
+        return self.pool.execute(f"SELECT COUNT(*) FROM operations WHERE {' AND '.join(clauses)}", params).fetchone()[0]
+
+    def inventory_summary(self, low_stock: float = 3) -> Dict:
+        """Item counts, units in stock, stock value at purchase price and low-stock counts per line (cached)."""
+        def load() -> Dict:
+            summary = {}
+            for line, table, stock in (("shop", "products", "stock"), ("laser", "laser_materials", "stock_quantity")):
+                row = self.pool.execute(
+                    f"""SELECT COUNT(*), COALESCE(SUM({stock}), 0), COALESCE(SUM({stock} * purchase_price), 0),
+                               COUNT(CASE WHEN {stock} <= ? THEN 1 END)
+                        FROM {table}""",
+                    (low_stock,)
+                ).fetchone()
+                summary[line] = {"items": row[0], "units": row[1], "stock_value": row[2], "low_stock_items": row[3]}
+            return summary
+        return self._cached(("inventory_summary", low_stock), load)
+
+    _LOW_STOCK_SQL = {
+        'product': "SELECT id, name, supplier, stock FROM products WHERE stock <= ? ORDER BY stock, name LIMIT ?",
+        'laser': """
+            SELECT id, name, material_side, supplier, stock_quantity AS stock FROM laser_materials
+            WHERE stock_quantity <= ? ORDER BY stock_quantity, name LIMIT ?
+        """,
+    }
+
+    def low_stock_items(self, threshold: float = 3, limit: int = 20, kinds: Iterable[str] = ('product', 'laser')) -> Dict[str, List[Dict]]:
+        """Items with at most `threshold` in stock, lowest first; up to `limit` rows per kind."""
+        return {
+            kind: [dict(r) for r in self.pool.execute(self._LOW_STOCK_SQL[kind], (threshold, limit)).fetchall()]
+            for kind in kinds
+        }
 
-        cursor.execute(
-            """
-            SELECT
-                SUM(CASE WHEN o.operation_type = 'بيع' THEN o.quantity * p.purchase_price ELSE 0 END) -
-                SUM(CASE WHEN o.operation_type = 'استرجاع' THEN o.quantity * p.purchase_price ELSE 0 END)
+    # ---------- Search ----------
+    _SEARCH_SQL = {
+        'product': """
+            SELECT p.* FROM products_fts f JOIN products p ON p.id = f.rowid
+            WHERE products_fts MATCH ? ORDER BY f.rank LIMIT ?
+        """,
+        'laser': """
+            SELECT lm.* FROM laser_materials_fts f JOIN laser_materials lm ON lm.id = f.rowid
+            WHERE laser_materials_fts MATCH ? ORDER BY f.rank LIMIT ?
+        """,
+        # A customer repeats across many operations, so equally ranked
+        # hits are taken newest first straight off the index's rowid order
+        'operation': """
+            SELECT o.id, o.ts, o.operation_type, o.item_name, o.quantity, o.total_price,
+                   o.customer_name, o.customer_phone, o.product_id, o.laser_material_id
             FROM operations o
-            JOIN products p ON o.product_id = p.id
-            WHERE o.product_id IS NOT NULL AND o.date BETWEEN ? AND ?
-            """,
-            (start_date, end_date)
-        )
-        shop_cogs = cursor.fetchone()[0] or 0.0
-        
-        cursor.execute(
-            """
-            SELECT SUM(o.quantity * p.purchase_price)
-            FROM operations o
-            JOIN products p ON o.product_id = p.id
-            WHERE o.operation_type = 'تالف' AND o.product_id IS NOT NULL AND o.date BETWEEN ? AND ?
-            """,
-            (start_date, end_date)
-        )
-        shop_waste_cost = cursor.fetchone()[0] or 0.0
-        shop_profit = shop_revenue - shop_cogs - shop_waste_cost
+            WHERE o.id IN (SELECT rowid FROM operations_fts WHERE operations_fts MATCH ? ORDER BY rowid DESC LIMIT ?)
+            ORDER BY o.ts DESC, o.id DESC
+        """,
+    }
+
+    def search(self, text: str, kinds: Iterable[str] = ('product', 'laser', 'operation'), limit: int = 20) -> Dict[str, List[Dict]]:
+        """Full-text search of products, laser materials and operations.
+
+        Every word of `text` must match the start of a word in an item's name,
+        supplier or notes, or in an operation's customer name or phone; Arabic
+        spelling variants are folded.
+        Items are ranked by bm25 (name hits first), operations by recency.
+        Returns up to `limit` rows per kind, keyed by kind.
+        """
+        query = match_query(text)
+        results = {kind: [] for kind in kinds}
+        if not query:
+            return results
+        for kind in results:
+            rows = self.pool.execute(self._SEARCH_SQL[kind], (query, limit)).fetchall()
+            results[kind] = [self._operation_row(r) if kind == 'operation' else dict(r) for r in rows]
+        return results
+
+    @staticmethod
+    def _operation_row(row: sqlite3.Row) -> Dict:
+        """Operation dict with the integer ts also rendered as a 'YYYY-MM-DD HH:MM:SS' date."""
+        operation = dict(row)
+        operation["date"] = format_timestamp(operation["ts"])
+        return operation
 
-        # --- Laser Analytics ---
-        cursor.execute(
+    # ---------- Analytics ----------
+    def _item_totals(self, start_date: str, end_date: str) -> List[Dict]:
+        """Per-item revenue, cost of goods sold and waste cost over the date range.
+
+        Everything is read from the daily_summary rollup alone, using the unit
+        cost and name snapshotted on each operation, without joining the item
+        tables (a rollup row counts even if its item row is gone). The rollup's primary key leads with day, so the cost
+        depends on the rows in the range, not on the catalog size. Ranges are
+        whole days: only the 'YYYY-MM-DD' part of the bounds is used.
+        """
+        start_day, end_day = day_range(start_date, end_date)
+        rows = self.pool.execute(
             """
             SELECT
-                SUM(CASE WHEN operation_type = 'بيع' THEN total_price ELSE 0 END) -
-                SUM(CASE WHEN operation_type = 'استرجاع' THEN total_price ELSE 0 END)
-            FROM operations
-            WHERE laser_material_id IS NOT NULL AND date BETWEEN ? AND ?
+                line,
+                item_id,
+                item_name AS name,
+                MAX(day) AS last_day,  -- name is taken from the latest day
+                SUM(CASE operation_type WHEN 'بيع' THEN total_price WHEN 'استرجاع' THEN -total_price ELSE 0 END) AS revenue,
+                SUM(CASE operation_type WHEN 'بيع' THEN quantity WHEN 'استرجاع' THEN -quantity ELSE 0 END) AS sold,
+                SUM(CASE operation_type WHEN 'بيع' THEN cost WHEN 'استرجاع' THEN -cost ELSE 0 END) AS cogs,
+                SUM(CASE operation_type WHEN 'تالف' THEN cost ELSE 0 END) AS waste
+            FROM daily_summary
+            WHERE day BETWEEN :start AND :end
+            GROUP BY line, item_id
             """,
-            (start_date, end_date)
-        )
-        laser_revenue = cursor.fetchone()[0] or 0.0
+            {"start": start_day, "end": end_day}
+        ).fetchall()
+        return [dict(r) for r in rows]
 
-        cursor.execute(
-            """
-            SELECT
-                SUM(CASE WHEN o.operation_type = 'بيع' THEN o.quantity * lm.purchase_price ELSE 0 END) -
-                SUM(CASE WHEN o.operation_type = 'استرجاع' THEN o.quantity * lm.purchase_price ELSE 0 END)
-            FROM operations o
-            JOIN laser_materials lm ON o.laser_material_id = lm.id
-            WHERE o.laser_material_id IS NOT NULL AND o.date BETWEEN ? AND ?
-            """,
-            (start_date, end_date)
-        )
-        laser_cogs = cursor.fetchone()[0] or 0.0
-        
-        cursor.execute(
-            """
-            SELECT SUM(o.quantity * lm.purchase_price)
-            FROM operations o
-            JOIN laser_materials lm ON o.laser_material_id = lm.id
-            WHERE o.operation_type = 'تالف' AND o.laser_material_id IS NOT NULL AND o.date BETWEEN ? AND ?
-            """,
-            (start_date, end_date)
+    @staticmethod
+    def _top_sellers(item_totals: List[Dict], line: str, limit: int = 5) -> List[Dict]:
+        """Top items of one business line by net quantity sold, merged by display name."""
+        sold_by_name: Dict[str, float] = {}
+        for item in item_totals:
+            if item["line"] == line and item["name"] is not None:
+                sold_by_name[item["name"]] = sold_by_name.get(item["name"], 0.0) + item["sold"]
+        ranked = sorted(
+            ({"name": name, "total_sold": sold} for name, sold in sold_by_name.items() if sold > 0),
+            key=lambda r: r["total_sold"],
+            reverse=True,
         )
-        laser_waste_cost = cursor.fetchone()[0] or 0.0
-        laser_profit = laser_revenue - laser_cogs - laser_waste_cost
+        return ranked[:limit]
 
-        top_selling = self.get_top_selling_items(start_date, end_date)
-        conn.close()
+    def get_analytics_data(self, start_date: str, end_date: str) -> Dict:
+        """Get analytics data for a specific period."""
+        item_totals = self._item_totals(start_date, end_date)
 
+        totals = {
+            line: {"revenue": 0.0, "cogs": 0.0, "waste": 0.0}
+            for line in ("shop", "laser")
+        }
+        for item in item_totals:
+            line_totals = totals[item["line"]]
+            line_totals["revenue"] += item["revenue"]
+            line_totals["cogs"] += item["cogs"]
+            line_totals["waste"] += item["waste"]
+
+        shop, laser = totals["shop"], totals["laser"]
         return {
-            "shop_revenue": shop_revenue,
-            "shop_profit": shop_profit,
-            "laser_revenue": laser_revenue,
-            "laser_profit": laser_profit,
-            "top_shop_products": top_selling["top_shop_products"],
-            "top_laser_materials": top_selling["top_laser_materials"]
+            "shop_revenue": shop["revenue"],
+            "shop_profit": shop["revenue"] - shop["cogs"] - shop["waste"],
+            "laser_revenue": laser["revenue"],
+            "laser_profit": laser["revenue"] - laser["cogs"] - laser["waste"],
+            "top_shop_products": self._top_sellers(item_totals, "shop"),
+            "top_laser_materials": self._top_sellers(item_totals, "laser"),
         }
 
-    def get_top_selling_items(self, start_date: str, end_date: str) -> Dict:
+    def get_top_selling_items(self, start_date: str, end_date: str, limit: int = 5) -> Dict:
         """Get top selling items for a specific period, accounting for returns."""
-        conn = sqlite3.connect(self.db_name)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        item_totals = self._item_totals(start_date, end_date)
+        return {
+            "top_shop_products": self._top_sellers(item_totals, "shop", limit),
+            "top_laser_materials": self._top_sellers(item_totals, "laser", limit),
+        }
 
-        # Top Shop Products
-        cursor.execute(
-            """
-            SELECT
-                p.name,
-                SUM(CASE WHEN o.operation_type = 'بيع' THEN o.quantity ELSE 0 END) -
-                SUM(CASE WHEN o.operation_type = 'استرجاع' THEN o.quantity ELSE 0 END) as total_sold
-            FROM operations o
-            JOIN products p ON o.product_id = p.id
-            WHERE o.date BETWEEN ? AND ?
-            GROUP BY p.name
-            HAVING total_sold > 0
-            ORDER BY total_sold DESC
-            LIMIT 5
-            """,
-            (start_date, end_date)
+    # ---------- Rollups ----------
+    _DAILY_SUMMARY_FROM_OPERATIONS = """
+        SELECT day, line, item_id, operation_type, quantity, total_price, cost, operations_count, item_name
+        FROM (
+            SELECT ts / 86400 AS day,
+                   CASE WHEN product_id IS NOT NULL THEN 'shop' ELSE 'laser' END AS line,
+                   COALESCE(product_id, laser_material_id) AS item_id,
+                   operation_type,
+                   SUM(quantity) AS quantity,
+                   SUM(total_price) AS total_price,
+                   SUM(quantity * COALESCE(unit_cost, 0)) AS cost,
+                   COUNT(*) AS operations_count,
+                   item_name, MAX(id)  -- item_name of the latest operation
+            FROM operations
+            GROUP BY 1, 2, 3, 4
         )
-        top_shop_products = [dict(row) for row in cursor.fetchall()]
+    """
 
-        # Top Laser Materials
-        cursor.execute(
-            """
-            SELECT
-                lm.name || ' (' || lm.material_side || ')' as name,
-                SUM(CASE WHEN o.operation_type = 'بيع' THEN o.quantity ELSE 0 END) -
-                SUM(CASE WHEN o.operation_type = 'استرجاع' THEN o.quantity ELSE 0 END) as total_sold
-            FROM operations o
-            JOIN laser_materials lm ON o.laser_material_id = lm.id
-            WHERE o.date BETWEEN ? AND ?
-            GROUP BY lm.name, lm.material_side
-            HAVING total_sold > 0
-            ORDER BY total_sold DESC
-            LIMIT 5
+    def rebuild_daily_summary(self) -> int:
+        """Regenerate the daily_summary rollup from the raw operations. Returns the row count."""
+        with self._write() as cursor:
+            cursor.execute("DELETE FROM daily_summary")
+            cursor.execute(
+                "INSERT INTO daily_summary (day, line, item_id, operation_type, quantity, total_price, cost, operations_count, item_name) "
+                + self._DAILY_SUMMARY_FROM_OPERATIONS
+            )
+            count = cursor.execute("SELECT COUNT(*) FROM daily_summary").fetchone()[0]
+        return count
+
+    def verify_daily_summary(self, tolerance: float = 1e-6) -> List[Dict]:
+        """Compare daily_summary with a fresh aggregate of operations; returns the mismatching keys."""
+        rows = self.pool.execute(
+            f"""
+            WITH expected AS ({self._DAILY_SUMMARY_FROM_OPERATIONS})
+            SELECT e.day, e.line, e.item_id, e.operation_type,
+                   e.quantity AS expected_quantity, s.quantity AS actual_quantity,
+                   e.total_price AS expected_total_price, s.total_price AS actual_total_price,
+                   e.cost AS expected_cost, s.cost AS actual_cost
+            FROM expected e
+            LEFT JOIN daily_summary s USING (day, line, item_id, operation_type)
+            WHERE s.day IS NULL
+               OR s.operations_count != e.operations_count
+               OR ABS(s.quantity - e.quantity) > :tol
+               OR ABS(s.total_price - e.total_price) > :tol
+               OR ABS(s.cost - e.cost) > :tol
+            UNION ALL
+            SELECT s.day, s.line, s.item_id, s.operation_type,
+                   NULL, s.quantity, NULL, s.total_price, NULL, s.cost
+            FROM daily_summary s
+            LEFT JOIN expected e USING (day, line, item_id, operation_type)
+            WHERE e.day IS NULL
             """,
-            (start_date, end_date)
-        )
-        top_laser_materials = [dict(row) for row in cursor.fetchall()]
-
-        conn.close()
-        return {
-            "top_shop_products": top_shop_products,
-            "top_laser_materials": top_laser_materials,
-        }
-
+            {"tol": tolerance}
+        ).fetchall()
+        return [dict(r) for r in rows]
@@ -0,0 +1,97 @@
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class InventoryCache:
+    """Read-through cache for inventory queries, invalidated by a write version.
+
+    Every write through DatabaseHandler bumps write_version, which makes every
+    cached entry stale; an unchanged version means a read is a dict lookup.
+    Commits from outside the process (another process, the sqlite3 shell) are
+    caught through PRAGMA data_version on one watcher connection, opened with
+    connect(), and bump the version the same way. No query runs on the
+    watcher, so its data_version moves with every other connection's commits,
+    the process's own included; bump() re-reads it after each of those so
+    they aren't counted a second time.
+
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, connect: Optional[Callable[[], sqlite3.Connection]] = None):
+        self._connect = connect
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, tuple] = {}
+        self._watcher: Optional[sqlite3.Connection] = None
+        self._seen: Optional[int] = None
+        self.write_version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _bump(self) -> int:
+        self.write_version += 1
+        self._entries.clear()
+        return self.write_version
+
+    def _external_writes(self) -> bool:
+        """Whether data_version moved since the last look; the first look only sets the baseline."""
+        if self._connect is None:
+            return False
+        if self._watcher is None:
+            self._watcher = self._connect()
+        seen = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+        changed = self._seen is not None and seen != self._seen
+        self._seen = seen
+        return changed
+
+    def bump(self) -> int:
+        """Record a write by this process; returns the new write version."""
+        with self._lock:
+            # Takes the commit (and any from outside just before it) into the
+            # baseline; the bump below covers them all
+            self._external_writes()
+            return self._bump()
+
+    def version(self) -> int:
+        """Current write version, after checking for commits from outside."""
+        with self._lock:
+            if self._external_writes():
+                self._bump()
+            return self.write_version
+
+    def get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Cached value for key, calling load() on a miss."""
+        with self._lock:
+            if self._external_writes():
+                self._bump()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == self.write_version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            version = self.write_version
+        value = load()
+        with self._lock:
+            # A write that landed while loading may not be in value; don't keep it
+            if version == self.write_version:
+                self._entries[key] = (version, value)
+        return value
+
+    def close(self):
+        """Close the watcher and drop every entry; the next read opens a new watcher."""
+        with self._lock:
+            if self._watcher is not None:
+                self._watcher.close()
+            self._watcher = self._seen = None
+            self._bump()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "write_version": self.write_version,
+            }
@@ -0,0 +1,298 @@
+import heapq
+import json
+import re
+import threading
+from array import array
+from bisect import bisect_left, insort
+from itertools import chain, islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from src.database.TextSearch import normalize
+
+_WORD = re.compile(r"\w+")
+
+
+def words(*values) -> Set[str]:
+    """Folded, lower-case words of values, as the FTS5 indexes store them."""
+    return set(_WORD.findall(normalize(" ".join(str(v) for v in values if v)).lower()))
+
+
+class Postings:
+    """token -> ascending row ids, plus the sorted vocabulary for prefix lookups.
+
+    Ids are kept in array('q') rather than lists of int objects: 8 bytes per
+    hit, and appending a new row's id (the usual case) is amortized O(1).
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, array] = {}
+        self.vocabulary: List[str] = []
+
+    def extend(self, rows: Iterable[Tuple[int, Iterable[str]]]):
+        """Add (row_id, tokens) pairs whose ids are above every id added so far; tokens may repeat."""
+        new = []
+        for row_id, tokens in rows:
+            for token in tokens:
+                ids = self.ids.get(token)
+                if ids is None:
+                    ids = self.ids[token] = array('q')
+                    new.append(token)
+                elif ids and ids[-1] == row_id:
+                    continue
+                ids.append(row_id)
+        if len(new) > 64:
+            self.vocabulary = sorted(self.ids)
+        else:
+            for token in new:
+                insort(self.vocabulary, token)
+
+    def add(self, row_id: int, tokens: Iterable[str]):
+        for token in tokens:
+            ids = self.ids.get(token)
+            if ids is None:
+                ids = self.ids[token] = array('q')
+                insort(self.vocabulary, token)
+            i = bisect_left(ids, row_id)
+            if i == len(ids) or ids[i] != row_id:
+                ids.insert(i, row_id)
+
+    def remove(self, row_id: int, tokens: Iterable[str]):
+        # Emptied tokens stay in the vocabulary; matching() skips them
+        for token in tokens:
+            ids = self.ids.get(token)
+            if ids:
+                i = bisect_left(ids, row_id)
+                if i < len(ids) and ids[i] == row_id:
+                    del ids[i]
+
+    def matching(self, word: str) -> List[array]:
+        """The id arrays of every token starting with word."""
+        vocabulary = self.vocabulary
+        i = bisect_left(vocabulary, word)
+        found = []
+        while i < len(vocabulary) and vocabulary[i].startswith(word):
+            ids = self.ids[vocabulary[i]]
+            if ids:
+                found.append(ids)
+            i += 1
+        return found
+
+    @staticmethod
+    def _contains(found: List[array]) -> Callable[[int], bool]:
+        if len(found) > 4:
+            return set(chain.from_iterable(found)).__contains__
+
+        def contains(row_id: int) -> bool:
+            for ids in found:
+                i = bisect_left(ids, row_id)
+                if i < len(ids) and ids[i] == row_id:
+                    return True
+            return False
+        return contains
+
+    def find(self, query: Sequence[str]) -> Iterator[int]:
+        """Ids of rows with a token starting with each word of query, highest (newest) first.
+
+        The word with the fewest hits drives the walk; each of its ids is
+        checked against the other words' arrays by bisection.
+        """
+        hits = [self.matching(word) for word in query]
+        if not hits or not all(hits):
+            return
+        hits.sort(key=lambda found: sum(map(len, found)))
+        driver, checks = hits[0], [self._contains(found) for found in hits[1:]]
+        ids = reversed(driver[0]) if len(driver) == 1 else heapq.merge(*map(reversed, driver), reverse=True)
+        previous = None
+        for row_id in ids:
+            if row_id != previous and all(check(row_id) for check in checks):
+                yield row_id
+            previous = row_id
+
+
+class InvertedIndex:
+    """In-memory word index over products, laser materials and operations, for LocalChatBot.
+
+    Every word of an item's name, side, supplier and notes, and of an
+    operation's customer, phone and item name, maps to the sorted ids of the
+    rows containing it. A lookup only touches the arrays of the words asked
+    for, so it costs about the same with 100k rows as with 1k. Words match as
+    prefixes, with Arabic spelling variants folded, like DatabaseHandler.search.
+
+    The index is built on first use and then patched rather than rebuilt:
+    rows added through any connection are read by id (ids only grow), and
+    DatabaseHandler reports edited and deleted items through add_listener.
+    Found rows are read back from the database and checked against the
+    query, so a row changed by another program is dropped or re-indexed as
+    soon as a lookup meets it.
+    """
+
+    # kind -> (table, indexed columns)
+    KINDS = {
+        'product': ('products', ('name', 'supplier', 'notes')),
+        'laser': ('laser_materials', ('name', 'material_side', 'supplier', 'notes')),
+        'operation': ('operations', ('customer_name', 'customer_phone', 'item_name')),
+    }
+    _TABLE_KINDS = {table: kind for kind, (table, columns) in KINDS.items()}
+
+    _FETCH_SQL = {
+        'product': "SELECT * FROM products WHERE id IN (SELECT value FROM json_each(?))",
+        'laser': "SELECT * FROM laser_materials WHERE id IN (SELECT value FROM json_each(?))",
+        'operation': """
+            SELECT id, ts, operation_type, item_name, quantity, total_price,
+                   customer_name, customer_phone, product_id, laser_material_id
+            FROM operations WHERE id IN (SELECT value FROM json_each(?))
+        """,
+    }
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.RLock()
+        self._reset()
+        db.add_listener(self.refresh_row)
+
+    def _reset(self):
+        self._version = None
+        self._max_id = {kind: 0 for kind in self.KINDS}
+        # Items are searched by name first, then by all their words;
+        # operations are split by business line
+        self._postings = {
+            'product': {'name': Postings(), 'all': Postings()},
+            'laser': {'name': Postings(), 'all': Postings()},
+            'operation': {'shop': Postings(), 'laser': Postings()},
+        }
+        # item id -> (name words, all words), to unindex it when it changes
+        self._items: Dict[str, Dict[int, Tuple[tuple, tuple]]] = {'product': {}, 'laser': {}}
+        self._deleted_operations: Set[int] = set()
+
+    # ---------- Maintenance ----------
+    def _item_words(self, kind: str, row) -> Tuple[tuple, tuple]:
+        # Sorted tuples: comparable, and smaller than sets for 100k items
+        return tuple(sorted(words(row['name']))), tuple(sorted(words(*(row[c] for c in self.KINDS[kind][1]))))
+
+    def _sync(self):
+        """Index rows added since the last sync; a PRAGMA read when nothing changed."""
+        version = self.db.data_version()
+        if version == self._version:
+            return
+        for kind, (table, columns) in self.KINDS.items():
+            extra = ", laser_material_id IS NOT NULL" if kind == 'operation' else ""
+            rows = self.db.pool.execute(
+                f"SELECT id, {', '.join(columns)}{extra} FROM {table} WHERE id > ? ORDER BY id",
+                (self._max_id[kind],)
+            ).fetchall()
+            if not rows:
+                continue
+            postings = self._postings[kind]
+            if kind == 'operation':
+                # Customers, phones and items repeat across operations; tokenize each value once
+                seen: Dict[str, tuple] = {}
+
+                def tokens(value) -> tuple:
+                    found = seen.get(value)
+                    if found is None:
+                        found = seen[value] = tuple(words(value))
+                    return found
+                for line, laser in (('shop', 0), ('laser', 1)):
+                    postings[line].extend(
+                        (r[0], tokens(r[1]) + tokens(r[2]) + tokens(r[3])) for r in rows if r[4] == laser
+                    )
+            else:
+                items = self._items[kind]
+                for r in rows:
+                    items[r['id']] = self._item_words(kind, r)
+                postings['name'].extend((r['id'], items[r['id']][0]) for r in rows)
+                postings['all'].extend((r['id'], items[r['id']][1]) for r in rows)
+            self._max_id[kind] = rows[-1][0]
+        self._version = version
+
+    def _reindex_item(self, kind: str, item_id: int, row) -> Optional[tuple]:
+        """Replace an item's words with those of row (None: the item is gone); returns its words."""
+        postings, items = self._postings[kind], self._items[kind]
+        old = items.pop(item_id, None)
+        if old is not None:
+            postings['name'].remove(item_id, old[0])
+            postings['all'].remove(item_id, old[1])
+        if row is None:
+            return None
+        items[item_id] = new = self._item_words(kind, row)
+        postings['name'].add(item_id, new[0])
+        postings['all'].add(item_id, new[1])
+        return new[1]
+
+    def refresh_row(self, table: str, row_id: int):
+        """Re-read an edited or deleted item (DatabaseHandler listener)."""
+        kind = self._TABLE_KINDS.get(table)
+        with self._lock:
+            # Rows past the last sync (all of them before the first lookup) are picked up by the next one
+            if kind not in self._items or row_id > self._max_id[kind]:
+                return
+            row = self.db.pool.execute(self._FETCH_SQL[kind], (json.dumps([row_id]),)).fetchone()
+            self._reindex_item(kind, row_id, row)
+            # A deleted item takes its operations with it; the lookups that meet them drop them
+
+    def rebuild(self):
+        """Drop everything; the next lookup indexes the database again."""
+        with self._lock:
+            self._reset()
+
+    # ---------- Lookups ----------
+    def _candidates(self, kind: str, query: List[str], line: Optional[str]) -> Iterator[int]:
+        postings = self._postings[kind]
+        if kind == 'operation':
+            streams = [postings[name].find(query) for name in ((line,) if line else ('shop', 'laser'))]
+            ids = streams[0] if len(streams) == 1 else heapq.merge(*streams, reverse=True)
+            return (i for i in ids if i not in self._deleted_operations)
+        seen = set()
+        return (i for i in chain(postings['name'].find(query), postings['all'].find(query))
+                if not (i in seen or seen.add(i)))
+
+    def _current(self, kind: str, row_id: int, row, query: List[str]) -> bool:
+        """Whether a found row still exists and matches; fixes its entry if it doesn't."""
+        if kind == 'operation':
+            if row is None:
+                self._deleted_operations.add(row_id)
+                return False
+            found = words(row['customer_name'], row['customer_phone'], row['item_name'])
+        else:
+            entry = self._items[kind].get(row_id)
+            found = entry[1] if entry else None
+            if row is None or self._item_words(kind, row)[1] != found:
+                found = self._reindex_item(kind, row_id, row)
+                if found is None:
+                    return False
+        return all(any(token.startswith(word) for token in found) for word in query)
+
+    def search(self, text: str, kind: str, limit: int = 20, line: Optional[str] = None) -> List[Dict]:
+        """Up to limit rows of kind ('product', 'laser' or 'operation') with a word starting with every word of text.
+
+        Items whose name matches come first; otherwise newer rows come first.
+        line ('shop' or 'laser') keeps one business line's operations.
+        """
+        query = list(dict.fromkeys(_WORD.findall(normalize(text).lower())))
+        if not query:
+            return []
+        with self._lock:
+            self._sync()
+            candidates = self._candidates(kind, query, line)
+            found = []
+            while len(found) < limit:
+                batch = list(islice(candidates, limit - len(found)))
+                if not batch:
+                    break
+                rows = {r['id']: r for r in self.db.pool.execute(self._FETCH_SQL[kind], (json.dumps(batch),)).fetchall()}
+                for row_id in batch:
+                    row = rows.get(row_id)
+                    if self._current(kind, row_id, row, query):
+                        found.append(self.db._operation_row(row) if kind == 'operation' else dict(row))
+            return found
+
+    def stats(self) -> Dict:
+        """Distinct words and indexed ids (hits) per kind."""
+        with self._lock:
+            return {
+                kind: {
+                    "words": sum(len(p.ids) for p in postings.values()),
+                    "hits": sum(len(ids) for p in postings.values() for ids in p.ids.values()),
+                }
+                for kind, postings in self._postings.items()
+            }
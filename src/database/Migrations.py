@@ -0,0 +1,487 @@
+import sqlite3
+from typing import Callable, List
+
+from src.database.TextSearch import FTS_TOKENIZER, sql_normalize
+
+# Each migration upgrades the schema by exactly one version. The list index + 1
+# is the version it produces and is stored in PRAGMA user_version. Never edit or
+# reorder an existing migration; append a new one instead.
+
+
+def _v1_base_schema(cursor: sqlite3.Cursor):
+    """Products, operations and laser materials tables (pre-versioning schema)."""
+    # Products Table
+    cursor.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            supplier TEXT,
+            purchase_date TEXT,
+            purchase_price REAL NOT NULL,
+            sale_price REAL,
+            stock INTEGER NOT NULL,
+            notes TEXT,
+            UNIQUE(name, purchase_price)
+        )
+        '''
+    )
+
+    # Operations Table (replaces Orders)
+    cursor.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS operations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER,
+            laser_material_id INTEGER,
+            operation_type TEXT NOT NULL, -- sale, return, waste
+            customer_name TEXT,
+            customer_phone TEXT,
+            quantity REAL NOT NULL,
+            total_price REAL NOT NULL,
+            date TEXT NOT NULL,
+            FOREIGN KEY (product_id) REFERENCES products (id),
+            FOREIGN KEY (laser_material_id) REFERENCES laser_materials (id)
+        )
+        '''
+    )
+
+    # Laser Materials Table
+    cursor.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS laser_materials (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            material_side TEXT NOT NULL, -- 'وش' or 'ظهر'
+            supplier TEXT,
+            purchase_date TEXT,
+            purchase_price REAL NOT NULL,
+            sale_price REAL,
+            stock_quantity REAL NOT NULL DEFAULT 0,
+            notes TEXT,
+            UNIQUE(name, material_side, purchase_price)
+        )
+        '''
+    )
+
+
+def _v2_operation_indexes(cursor: sqlite3.Cursor):
+    """Secondary indexes for date-range analytics, history ordering and per-item lookups."""
+    # Covers the date-range aggregates and ORDER BY date without touching the table
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_operations_date "
+        "ON operations (date, operation_type, product_id, laser_material_id, quantity, total_price)"
+    )
+    # Per-item history and delete_product / delete_laser_material
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_operations_product "
+        "ON operations (product_id, date, operation_type, quantity, total_price)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_operations_laser "
+        "ON operations (laser_material_id, date, operation_type, quantity, total_price)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_operations_type_date "
+        "ON operations (operation_type, date)"
+    )
+    cursor.execute("ANALYZE")
+
+
+def _v3_daily_summary(cursor: sqlite3.Cursor):
+    """Per-day rollup of operations kept in sync by triggers, backfilled from history."""
+    cursor.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS daily_summary (
+            day TEXT NOT NULL,              -- 'YYYY-MM-DD'
+            line TEXT NOT NULL,             -- 'shop' or 'laser'
+            item_id INTEGER NOT NULL,       -- products.id or laser_materials.id
+            operation_type TEXT NOT NULL,
+            quantity REAL NOT NULL DEFAULT 0,
+            total_price REAL NOT NULL DEFAULT 0,
+            operations_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, line, item_id, operation_type)
+        ) WITHOUT ROWID
+        '''
+    )
+    # Lets analytics loop over items and seek each item's day range (no sort)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_daily_summary_item "
+        "ON daily_summary (line, item_id, day, operation_type, quantity, total_price)"
+    )
+
+    # Triggers run inside the writing statement's transaction, so every
+    # insert, backdated insert, edit and delete keeps the rollup exact.
+    add_new = '''
+        INSERT INTO daily_summary (day, line, item_id, operation_type, quantity, total_price, operations_count)
+        VALUES (
+            substr(NEW.date, 1, 10),
+            CASE WHEN NEW.product_id IS NOT NULL THEN 'shop' ELSE 'laser' END,
+            COALESCE(NEW.product_id, NEW.laser_material_id),
+            NEW.operation_type, NEW.quantity, NEW.total_price, 1
+        )
+        ON CONFLICT (day, line, item_id, operation_type) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            total_price = total_price + excluded.total_price,
+            operations_count = operations_count + 1;
+    '''
+    remove_old = '''
+        UPDATE daily_summary SET
+            quantity = quantity - OLD.quantity,
+            total_price = total_price - OLD.total_price,
+            operations_count = operations_count - 1
+        WHERE day = substr(OLD.date, 1, 10)
+          AND line = CASE WHEN OLD.product_id IS NOT NULL THEN 'shop' ELSE 'laser' END
+          AND item_id = COALESCE(OLD.product_id, OLD.laser_material_id)
+          AND operation_type = OLD.operation_type;
+        DELETE FROM daily_summary
+        WHERE day = substr(OLD.date, 1, 10)
+          AND line = CASE WHEN OLD.product_id IS NOT NULL THEN 'shop' ELSE 'laser' END
+          AND item_id = COALESCE(OLD.product_id, OLD.laser_material_id)
+          AND operation_type = OLD.operation_type
+          AND operations_count <= 0;
+    '''
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_operations_summary_insert AFTER INSERT ON operations BEGIN {add_new} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_operations_summary_delete AFTER DELETE ON operations BEGIN {remove_old} END")
+    cursor.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_operations_summary_update "
+        "AFTER UPDATE OF product_id, laser_material_id, operation_type, quantity, total_price, date ON operations "
+        f"BEGIN {remove_old} {add_new} END"
+    )
+
+    cursor.execute("DELETE FROM daily_summary")
+    cursor.execute(
+        '''
+        INSERT INTO daily_summary (day, line, item_id, operation_type, quantity, total_price, operations_count)
+        SELECT substr(date, 1, 10),
+               CASE WHEN product_id IS NOT NULL THEN 'shop' ELSE 'laser' END,
+               COALESCE(product_id, laser_material_id),
+               operation_type, SUM(quantity), SUM(total_price), COUNT(*)
+        FROM operations
+        GROUP BY 1, 2, 3, 4
+        '''
+    )
+
+
+def _v4_operation_snapshots(cursor: sqlite3.Cursor):
+    """Store unit cost and item display name on each operation and roll cost up per day."""
+    cursor.execute("ALTER TABLE operations ADD COLUMN unit_cost REAL")
+    cursor.execute("ALTER TABLE operations ADD COLUMN item_name TEXT")
+    cursor.execute(
+        '''
+        UPDATE operations SET
+            unit_cost = (SELECT purchase_price FROM products WHERE id = operations.product_id),
+            item_name = (SELECT name FROM products WHERE id = operations.product_id)
+        WHERE product_id IS NOT NULL
+        '''
+    )
+    cursor.execute(
+        '''
+        UPDATE operations SET
+            unit_cost = (SELECT purchase_price FROM laser_materials WHERE id = operations.laser_material_id),
+            item_name = (SELECT name || ' (' || material_side || ')' FROM laser_materials WHERE id = operations.laser_material_id)
+        WHERE laser_material_id IS NOT NULL
+        '''
+    )
+
+    cursor.execute("ALTER TABLE daily_summary ADD COLUMN cost REAL NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE daily_summary ADD COLUMN item_name TEXT")
+    cursor.execute("DROP INDEX IF EXISTS idx_daily_summary_item")
+    cursor.execute(
+        "CREATE INDEX idx_daily_summary_item "
+        "ON daily_summary (line, item_id, day, operation_type, quantity, total_price, cost, item_name)"
+    )
+
+    add_new = '''
+        INSERT INTO daily_summary (day, line, item_id, operation_type, quantity, total_price, cost, operations_count, item_name)
+        VALUES (
+            substr(NEW.date, 1, 10),
+            CASE WHEN NEW.product_id IS NOT NULL THEN 'shop' ELSE 'laser' END,
+            COALESCE(NEW.product_id, NEW.laser_material_id),
+            NEW.operation_type, NEW.quantity, NEW.total_price,
+            NEW.quantity * COALESCE(NEW.unit_cost, 0), 1, NEW.item_name
+        )
+        ON CONFLICT (day, line, item_id, operation_type) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            total_price = total_price + excluded.total_price,
+            cost = cost + excluded.cost,
+            operations_count = operations_count + 1,
+            item_name = COALESCE(excluded.item_name, item_name);
+    '''
+    remove_old = '''
+        UPDATE daily_summary SET
+            quantity = quantity - OLD.quantity,
+            total_price = total_price - OLD.total_price,
+            cost = cost - OLD.quantity * COALESCE(OLD.unit_cost, 0),
+            operations_count = operations_count - 1
+        WHERE day = substr(OLD.date, 1, 10)
+          AND line = CASE WHEN OLD.product_id IS NOT NULL THEN 'shop' ELSE 'laser' END
+          AND item_id = COALESCE(OLD.product_id, OLD.laser_material_id)
+          AND operation_type = OLD.operation_type;
+        DELETE FROM daily_summary
+        WHERE day = substr(OLD.date, 1, 10)
+          AND line = CASE WHEN OLD.product_id IS NOT NULL THEN 'shop' ELSE 'laser' END
+          AND item_id = COALESCE(OLD.product_id, OLD.laser_material_id)
+          AND operation_type = OLD.operation_type
+          AND operations_count <= 0;
+    '''
+    for trigger in ("insert", "delete", "update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS trg_operations_summary_{trigger}")
+    cursor.execute(f"CREATE TRIGGER trg_operations_summary_insert AFTER INSERT ON operations BEGIN {add_new} END")
+    cursor.execute(f"CREATE TRIGGER trg_operations_summary_delete AFTER DELETE ON operations BEGIN {remove_old} END")
+    cursor.execute(
+        "CREATE TRIGGER trg_operations_summary_update "
+        "AFTER UPDATE OF product_id, laser_material_id, operation_type, quantity, total_price, date, unit_cost, item_name "
+        f"ON operations BEGIN {remove_old} {add_new} END"
+    )
+
+    cursor.execute("DELETE FROM daily_summary")
+    cursor.execute(
+        '''
+        INSERT INTO daily_summary (day, line, item_id, operation_type, quantity, total_price, cost, operations_count, item_name)
+        SELECT day, line, item_id, operation_type, quantity, total_price, cost, operations_count, item_name
+        FROM (
+            SELECT substr(date, 1, 10) AS day,
+                   CASE WHEN product_id IS NOT NULL THEN 'shop' ELSE 'laser' END AS line,
+                   COALESCE(product_id, laser_material_id) AS item_id,
+                   operation_type,
+                   SUM(quantity) AS quantity,
+                   SUM(total_price) AS total_price,
+                   SUM(quantity * COALESCE(unit_cost, 0)) AS cost,
+                   COUNT(*) AS operations_count,
+                   item_name, MAX(id)
+            FROM operations
+            GROUP BY 1, 2, 3, 4
+        )
+        '''
+    )
+
+
+def _v5_integer_timestamps(cursor: sqlite3.Cursor):
+    """Replace operations.date TEXT with an integer ts and key daily_summary by day number."""
+    # See src/database/Timestamps.py: ts is local wall-clock seconds since 1970,
+    # which is exactly what strftime('%s') yields for the stored naive strings.
+    seq = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'operations'").fetchone()
+    cursor.execute(
+        '''
+        CREATE TABLE operations_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER,
+            laser_material_id INTEGER,
+            operation_type TEXT NOT NULL, -- sale, return, waste
+            customer_name TEXT,
+            customer_phone TEXT,
+            quantity REAL NOT NULL,
+            total_price REAL NOT NULL,
+            ts INTEGER NOT NULL,          -- seconds since 1970-01-01, local time
+            unit_cost REAL,
+            item_name TEXT,
+            FOREIGN KEY (product_id) REFERENCES products (id),
+            FOREIGN KEY (laser_material_id) REFERENCES laser_materials (id)
+        )
+        '''
+    )
+    cursor.execute(
+        '''
+        INSERT INTO operations_new (id, product_id, laser_material_id, operation_type, customer_name,
+                                    customer_phone, quantity, total_price, ts, unit_cost, item_name)
+        SELECT id, product_id, laser_material_id, operation_type, customer_name,
+               customer_phone, quantity, total_price, CAST(strftime('%s', date) AS INTEGER), unit_cost, item_name
+        FROM operations
+        '''
+    )
+    # Dropping the table also drops its indexes and rollup triggers
+    cursor.execute("DROP TABLE operations")
+    cursor.execute("ALTER TABLE operations_new RENAME TO operations")
+    if seq is not None:
+        cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'operations'", (seq[0],))
+
+    # History ordering and range scans
+    cursor.execute("CREATE INDEX idx_operations_ts ON operations (ts)")
+    # Per-item history and delete_product / delete_laser_material
+    cursor.execute("CREATE INDEX idx_operations_product ON operations (product_id, ts)")
+    cursor.execute("CREATE INDEX idx_operations_laser ON operations (laser_material_id, ts)")
+    cursor.execute("CREATE INDEX idx_operations_type_ts ON operations (operation_type, ts)")
+
+    cursor.execute("DROP TABLE daily_summary")
+    cursor.execute(
+        '''
+        CREATE TABLE daily_summary (
+            day INTEGER NOT NULL,           -- ts / 86400
+            line TEXT NOT NULL,             -- 'shop' or 'laser'
+            item_id INTEGER NOT NULL,       -- products.id or laser_materials.id
+            operation_type TEXT NOT NULL,
+            quantity REAL NOT NULL DEFAULT 0,
+            total_price REAL NOT NULL DEFAULT 0,
+            cost REAL NOT NULL DEFAULT 0,
+            operations_count INTEGER NOT NULL DEFAULT 0,
+            item_name TEXT,
+            PRIMARY KEY (day, line, item_id, operation_type)
+        ) WITHOUT ROWID
+        '''
+    )
+    cursor.execute(
+        "CREATE INDEX idx_daily_summary_item "
+        "ON daily_summary (line, item_id, day, operation_type, quantity, total_price, cost, item_name)"
+    )
+
+    add_new = '''
+        INSERT INTO daily_summary (day, line, item_id, operation_type, quantity, total_price, cost, operations_count, item_name)
+        VALUES (
+            NEW.ts / 86400,
+            CASE WHEN NEW.product_id IS NOT NULL THEN 'shop' ELSE 'laser' END,
+            COALESCE(NEW.product_id, NEW.laser_material_id),
+            NEW.operation_type, NEW.quantity, NEW.total_price,
+            NEW.quantity * COALESCE(NEW.unit_cost, 0), 1, NEW.item_name
+        )
+        ON CONFLICT (day, line, item_id, operation_type) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            total_price = total_price + excluded.total_price,
+            cost = cost + excluded.cost,
+            operations_count = operations_count + 1,
+            item_name = COALESCE(excluded.item_name, item_name);
+    '''
+    remove_old = '''
+        UPDATE daily_summary SET
+            quantity = quantity - OLD.quantity,
+            total_price = total_price - OLD.total_price,
+            cost = cost - OLD.quantity * COALESCE(OLD.unit_cost, 0),
+            operations_count = operations_count - 1
+        WHERE day = OLD.ts / 86400
+          AND line = CASE WHEN OLD.product_id IS NOT NULL THEN 'shop' ELSE 'laser' END
+          AND item_id = COALESCE(OLD.product_id, OLD.laser_material_id)
+          AND operation_type = OLD.operation_type;
+        DELETE FROM daily_summary
+        WHERE day = OLD.ts / 86400
+          AND line = CASE WHEN OLD.product_id IS NOT NULL THEN 'shop' ELSE 'laser' END
+          AND item_id = COALESCE(OLD.product_id, OLD.laser_material_id)
+          AND operation_type = OLD.operation_type
+          AND operations_count <= 0;
+    '''
+    cursor.execute(f"CREATE TRIGGER trg_operations_summary_insert AFTER INSERT ON operations BEGIN {add_new} END")
+    cursor.execute(f"CREATE TRIGGER trg_operations_summary_delete AFTER DELETE ON operations BEGIN {remove_old} END")
+    cursor.execute(
+        "CREATE TRIGGER trg_operations_summary_update "
+        "AFTER UPDATE OF product_id, laser_material_id, operation_type, quantity, total_price, ts, unit_cost, item_name "
+        f"ON operations BEGIN {remove_old} {add_new} END"
+    )
+
+    cursor.execute(
+        '''
+        INSERT INTO daily_summary (day, line, item_id, operation_type, quantity, total_price, cost, operations_count, item_name)
+        SELECT day, line, item_id, operation_type, quantity, total_price, cost, operations_count, item_name
+        FROM (
+            SELECT ts / 86400 AS day,
+                   CASE WHEN product_id IS NOT NULL THEN 'shop' ELSE 'laser' END AS line,
+                   COALESCE(product_id, laser_material_id) AS item_id,
+                   operation_type,
+                   SUM(quantity) AS quantity,
+                   SUM(total_price) AS total_price,
+                   SUM(quantity * COALESCE(unit_cost, 0)) AS cost,
+                   COUNT(*) AS operations_count,
+                   item_name, MAX(id)
+            FROM operations
+            GROUP BY 1, 2, 3, 4
+        )
+        '''
+    )
+    cursor.execute("ANALYZE")
+
+
+def _v6_history_price_index(cursor: sqlite3.Cursor):
+    """Index total_price so the history page can keyset-paginate by price as well as by date."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_operations_price ON operations (total_price)")
+
+
+def _v7_full_text_search(cursor: sqlite3.Cursor):
+    """FTS5 indexes over item names, suppliers and notes and operation customers and phones."""
+    # Each index is keyed by its source row's id and stores the Arabic-folded
+    # text (see TextSearch.py), maintained by triggers like daily_summary.
+    indexes = {
+        'products': ('name', 'supplier', 'notes'),
+        'laser_materials': ('name', 'material_side', 'supplier', 'notes'),
+        # Item names are found through the item indexes (and the per-item
+        # operation indexes): they repeat on every operation of an item
+        'operations': ('customer_name', 'customer_phone'),
+    }
+    # bm25 column weights: a hit in the name outranks supplier, side or notes
+    ranks = {
+        'products': 'bm25(10.0, 2.0, 1.0)',
+        'laser_materials': 'bm25(10.0, 1.0, 2.0, 1.0)',
+        'operations': 'bm25(1.0, 1.0)',
+    }
+    for table, columns in indexes.items():
+        fts = f"{table}_fts"
+        column_list = ", ".join(columns)
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{column_list}, tokenize = '{FTS_TOKENIZER}', prefix = '2 3')"
+        )
+        cursor.execute(f"INSERT INTO {fts} ({fts}, rank) VALUES ('rank', ?)", (ranks[table],))
+
+        new_values = ", ".join(sql_normalize(f"NEW.{c}") for c in columns)
+        add_new = f"INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.id, {new_values});"
+        remove_old = f"DELETE FROM {fts} WHERE rowid = OLD.id;"
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {table} BEGIN {add_new} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {table} BEGIN {remove_old} END")
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{fts}_update AFTER UPDATE OF {column_list} ON {table} "
+            f"BEGIN {remove_old} {add_new} END"
+        )
+
+        cursor.execute(f"DELETE FROM {fts}")
+        cursor.execute(
+            f"INSERT INTO {fts} (rowid, {column_list}) "
+            f"SELECT id, {', '.join(sql_normalize(c) for c in columns)} FROM {table}"
+        )
+        cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('optimize')")
+
+
+def _v8_drop_daily_summary_item_index(cursor: sqlite3.Cursor):
+    """Analytics range-scan daily_summary by its (day, ...) primary key; the per-item index only slowed the triggers."""
+    cursor.execute("DROP INDEX IF EXISTS idx_daily_summary_item")
+
+
+MIGRATIONS: List[Callable[[sqlite3.Cursor], None]] = [
+    _v1_base_schema,
+    _v2_operation_indexes,
+    _v3_daily_summary,
+    _v4_operation_snapshots,
+    _v5_integer_timestamps,
+    _v6_history_price_index,
+    _v7_full_text_search,
+    _v8_drop_daily_summary_item_index,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations, each in its own transaction. Returns the resulting version."""
+    version = get_schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+
+    cursor = conn.cursor()
+    try:
+        while True:
+            # Take the write lock before re-reading the version so two processes
+            # starting at once don't run the same migration twice.
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                version = get_schema_version(conn)
+                if version >= SCHEMA_VERSION:
+                    conn.rollback()
+                    return version
+                MIGRATIONS[version](cursor)
+                cursor.execute(f"PRAGMA user_version = {version + 1}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    finally:
+        cursor.close()
@@ -0,0 +1,45 @@
+import re
+from typing import Optional
+
+# Full-text search folds Arabic spelling variants before indexing and before
+# matching, so "أحمد", "احمد" and "أَحْمَد" find each other. The FTS5 unicode61
+# tokenizer already handles Latin case and accents. The same folding runs in
+# SQL (the index triggers) and in Python (queries). Changing FOLDS requires a
+# migration that rebuilds the *_fts tables.
+
+FOLDS = {
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه',
+    'ى': 'ي',
+    # Harakat and tatweel are dropped
+    'ً': '', 'ٌ': '', 'ٍ': '', 'َ': '', 'ُ': '',
+    'ِ': '', 'ّ': '', 'ْ': '', 'ـ': '',
+}
+
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+
+_TRANSLATION = str.maketrans(FOLDS)
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Fold Arabic letter variants and strip harakat, as the search index does."""
+    return (text or '').translate(_TRANSLATION)
+
+
+def sql_normalize(expression: str) -> str:
+    """SQL expression applying normalize() to `expression` with nested replace() calls."""
+    for source, target in FOLDS.items():
+        expression = f"replace({expression}, '{source}', '{target}')"
+    return expression
+
+
+def match_query(text: Optional[str]) -> Optional[str]:
+    """FTS5 MATCH expression requiring every word of `text` as a prefix, or None if it has no words.
+
+    Words are quoted, so user input can't inject FTS5 query syntax.
+    """
+    tokens = _TOKEN.findall(normalize(text))
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
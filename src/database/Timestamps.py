@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+from typing import Tuple, Union
+
+# Operation times are stored as integer seconds since 1970-01-01 of the shop's
+# local wall-clock time (encoded as if it were UTC). There is no timezone or DST
+# arithmetic involved, so `ts // SECONDS_PER_DAY` is always the local calendar
+# day and SQLite's strftime(..., 'unixepoch') renders the same wall-clock time.
+
+DATE_FORMAT = "%Y-%m-%d"
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+SECONDS_PER_DAY = 86400
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_timestamp(value: Union[str, datetime]) -> int:
+    """Convert a datetime, 'YYYY-MM-DD HH:MM:SS' or 'YYYY-MM-DD' string to an integer timestamp."""
+    if isinstance(value, str):
+        value = value.strip()
+        value = datetime.strptime(value, DATETIME_FORMAT if len(value) > 10 else DATE_FORMAT)
+    return int((value.replace(tzinfo=None) - _EPOCH).total_seconds())
+
+
+def from_timestamp(ts: int) -> datetime:
+    return _EPOCH + timedelta(seconds=int(ts))
+
+
+def format_timestamp(ts: int, fmt: str = DATETIME_FORMAT) -> str:
+    return from_timestamp(ts).strftime(fmt)
+
+
+def day_number(value: Union[int, str, datetime]) -> int:
+    """Days since 1970-01-01 for a timestamp, date string or datetime."""
+    ts = value if isinstance(value, int) else to_timestamp(value)
+    return ts // SECONDS_PER_DAY
+
+
+def day_range(start_date: str, end_date: str) -> Tuple[int, int]:
+    """Inclusive day numbers for two date strings; any time part is ignored."""
+    return day_number(start_date[:10]), day_number(end_date[:10])
@@ -0,0 +1,83 @@
+"""Database maintenance commands.
+
+    python -m src.database rebuild-summary [--check] [--db data/venom_shop.db]
+    python -m src.database import {product,laser} FILE [--chunk-size 5000]
+"""
+import argparse
+import sys
+
+from src.database.DatabaseHandler import DatabaseHandler
+
+
+def _report(mismatches) -> None:
+    print(f"❌ {len(mismatches)} rollup rows do not match the operations log:")
+    for row in mismatches[:20]:
+        print(f"   {row}")
+
+
+def rebuild_summary(db: DatabaseHandler, check_only: bool = False) -> int:
+    """Check the daily_summary rollup against the operations log, then (unless check_only) rebuild it.
+
+    Returns 1 if check_only found drift, or if the rebuilt rollup still
+    doesn't match; 0 otherwise.
+    """
+    mismatches = db.verify_daily_summary()
+    if mismatches:
+        _report(mismatches)
+    else:
+        print("✅ daily_summary matches the operations log")
+    if check_only:
+        return 1 if mismatches else 0
+
+    count = db.rebuild_daily_summary()
+    print(f"Rebuilt daily_summary: {count} rows")
+    mismatches = db.verify_daily_summary()
+    if mismatches:
+        _report(mismatches)
+        return 1
+    print("✅ rebuilt daily_summary matches the operations log")
+    return 0
+
+
+def import_items(db: DatabaseHandler, item_type: str, path: str, chunk_size: int) -> int:
+    from src.database.BulkImport import import_file
+
+    def progress(rows: int):
+        print(f"\r   {rows} rows imported...", end="", flush=True)
+
+    try:
+        summary = import_file(db, path, item_type, chunk_size=chunk_size, progress=progress)
+    except Exception as e:
+        print(f"\n❌ Import failed, nothing was written: {e}")
+        return 1
+    print(f"\n✅ {summary['rows']} rows: {summary['inserted']} new ({summary['renamed']} renamed), {summary['updated']} restocked, {summary['skipped']} skipped")
+    for error in summary['errors']:
+        print(f"   {error}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.database", description="VENOM Shop database maintenance")
+    parser.add_argument("--db", default="data/venom_shop.db", help="database file (default: data/venom_shop.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild-summary", help="check the daily_summary rollup against operations, then regenerate it")
+    rebuild.add_argument("--check", action="store_true", help="only check, don't rebuild (exit status 1 on drift)")
+    importer = commands.add_parser("import", help="bulk import products or laser materials from a CSV/XLSX file")
+    importer.add_argument("item_type", choices=("product", "laser"))
+    importer.add_argument("file")
+    importer.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    db = DatabaseHandler(args.db)
+    try:
+        if args.command == "rebuild-summary":
+            return rebuild_summary(db, check_only=args.check)
+        if args.command == "import":
+            return import_items(db, args.item_type, args.file, args.chunk_size)
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
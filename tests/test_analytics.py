@@ -0,0 +1,43 @@
+import pytest
+
+from src.database.DatabaseHandler import DatabaseHandler
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseHandler(str(tmp_path / "shop.db"))
+    db.add_product("كابل شحن", None, "2025-01-01", 20, 10)
+    db.add_product("سماعة", None, "2025-01-01", 50, 10)
+    db.add_laser_material("اكريلك", "وجه واحد", None, "2025-01-01", 30, 10)
+    cable = db.get_products_by_name("كابل شحن")[0]["id"]
+    headset = db.get_products_by_name("سماعة")[0]["id"]
+    acrylic = db.get_all_laser_materials()[0]["id"]
+    db.add_operation_with_date(cable, "product", "بيع", "احمد", None, 3, 90, "2025-01-02")
+    db.add_operation_with_date(cable, "product", "استرجاع", "احمد", None, 1, 30, "2025-01-03")
+    db.add_operation_with_date(headset, "product", "بيع", "منى", None, 1, 80, "2025-01-03")
+    db.add_operation_with_date(headset, "product", "تالف", None, None, 1, 0, "2025-01-03")
+    db.add_operation_with_date(acrylic, "laser", "بيع", "سارة", None, 2, 100, "2025-01-05")
+    yield db
+    db.close()
+
+
+def test_totals_and_top_sellers(db):
+    data = db.get_analytics_data("2025-01-01", "2025-01-31")
+    assert data["shop_revenue"] == 90 - 30 + 80
+    assert data["shop_profit"] == (90 - 30 + 80) - (2 * 20 + 50) - 50
+    assert (data["laser_revenue"], data["laser_profit"]) == (100, 100 - 2 * 30)
+    assert data["top_shop_products"] == [{"name": "كابل شحن", "total_sold": 2}, {"name": "سماعة", "total_sold": 1}]
+
+
+def test_range_is_whole_days(db):
+    data = db.get_analytics_data("2025-01-03 18:00:00", "2025-01-03 00:00:00")
+    assert data["shop_revenue"] == 80 - 30
+    assert data["laser_revenue"] == 0
+
+
+def test_rollup_rows_count_without_their_item_row(db):
+    with db.pool.transaction() as cursor:
+        cursor.execute("DELETE FROM laser_materials")
+    data = db.get_analytics_data("2025-01-01", "2025-01-31")
+    assert data["laser_revenue"] == 100
+    assert data["top_laser_materials"] == [{"name": "اكريلك (وجه واحد)", "total_sold": 2}]
@@ -0,0 +1,58 @@
+import sys
+
+import pytest
+
+from src.database.BulkImport import import_file
+from src.database.DatabaseHandler import DatabaseHandler
+
+
+def test_xlsx_import(tmp_path):
+    from openpyxl import Workbook
+    path = str(tmp_path / "prices.xlsx")
+    workbook = Workbook()
+    workbook.active.append(["name", "supplier", "purchase_price", "sale_price", "stock"])
+    workbook.active.append(["كابل شحن", "المورد", 10, 20, 5])
+    workbook.save(path)
+    db = DatabaseHandler(str(tmp_path / "shop.db"))
+    summary = import_file(db, path, "product")
+    assert (summary["inserted"], summary["skipped"]) == (1, 0)
+    assert db.get_products_by_name("كابل شحن")[0]["stock"] == 5
+    db.close()
+
+
+def test_xlsx_refused_without_openpyxl(tmp_path, monkeypatch):
+    path = str(tmp_path / "prices.xlsx")
+    open(path, "wb").close()
+    db = DatabaseHandler(str(tmp_path / "shop.db"))
+    # A None entry makes `import openpyxl` fail as if it weren't installed
+    monkeypatch.setitem(sys.modules, "openpyxl", None)
+    with pytest.raises(ImportError, match="pip install openpyxl"):
+        import_file(db, path, "product")
+    assert db.get_all_products() == []
+    db.close()
+
+
+def test_products_renamed_like_the_add_form(tmp_path):
+    path = str(tmp_path / "prices.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("name,purchase_price,sale_price,stock\n"
+                "كابل شحن,10,20,5\n"   # existing name and price: restocked
+                "كابل شحن,12,25,4\n"   # existing name, new price
+                "كابل شحن,14,25,1\n"
+                "سماعة,50,80,2\n")
+    db = DatabaseHandler(str(tmp_path / "shop.db"))
+    db.add_product("كابل شحن", None, "2025-01-01", 10, 3)
+    summary = import_file(db, path, "product")
+    assert (summary["inserted"], summary["renamed"], summary["updated"]) == (3, 2, 1)
+    stock = {(p["name"], p["purchase_price"]): p["stock"] for p in db.get_all_products()}
+    assert stock == {("كابل شحن", 10): 8, ("كابل شحن (2)", 12): 4, ("كابل شحن (3)", 14): 1, ("سماعة", 50): 2}
+
+    # Importing the file again restocks the renamed products instead of adding more
+    summary = import_file(db, path, "product")
+    assert (summary["inserted"], summary["updated"]) == (0, 4)
+    assert db.get_products_by_name("كابل شحن (2)")[0]["stock"] == 8
+    # The add-items form resolves names the same way
+    assert db.resolve_product("كابل شحن", 12) == (db.get_products_by_name("كابل شحن (2)")[0]["id"], "كابل شحن (2)")
+    assert db.resolve_product("كابل شحن", 16) == (None, "كابل شحن (4)")
+    assert db.resolve_product("شاحن", 16) == (None, "شاحن")
+    db.close()
@@ -0,0 +1,117 @@
+import asyncio
+
+from src.ChatBot.ChatBot import RATE_LIMITED
+from src.ChatBot.ChatRouter import ChatRouter, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Remote:
+    """ChatBot stand-in: answers after `delay` seconds with `reply`."""
+    wants_context = False
+
+    def __init__(self, reply="remote answer", delay=0.0):
+        self.reply, self.delay, self.calls = reply, delay, 0
+
+    async def get_response(self, message, context="", history=()):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.reply
+
+    async def stream_response(self, message, context="", history=()):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.reply.startswith("❌"):
+            yield self.reply  # errors come as one piece
+            return
+        for word in self.reply.split():
+            yield word + " "
+
+
+class Local:
+    async def get_response(self, message):
+        return "local answer"
+
+    async def stream_response(self, message):
+        yield "local "
+        yield "answer"
+
+
+def test_breaker_opens_after_failures_and_half_opens_after_backoff():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=3, backoff=5, max_backoff=8, clock=clock)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+    clock.now = 5
+    assert breaker.available() and breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.current_backoff == 8  # doubled, capped
+    clock.now = 12
+    assert not breaker.allow()
+    clock.now = 13
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.current_backoff == 5
+
+
+def test_breaker_opens_on_one_rate_limit_and_an_abandoned_probe_is_retried():
+    clock = Clock()
+    breaker = CircuitBreaker(backoff=5, clock=clock)
+    breaker.record_failure(rate_limited=True)
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 5
+    assert breaker.allow()
+    breaker.abandon()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.allow()
+
+
+def test_missed_deadline_answers_locally_and_counts_against_the_remote():
+    remote = Remote(delay=1.0)
+    router = ChatRouter(remote, Local(), deadline=0.05, breaker=CircuitBreaker(failure_threshold=2))
+
+    async def ask():
+        return [await router.get_response("ربح المحل") for _ in range(3)]
+
+    assert asyncio.run(ask()) == ["local answer"] * 3
+    # The third question didn't reach the remote: two misses opened the circuit
+    assert remote.calls == 2
+    assert router.breaker.state == CircuitBreaker.OPEN
+    assert router.stats()["remote"]["timeouts"] == 2
+
+
+def test_stream_falls_back_before_the_first_words():
+    async def answer(router):
+        return "".join([piece async for piece in router.stream_response("ربح المحل")])
+
+    slow = ChatRouter(Remote(delay=1.0), Local(), deadline=0.05)
+    assert asyncio.run(answer(slow)) == "local answer"
+    rate_limited = ChatRouter(Remote(reply=RATE_LIMITED), Local())
+    assert asyncio.run(answer(rate_limited)) == "local answer"
+    assert rate_limited.breaker.state == CircuitBreaker.OPEN
+    fast = ChatRouter(Remote(), Local())
+    assert asyncio.run(answer(fast)) == "remote answer "
+    assert fast.stats()["remote"]["answers"] == 1
+
+
+def test_open_circuit_skips_the_remote_until_its_probe_succeeds():
+    clock = Clock()
+    remote = Remote()
+    router = ChatRouter(remote, Local(), breaker=CircuitBreaker(backoff=5, clock=clock))
+    router.breaker.trip()
+    assert asyncio.run(router.get_response("سؤال")) == "local answer" and remote.calls == 0
+    clock.now = 5
+    assert asyncio.run(router.get_response("سؤال")) == "remote answer"
+    assert router.breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+from src.ChatBot.ContextBuilder import ContextBuilder
+from src.database.DatabaseHandler import DatabaseHandler
+
+
+@pytest.fixture
+def builder(tmp_path):
+    db = DatabaseHandler(str(tmp_path / "shop.db"))
+    db.add_product("سماعة بلوتوث", "المورد", "2025-01-01", 50, 10)
+    yield ContextBuilder(db)
+    db.close()
+
+
+@pytest.mark.parametrize("question, covered", [
+    ("مبيعات اليوم", True),  # period totals only, no words to look up
+    ("كام سماعة عندنا", True),
+    ("إيه اللي قرب يخلص", False),
+])
+def test_build_checked(builder, question, covered):
+    context, found = builder.build_checked(question)
+    assert found is covered
+    assert context == builder.build(question)
+    assert ("products" in json.loads(context)) is (question == "كام سماعة عندنا")
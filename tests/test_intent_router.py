@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.ChatBot.IntentRouter import IntentRouter
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter()
+
+
+@pytest.mark.parametrize("message, intent, terms", [
+    # Names with a keyword inside them: "سلام" (greeting), "ربح" (money), "باع" (history)
+    ("متى اشترى اسلام؟", "history", ["اسلام"]),
+    ("سجل مشتريات اسلام من المحل", "history", ["مشتريات", "اسلام"]),
+    ("متى اشترى عربحي", "history", ["عربحي"]),
+    ("منتجات سباعي", "search", ["سباعي"]),
+])
+def test_names_containing_keywords(router, message, intent, terms):
+    route = router.route(message)
+    assert route["intent"] == intent
+    assert route["terms"] == terms
+
+
+@pytest.mark.parametrize("message, intent, line", [
+    ("السلام عليكم", "greeting", None),
+    ("شكراً يا أسامة", "thanks", None),
+    ("ربحنا كام في الليزر", "sales", "laser"),
+    ("والمحلات فيها سماعات", "search", "shop"),
+    ("مَحل", "overview", "shop"),
+    ("HELP", "help", None),
+])
+def test_keyword_forms(router, message, intent, line):
+    route = router.route(message)
+    assert (route["intent"], route["line"]) == (intent, line)
+
+
+def test_only_stop_words_left(router):
+    route = router.route("سجل العميل زبون")
+    assert route["intent"] == "history"
+    assert route["terms"] == ["زبون"]
+
+
+def test_search_terms_are_folded(router):
+    assert router.route("متى اشترى أحمد من المحل؟")["terms"] == ["احمد"]
+
+
+def test_shared_between_threads():
+    # LocalChatBot answers on several database threads; a small cache keeps them evicting
+    router = IntentRouter(max_pieces=8)
+    messages = [f"متى اشترى عميل {n} من المحل" for n in range(200)] + ["ربحنا كام في الليزر"] * 200
+    expected = [IntentRouter().route(message) for message in messages]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for _ in range(5):
+            assert list(pool.map(router.route, messages)) == expected
+    assert len(router._pieces) <= 8
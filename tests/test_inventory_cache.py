@@ -0,0 +1,38 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from src.database.DatabaseHandler import DatabaseHandler
+
+
+def test_only_writes_invalidate(tmp_path):
+    db = DatabaseHandler(str(tmp_path / "shop.db"))
+    db.add_product("كابل شحن", None, "2025-01-01", 20, 10)
+    product_id = db.get_all_products()[0]["id"]
+    version = db.cache.write_version
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        # New threads, and so new pooled connections, read from the cache
+        assert all(len(p) == 1 for p in pool.map(lambda _: db.get_all_products(), range(8)))
+        assert db.cache.write_version == version
+        # A write on a worker thread is one bump, not one per connection that sees it
+        assert pool.submit(db.update_product_stock, product_id, 5).result()
+        assert all(p[0]["stock"] == 15 for p in pool.map(lambda _: db.get_all_products(), range(8)))
+    assert db.get_all_products()[0]["stock"] == 15
+    assert db.cache.write_version == version + 1
+    db.close()
+
+
+def test_commit_from_outside_invalidates(tmp_path):
+    path = str(tmp_path / "shop.db")
+    db = DatabaseHandler(path)
+    db.add_product("كابل شحن", None, "2025-01-01", 20, 10)
+    assert db.get_all_products()[0]["stock"] == 10
+    version = db.data_version()
+
+    outside = sqlite3.connect(path)
+    with outside:
+        outside.execute("UPDATE products SET stock = 3")
+    outside.close()
+    assert db.get_all_products()[0]["stock"] == 3
+    assert db.data_version() == version + 1
+    db.close()
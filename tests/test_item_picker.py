@@ -0,0 +1,48 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from nicegui import Client
+from nicegui.page import page
+
+from src.database.DatabaseHandler import DatabaseHandler
+from src.GUI.ItemPicker import ItemPicker
+from src.Services import services
+
+
+@pytest.fixture
+def shop(tmp_path):
+    db = DatabaseHandler(str(tmp_path / "shop.db"))
+    db.add_product("أحمر شفاه", "الوكيل", "2025-01-01", 50, 4)
+    db.add_product("كابل شحن", "أحمد", "2025-01-01", 20, 7)
+    db.add_product("جراب شفاف", None, "2025-01-01", 15, 3)
+    services.configure(db=db)
+    yield db
+    asyncio.run(services.close())
+
+
+def search(text: str) -> dict:
+    async def run():
+        with Client(page('/'), request=None):
+            picker = ItemPicker('product', label='اختر المنتج *')
+            await picker.search(text)
+            return picker.select
+    select = asyncio.run(run())
+    # The browser shows the options as sent: no filtering of its own by the typed text
+    assert Path(select.component.path).name == 'item_picker.js'
+    assert 'indexOf' not in Path(select.component.path).read_text()
+    return select.options
+
+
+def test_folded_spelling_is_not_a_substring_of_the_label(shop):
+    options = search("احمر")
+    assert list(options.values()) == ["أحمر شفاه (المتاح: 4)"]
+    assert "احمر" not in options[next(iter(options))]
+
+
+def test_supplier_match(shop):
+    assert list(search("احمد").values()) == ["كابل شحن (المتاح: 7)"]
+
+
+def test_stock_text_is_not_searched(shop):
+    assert search("المتاح") == {}
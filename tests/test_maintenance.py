@@ -0,0 +1,21 @@
+from src.database.__main__ import main
+from src.database.DatabaseHandler import DatabaseHandler
+
+
+def test_rebuild_summary_reports_drift_before_rebuilding(tmp_path, capsys):
+    path = str(tmp_path / "shop.db")
+    db = DatabaseHandler(path)
+    db.add_product("كابل شحن", None, "2025-01-01", 20, 10)
+    product_id = db.get_products_by_name("كابل شحن")[0]["id"]
+    db.add_operation_with_date(product_id, "product", "بيع", "احمد", None, 2, 60, "2025-01-02")
+    # Drift the triggers can't catch: an edit straight to the rollup
+    with db.pool.transaction() as cursor:
+        cursor.execute("UPDATE daily_summary SET quantity = quantity + 1")
+    db.close()
+
+    assert main(["--db", path, "rebuild-summary", "--check"]) == 1
+    assert "1 rollup rows do not match" in capsys.readouterr().out
+    assert main(["--db", path, "rebuild-summary"]) == 0
+    out = capsys.readouterr().out
+    assert "1 rollup rows do not match" in out and "✅ rebuilt daily_summary matches" in out
+    assert main(["--db", path, "rebuild-summary", "--check"]) == 0
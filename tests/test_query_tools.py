@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import time
+
+from src.ChatBot.QueryTools import QueryTools, _Call
+from src.database.AsyncDatabaseHandler import AsyncDatabaseHandler
+from src.database.DatabaseHandler import DatabaseHandler
+
+SLOW = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 5000000) SELECT count(*) FROM c"
+
+
+def test_timeout_interrupts_the_running_query(tmp_path):
+    db = DatabaseHandler(str(tmp_path / "shop.db"))
+    adb = AsyncDatabaseHandler(db, max_workers=1)
+    tools = QueryTools(adb, timeout=0.05)
+    tools._tools["slow"] = lambda: db.pool.execute(SLOW).fetchone()[0]
+
+    async def calls():
+        started = time.perf_counter()
+        result = await tools.run("slow", "{}")
+        # The worker is free again as soon as the query is interrupted
+        assert await adb.run(lambda: db.pool.execute("SELECT 1").fetchone()[0]) == 1
+        return result, time.perf_counter() - started
+
+    result, elapsed = asyncio.run(calls())
+    assert "longer than 0.05s" in result and tools.timeouts == 1
+    assert elapsed < 2
+    db.close()
+
+
+def test_abandoning_a_finished_call_leaves_the_next_job_alone(tmp_path):
+    db = DatabaseHandler(str(tmp_path / "shop.db"))
+    adb = AsyncDatabaseHandler(db, max_workers=1)
+    call = _Call(lambda: db.pool.execute("SELECT 1").fetchone()[0], {})
+    next_started = threading.Event()
+
+    def next_job():
+        next_started.set()
+        return db.pool.execute(SLOW).fetchone()[0]
+
+    async def jobs():
+        assert await adb.run(call, db.pool) == 1
+        # Same thread, same connection: a timeout noticed late must not stop this query
+        job = asyncio.ensure_future(adb.run(next_job))
+        await asyncio.get_running_loop().run_in_executor(None, next_started.wait)
+        await asyncio.sleep(0.05)
+        call.abandon()
+        return await job
+
+    assert asyncio.run(jobs()) == 5000000
+    db.close()
+
+
+def test_call_abandoned_while_queued_does_not_run(tmp_path):
+    db = DatabaseHandler(str(tmp_path / "shop.db"))
+    ran = []
+    call = _Call(lambda: ran.append(True), {})
+    call.abandon()
+    assert call(db.pool) is None and not ran
+    db.close()
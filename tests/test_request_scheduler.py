@@ -0,0 +1,250 @@
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+
+from src.ChatBot.ChatBot import RATE_LIMITED, ChatBot
+from src.ChatBot.RequestScheduler import RequestScheduler, parse_retry_after
+
+
+class Reply:
+    """A request factory that streams `pieces`, pausing on `gate` after the first one."""
+
+    def __init__(self, *pieces):
+        self.pieces, self.calls, self.closed = pieces, 0, False
+        self.gate = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            for i, piece in enumerate(self.pieces):
+                if i == 1:
+                    await self.gate.wait()
+                yield piece
+        finally:
+            self.closed = True
+
+
+async def collect(pieces):
+    return [piece async for piece in pieces]
+
+
+def test_identical_questions_share_one_request():
+    async def main():
+        scheduler = RequestScheduler()
+        reply = Reply("مرحبا", " بك")
+        first = asyncio.create_task(collect(scheduler.shared("q", reply)))
+        second = asyncio.create_task(collect(scheduler.shared("q", reply)))
+        await asyncio.sleep(0)
+        reply.gate.set()
+        return scheduler, reply, await first, await second
+
+    scheduler, reply, first, second = asyncio.run(main())
+    assert first == second == ["مرحبا", " بك"]
+    assert reply.calls == 1
+    assert scheduler.coalesced == 1
+    assert scheduler.stats()["in_flight_questions"] == 0
+
+
+def test_late_caller_gets_pieces_already_received():
+    async def main():
+        scheduler = RequestScheduler()
+        reply = Reply("a", "b")
+        first = asyncio.create_task(collect(scheduler.shared("q", reply)))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(collect(scheduler.shared("q", reply)))
+        await asyncio.sleep(0)
+        reply.gate.set()
+        return reply, await first, await second
+
+    reply, first, second = asyncio.run(main())
+    assert first == second == ["a", "b"]
+    assert reply.calls == 1
+
+
+def test_request_is_aborted_when_no_one_listens():
+    async def main():
+        scheduler = RequestScheduler()
+        reply = Reply("a", "b")
+        first, second = scheduler.shared("q", reply), scheduler.shared("q", reply)
+        assert await anext(first) == "a"
+        assert await anext(second) == "a"
+        await first.aclose()
+        await asyncio.sleep(0)
+        assert not reply.closed
+        await second.aclose()
+        await asyncio.sleep(0)
+        return scheduler, reply
+
+    scheduler, reply = asyncio.run(main())
+    assert reply.closed
+    assert scheduler.stats()["in_flight_questions"] == 0
+
+
+def test_request_errors_reach_every_listener():
+    async def failing():
+        yield "a"
+        raise httpx.ConnectError("down")
+
+    async def main():
+        scheduler = RequestScheduler()
+        results = await asyncio.gather(collect(scheduler.shared("q", failing)), collect(scheduler.shared("q", failing)),
+                                       return_exceptions=True)
+        return results
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, httpx.ConnectError) for result in results)
+
+
+def test_new_question_cancels_only_its_own_session():
+    async def question(answer, delay):
+        await asyncio.sleep(delay)
+        return answer
+
+    async def main():
+        scheduler = RequestScheduler()
+        old = scheduler.submit("ahmed", question("old", 0.05))
+        other = scheduler.submit("sara", question("other", 0.05))
+        new = scheduler.submit("ahmed", question("new", 0.01))
+        results = await asyncio.gather(old, other, new, return_exceptions=True)
+        return scheduler, results
+
+    scheduler, (old, other, new) = asyncio.run(main())
+    assert isinstance(old, asyncio.CancelledError)
+    assert other == "other"
+    assert new == "new"
+    assert scheduler.superseded == 1
+
+
+def test_finished_question_is_not_counted_as_superseded():
+    async def main():
+        scheduler = RequestScheduler()
+        await scheduler.submit("ahmed", asyncio.sleep(0, "first"))
+        second = await scheduler.submit("ahmed", asyncio.sleep(0, "second"))
+        return scheduler, second
+
+    scheduler, second = asyncio.run(main())
+    assert second == "second"
+    assert scheduler.superseded == 0
+
+
+def test_slots_cap_concurrent_requests():
+    async def main():
+        scheduler = RequestScheduler(max_concurrent=2)
+        peak = 0
+
+        async def request():
+            nonlocal peak
+            async with scheduler.slot():
+                peak = max(peak, scheduler.running)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(request() for _ in range(5)))
+        return scheduler, peak
+
+    scheduler, peak = asyncio.run(main())
+    stats = scheduler.stats()
+    assert peak == 2
+    assert stats["max_queue_depth"] == 3
+    assert stats["running"] == stats["queue_depth"] == 0
+
+
+def test_request_cancelled_while_waiting_is_never_sent():
+    async def main():
+        scheduler = RequestScheduler(max_concurrent=1)
+        release = asyncio.Event()
+        sent = []
+
+        async def request(name):
+            async with scheduler.slot():
+                sent.append(name)
+                await release.wait()
+
+        first = asyncio.create_task(request("first"))
+        waiting = asyncio.create_task(request("waiting"))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        await first
+        # The slot the cancelled request waited for is free again
+        await asyncio.wait_for(request("third"), 1)
+        return scheduler, sent, waiting
+
+    scheduler, sent, waiting = asyncio.run(main())
+    assert sent == ["first", "third"]
+    assert waiting.cancelled()
+    assert scheduler.stats()["queue_depth"] == 0
+
+
+def test_backoff_doubles_up_to_the_cap_with_full_jitter():
+    scheduler = RequestScheduler(max_retries=10, backoff=1.0, max_backoff=5.0, rng=lambda: 1.0)
+    assert [scheduler.retry_delay(attempt) for attempt in range(5)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+    scheduler = RequestScheduler(backoff=1.0, rng=lambda: 0.5)
+    assert scheduler.retry_delay(2) == 2.0
+
+
+def test_gives_up_after_max_retries():
+    scheduler = RequestScheduler(max_retries=2, rng=lambda: 0.0)
+    assert scheduler.retry_delay(0) == 0.0
+    assert scheduler.retry_delay(1) == 0.0
+    assert scheduler.retry_delay(2) is None
+    assert scheduler.rate_limited == 3
+    assert scheduler.retries == 2
+
+
+def test_retry_after_is_followed_with_a_little_jitter():
+    scheduler = RequestScheduler(backoff=1.0, max_backoff=30.0, rng=lambda: 0.5)
+    assert scheduler.retry_delay(0, "7") == 7.5
+    # Longer than max_backoff: not worth waiting for
+    assert scheduler.retry_delay(0, "120") is None
+
+
+def test_parse_retry_after():
+    now = datetime(2026, 3, 1, 12, 0, 0, tzinfo=timezone.utc)
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(" 1.5 ") == 1.5
+    assert parse_retry_after("-4") == 0.0
+    assert parse_retry_after("Sun, 01 Mar 2026 12:00:20 GMT", now) == 20.0
+    assert parse_retry_after("Sun, 01 Mar 2026 11:59:00 GMT", now) == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+
+def run_round(statuses, scheduler):
+    """ChatBot._round against a server answering with `statuses` in turn."""
+    requests = []
+
+    def handler(request):
+        status = statuses[len(requests)]
+        requests.append(request)
+        if status == 429:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"choices": [{"message": {"content": "تمام"}}]})
+
+    async def main():
+        bot = ChatBot(api_key="test", tools=False, scheduler=scheduler)
+        bot._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        bot._client_loop = asyncio.get_running_loop()
+        try:
+            return [event async for event in bot._round([{"role": "user", "content": "مرحبا"}], False, False)]
+        finally:
+            await bot.aclose()
+
+    return asyncio.run(main()), len(requests)
+
+
+def test_chatbot_retries_rate_limited_requests():
+    scheduler = RequestScheduler(max_retries=3, rng=lambda: 0.0)
+    events, sent = run_round([429, 429, 200], scheduler)
+    assert events == [("text", "تمام")]
+    assert sent == 3
+    assert scheduler.retries == 2
+
+
+def test_chatbot_reports_rate_limit_after_max_retries():
+    scheduler = RequestScheduler(max_retries=1, rng=lambda: 0.0)
+    events, sent = run_round([429, 429, 200], scheduler)
+    assert sent == 2
+    assert events == [("error", RATE_LIMITED)]
@@ -0,0 +1,19 @@
+from src.ChatBot.ResponseCache import ResponseCache
+
+
+def test_answers_expire_at_midnight():
+    day = ["2025-01-01"]
+    cache = ResponseCache(today=lambda: day[0])
+    key = cache.key("مبيعات اليوم", "", 7)
+    cache.put(key, "بعنا بـ 500 جنيه")
+    assert cache.get(cache.key("مبيعات اليوم؟", "", 7)) == "بعنا بـ 500 جنيه"
+    day[0] = "2025-01-02"
+    assert cache.get(cache.key("مبيعات اليوم", "", 7)) is None
+
+
+def test_new_data_version_drops_answers():
+    cache = ResponseCache(today=lambda: "2025-01-01")
+    cache.put(cache.key("ربح المحل", "", 1), "100")
+    assert cache.get(cache.key("ربح المحل", "", 2)) is None
+    assert cache.get(cache.key("ربح المحل", "", 1)) is None
+    assert cache.invalidations == 1